@@ -0,0 +1,196 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+import os
+import gzip
+
+# ---------- FUNCTIONS --------------------------- ||
+def detectAlignmentFormat(filename): # "fasta" or "phylip", from the first non-blank line
+	with open(filename, 'rb') as ifd:
+		for line in ifd:
+			if line.strip():
+				return "fasta" if line.lstrip().startswith(b'>') else "phylip"
+	raise AlignmentException(f"ERROR: alignment file \"{filename}\" is empty.")
+
+def readAlignment(filename, fmt="auto"):
+	if fmt == "auto":
+		fmt = detectAlignmentFormat(filename)
+
+	if fmt == "fasta":
+		return readFastaAlignment(filename)
+	elif fmt == "phylip":
+		try:
+			return readPhylipAlignment(filename, interleaved=True)
+		except AlignmentException as e: # one sequence per taxon over several lines?
+			try:
+				return readPhylipAlignment(filename, interleaved=False)
+			except AlignmentException:
+				raise e
+	elif fmt == "phylip-interleaved":
+		return readPhylipAlignment(filename, interleaved=True)
+	elif fmt == "phylip-sequential":
+		return readPhylipAlignment(filename, interleaved=False)
+	raise AlignmentException(f"ERROR: unknown alignment format \"{fmt}\".")
+
+def readPhylipAlignment(filename, interleaved=True):
+	with open(filename, 'rb') as ifd:
+		# header: number of taxa and number of positions
+		fields = ifd.readline().split()
+		try:
+			num_taxa, num_pos = int(fields[0]), int(fields[1])
+		except (IndexError, ValueError):
+			raise AlignmentException(f"ERROR: \"{filename}\" does not start with a PHYLIP header (\"<num taxa> <num positions>\").")
+		aln = Alignment(num_pos)
+
+		# interleaved: the first block has one line per taxon (name, then sequence), and every
+		#	later block continues the sequences in the same order
+		# sequential: each taxon's name, then its whole sequence, possibly over several lines
+		i = 0
+		remaining = 0
+		for line in ifd:
+			fields = line.split()
+			if not fields:
+				continue
+			if interleaved:
+				if i < num_taxa:
+					aln.addTaxon(fields[0].decode(encoding="UTF-8"))
+					fields = fields[1:]
+				aln.extendSequence(i % num_taxa, fields)
+				i += 1
+			else:
+				if remaining == 0:
+					if len(aln.names) == num_taxa:
+						raise AlignmentException(f"ERROR: \"{filename}\" has more than the {num_taxa} sequences given in its header.")
+					aln.addTaxon(fields[0].decode(encoding="UTF-8"))
+					fields = fields[1:]
+					remaining = num_pos
+				remaining -= aln.extendSequence(len(aln.names) - 1, fields)
+				if remaining < 0:
+					raise AlignmentException(f"ERROR: sequence \"{aln.names[-1]}\" in \"{filename}\" is longer than the {num_pos} positions given in the header.")
+
+	if len(aln.names) != num_taxa:
+		raise AlignmentException(f"ERROR: \"{filename}\" has {len(aln.names)} sequences, but its header says {num_taxa}.")
+	aln.finish()
+	return aln
+
+def readFastaAlignment(filename):
+	aln = Alignment()
+	with open(filename, 'rb') as ifd:
+		for line in ifd:
+			if line.startswith(b'>'):
+				fields = line[1:].split()
+				if not fields:
+					raise AlignmentException(f"ERROR: a sequence in \"{filename}\" has no name.")
+				aln.addTaxon(fields[0].decode(encoding="UTF-8"))
+			elif aln.names:
+				aln.extendSequence(len(aln.names) - 1, line.split())
+			elif line.strip():
+				raise AlignmentException(f"ERROR: \"{filename}\" does not start with a FASTA header (\">name\").")
+	aln.finish()
+	return aln
+
+# ----------- CLASSES ---------------------------- ||
+class AlignmentException(Exception):
+	pass
+
+# An alignment kept as one FASTA record (">name\nSEQUENCE\n") per taxon, each in
+# a single bytearray. A leave-one-out alignment is then just every record but
+# one, so it can be written without building it in memory first.
+class Alignment:
+
+	# constructor(s)
+	def __init__(self, num_pos=None):
+		# "normal" "public" member fields
+		self.num_pos = num_pos
+		self.names = []
+		#	records: the FASTA record of each taxon, in the same order as names
+		self.records = []
+
+		# "private" member fields
+		#	__header_lens: length of the ">name\n" part of each record
+		self.__header_lens = []
+
+	# "normal" "public" member functions
+	def addTaxon(self, name):
+		header = f">{name}\n".encode(encoding="UTF-8")
+		self.names.append(name)
+		self.records.append(bytearray(header))
+		self.__header_lens.append(len(header))
+
+	def extendSequence(self, i, chunks): # returns the number of positions added
+		record = self.records[i]
+		n = len(record)
+		for chunk in chunks:
+			record.extend(chunk)
+		return len(record) - n
+
+	def getSequenceLength(self, i):
+		return len(self.records[i]) - self.__header_lens[i]
+
+	def finish(self): # validates and ends each record with a newline
+		if not self.names:
+			raise AlignmentException("ERROR: the alignment has no sequences.")
+		seen = set()
+		for name in self.names:
+			if name in seen:
+				raise AlignmentException(f"ERROR: the sequence names are not all unique (e.g., \"{name}\").")
+			if '/' in name or name in (".", ".."):
+				raise AlignmentException(f"ERROR: the sequence name \"{name}\" cannot be used as a file name.")
+			seen.add(name)
+		if self.num_pos is None:
+			self.num_pos = self.getSequenceLength(0)
+		for i,name in enumerate(self.names):
+			if self.getSequenceLength(i) != self.num_pos:
+				raise AlignmentException(f"ERROR: sequence \"{name}\" has {self.getSequenceLength(i)} positions, but {self.num_pos} were expected.")
+			self.records[i].extend(b'\n')
+
+	def writeWithout(self, i, filename, compress_level=None): # all sequences but the i-th, in FASTA format
+		records = self.records[:i] + self.records[i+1:]
+		if compress_level is not None:
+			with gzip.open(filename, 'wb', compresslevel=compress_level) as ofd:
+				for record in records:
+					ofd.write(record)
+		elif hasattr(os, "writev"):
+			fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+			try:
+				Alignment.__writeAll__(fd, records)
+			finally:
+				os.close(fd)
+		else:
+			with open(filename, 'wb') as ofd:
+				for record in records:
+					ofd.write(record)
+
+	# "private" member functions
+	@staticmethod
+	def __writeAll__(fd, records): # writev, as many records at a time as the OS allows, until all is written
+		try:
+			iov_max = os.sysconf("SC_IOV_MAX")
+		except (ValueError, OSError):
+			iov_max = 1024
+		bufs = [memoryview(record) for record in records]
+		start = 0
+		while start < len(bufs):
+			n = os.writev(fd, bufs[start:start+iov_max])
+			while start < len(bufs) and n >= len(bufs[start]): # skip what was written fully
+				n -= len(bufs[start])
+				start += 1
+			if n: # and what was written partially
+				bufs[start] = bufs[start][n:]
+
+	# make str(some_alignment) meaningful
+	def __str__(self):
+		return f'{{ taxa: {len(self.names)}, positions: {self.num_pos} }}'
+
+	# make print(some_alignment) meaningful
+	def __repr__(self):
+		return "Alignment: " + self.__str__()
+
+
+# ------------- MAIN ----------------------------- ||
+if __name__ == "__main__":
+	sys.stderr.write("ERROR: This is a module, it is meant to be imported -- not run directly!\n")
+	sys.exit(1)
@@ -0,0 +1,193 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+import os
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor,as_completed
+from .calcScore import CalcScoreException,validateOutputFiles,createMainTrees,getJackknifedTreesFileNames,validateAndResolveJackknifedTrees,sortJackknifedTrees,buildReplicateIndexFromFiles,writeOutputs
+
+# ---------- FUNCTIONS --------------------------- ||
+def handleArgs(argv):
+	# define the argument parser
+	parser = argparse.ArgumentParser(prog=f"{Path(sys.argv[0]).name} batch", add_help=False, allow_abbrev=True,
+									formatter_class=argparse.RawTextHelpFormatter,
+									description="Score many independent studies (e.g., one gene tree and its jackknifed trees per\n"
+									"locus) in one run. The studies are spread over a pool of processes: each process\n"
+									"takes the next study as soon as it is done with one, so a slow study does not hold\n"
+									"up the others. A study that fails is reported in the summary table and does not\n"
+									"stop the rest.\n")
+
+	# define argument groups
+	input_group = parser.add_argument_group("Input Options", "These options affect how input files are found and/or interpreted.")
+	output_group = parser.add_argument_group("Output Options", "These options affect which and how output files are generated.")
+	misc_group = parser.add_argument_group("Misc. Options", "")
+
+	# 	define input group options
+	input_group.add_argument("manifest", metavar="manifest.tsv", type=str,
+						help="The studies, one per line, as tab-separated values: the main tree file (Newick;\n"
+						"may hold several trees, as with -m), the jackknifed trees (a directory as with -t,\n"
+						"or a file of filenames as with -f), and the output prefix. Blank lines and lines\n"
+						"starting with \"#\" are ignored. For example:\n"
+						"\tloci/abc1/tree.nwk\tloci/abc1/jackknife/tree\tout/abc1\n"
+						"\tloci/xyz2/tree.nwk\tloci/xyz2/trees.tsv\tout/xyz2\n \n")
+	input_group.add_argument("-e", "--tree-ext", dest="jack_tree_fn_ext", metavar=".ext", action="store", type=str, required=False, default="nwk",
+						help="The filename extension of the jackknifed tree files in each directory (as with -e)."
+						" [nwk]\n \n")
+	input_group.add_argument("-u", "--unrooted", dest="unrooted", action="store_true", required=False,
+						help="Compare bipartitions instead of clades (as with -u).\n \n")
+
+	# 	define output group options
+	output_group.add_argument("-x", "--outputs", dest="outputs", metavar="nwk,json,pretty,mmd", action="store", type=str, required=False, default="nwk,json,pretty",
+						help="The outputs written for each study, as ${prefix}.nwk, ${prefix}.json,\n"
+						"${prefix}_pretty.json, and ${prefix}.mmd. When a main tree file holds several\n"
+						"trees, the tree number is appended to each stem (e.g., ${prefix}-2.nwk)."
+						" [nwk,json,pretty]\n \n")
+	output_group.add_argument("-b", "--replace-branch-len", dest="replace_branch_len", action="store_true", required=False,
+						help="Replace the branch lengths with the scores in the Newick output (as with -b).\n \n")
+	output_group.add_argument("-s", "--replace-label", dest="replace_internal_labels", action="store_true", required=False,
+						help="Replace the internal labels with the scores in the Newick and mermaid output (as\n"
+						"with -s).\n \n")
+	output_group.add_argument("-o", "--output-summary", dest="output_summary", metavar="summary.tsv", action="store", type=str, required=False, default="summary.tsv",
+						help="One line per study (in manifest order) with its line number, prefix, status (ok or\n"
+						"failed), number of main trees, taxa, and jackknifed trees, the mean and minimum\n"
+						"score of the scored nodes (over every main tree), the seconds it took, and the\n"
+						"error, if any."
+						" [summary.tsv]\n \n")
+	output_group.add_argument("-k", "--processes", dest="processes", metavar="int", action="store", type=int, required=False, default=os.cpu_count(),
+						help="The number of studies scored at the same time."
+						f" [{os.cpu_count()}]\n \n")
+
+	# 	define misc. group options
+	misc_group.add_argument("-h", "--help", action="help", help="Show this help message and exit.\n \n")
+
+	# parse the arguments
+	args = parser.parse_args(argv)
+
+	# sanity check on input paths and options
+	p = Path(args.manifest)
+	if not (p.exists() and p.is_file()): # exists and is file?
+		raise CalcScoreException(f"ERROR: manifest \"{args.manifest}\" either did not exist or was not a regular file.")
+	if args.processes < 1:
+		raise CalcScoreException(f"ERROR: -k/--processes must be at least 1, not {args.processes}.")
+	args.outputs = [output for output in args.outputs.split(',') if output]
+	for output in args.outputs:
+		if not output in ("nwk", "json", "pretty", "mmd"):
+			raise CalcScoreException(f"ERROR: unknown output \"{output}\" for -x/--outputs; expected nwk, json, pretty,\nand/or mmd.")
+
+	# sanity check on output files
+	validateOutputFiles((args.output_summary,))
+
+	# return the parsed arguments object
+	return args
+
+def readManifest(fn): # returns list of (line number, main tree file, jackknifed trees dir or fofn, output prefix)
+	studies = []
+	prefixes = set()
+	with open(fn, 'r') as ifd:
+		for line_num,line in enumerate(ifd, start=1):
+			line = line.rstrip('\n')
+			if not line.strip() or line.startswith('#'):
+				continue
+			fields = line.split('\t')
+			if len(fields) != 3:
+				raise CalcScoreException(f"ERROR: line {line_num} of manifest \"{fn}\" has {len(fields)} column(s), not 3 (main\ntree, jackknifed trees, and output prefix).")
+			main_tree_fn, jackknife, prefix = fields
+			if prefix in prefixes:
+				raise CalcScoreException(f"ERROR: the output prefix \"{prefix}\" is used more than once in manifest \"{fn}\".")
+			prefixes.add(prefix)
+			studies.append((line_num, main_tree_fn, jackknife, prefix))
+	if not studies:
+		raise CalcScoreException(f"ERROR: manifest \"{fn}\" lists no studies.")
+	return studies
+
+def getStudyOutputArgs(prefix, outputs, replace_branch_len, replace_internal_labels): # what writeOutputs expects from handleArgs
+	return argparse.Namespace(output_nwk=f"{prefix}.nwk" if "nwk" in outputs else "",
+							output_json=f"{prefix}.json" if "json" in outputs else "",
+							output_json_pretty=f"{prefix}_pretty.json" if "pretty" in outputs else "",
+							output_mmd=f"{prefix}.mmd" if "mmd" in outputs else "",
+							replace_branch_len=replace_branch_len, replace_internal_labels=replace_internal_labels)
+
+def scoreStudy(main_tree_fn, jackknife, prefix, tree_ext, unrooted, outputs, replace_branch_len, replace_internal_labels): # runs in a worker process; the steps of "tanos -m ... -t/-f ..."
+	if not Path(main_tree_fn).is_file():
+		raise CalcScoreException(f"ERROR: main tree file \"{main_tree_fn}\" either did not exist or was not a regular file.")
+	if not Path(jackknife).exists():
+		raise CalcScoreException(f"ERROR: jackknifed trees \"{jackknife}\" did not exist.")
+	out_args = getStudyOutputArgs(prefix, outputs, replace_branch_len, replace_internal_labels)
+	validateOutputFiles((out_args.output_nwk, out_args.output_json, out_args.output_json_pretty, out_args.output_mmd))
+
+	main_trees = createMainTrees([main_tree_fn])
+	taxa = sorted(main_trees[0].getLeafLabels())
+	if Path(jackknife).is_dir():
+		taxa_x_fns = getJackknifedTreesFileNames(jackknife, tree_ext, None)
+	else:
+		taxa_x_fns = getJackknifedTreesFileNames(None, tree_ext, jackknife)
+	validateAndResolveJackknifedTrees(taxa_x_fns, taxa)
+	sortJackknifedTrees(taxa_x_fns)
+	index = buildReplicateIndexFromFiles(taxa_x_fns, taxa, unrooted=unrooted)
+
+	scores = []
+	for tree_num,mt in enumerate(main_trees, start=1):
+		mt.scoreResiliencyWithIndex(index)
+		for i,node in mt.generateScoredNodes():
+			if "taxa-resiliency" in node.metadata: # a node with nothing to compare against has no score
+				scores.append(node.metadata["taxa-resiliency"])
+		writeOutputs(mt, out_args, tree_num=tree_num, num_trees=len(main_trees))
+
+	return len(main_trees), len(taxa), index.getNumTrees(), scores
+
+def runStudy(*study_args): # runs in a worker process; returns (status, num main trees, num taxa, num jackknifed trees, scores, seconds, error)
+	start = time.perf_counter()
+	try:
+		num_trees, num_taxa, num_reps, scores = scoreStudy(*study_args)
+		return "ok", num_trees, num_taxa, num_reps, scores, time.perf_counter() - start, ""
+	except Exception as e: # e.g., CalcScoreException; one bad study must not stop the others
+		return "failed", 0, 0, 0, [], time.perf_counter() - start, str(e).replace('\n', ' ')
+
+def writeSummary(ofn, studies, results):
+	with open(ofn, 'w') as ofd:
+		ofd.write("line\tprefix\tstatus\tmain_trees\ttaxa\tjackknifed_trees\tmean_score\tmin_score\tseconds\terror\n")
+		for (line_num,main_tree_fn,jackknife,prefix),result in zip(studies, results):
+			status, num_trees, num_taxa, num_reps, scores, seconds, error = result
+			mean_score = sum(scores) / len(scores) if scores else ""
+			min_score = min(scores) if scores else ""
+			ofd.write(f"{line_num}\t{prefix}\t{status}\t{num_trees}\t{num_taxa}\t{num_reps}\t{mean_score}\t{min_score}\t{seconds:.3f}\t{error}\n")
+
+# ------------- MAIN ----------------------------- ||
+def main(argv=None):
+	# handle the arguments
+	args = handleArgs(argv)
+
+	# read the studies
+	studies = readManifest(args.manifest)
+
+	# one study per task, so that a process that finishes a study simply takes the next one
+	results = [None] * len(studies)
+	with ProcessPoolExecutor(max_workers=args.processes) as pool:
+		futures = {}
+		for i,(line_num,main_tree_fn,jackknife,prefix) in enumerate(studies):
+			futures[pool.submit(runStudy, main_tree_fn, jackknife, prefix, args.jack_tree_fn_ext.lstrip('.'), args.unrooted, args.outputs, args.replace_branch_len, args.replace_internal_labels)] = i
+		for num_done,future in enumerate(as_completed(futures), start=1):
+			i = futures[future]
+			try:
+				results[i] = future.result()
+			except Exception as e: # the worker process itself died
+				results[i] = ("failed", 0, 0, 0, [], 0.0, str(e).replace('\n', ' '))
+			if results[i][0] != "ok":
+				sys.stderr.write(f"FAILED: line {studies[i][0]} ({studies[i][3]}): {results[i][6]}\n")
+			if not num_done % 10 or num_done == len(futures):
+				sys.stderr.write(f"{num_done} of {len(futures)} studies done\n")
+
+	# generate output
+	writeSummary(args.output_summary, studies, results)
+
+	num_failed = sum(1 for result in results if result[0] != "ok")
+	if num_failed:
+		raise CalcScoreException(f"ERROR: {num_failed} of {len(studies)} studies failed; see \"{args.output_summary}\".")
+
+if __name__ == "__main__":
+	main()
@@ -2,49 +2,86 @@
 
 # ----------- IMPORTS ---------------------------- ||
 import sys
+import random
 import re
 import argparse
 import pkgutil
+import importlib
+import textwrap
 from pathlib import Path
 from .tree import Tree
+from .node import MalformedNewickTree
+from .taxonNamespace import TaxonNamespace,TaxonNamespaceException
+from .nexus import NexusException,isNexusFile,generateNexusTrees
+from .replicateIndex import ReplicateIndex,ReplicateIndexException,parseMemorySize
+from .sketch import SketchIndex
+from .fingerprint import FingerprintIndex
+from .sequential import SequentialScorer
+from .shard import PartialCounts,ShardException,parseShard,getShardTaxa
+from .consensus import getConsensusTrees,writeConsensusTrees
+from .matrix import SupportMatrixWriter
+from .runStore import RunStore,RunStoreException,getTaxaKey
+from .engine import ENGINES,resolveEngine,createPool,getChunks,getNodeCounts
 
 # ----------- GLOBALS ---------------------------- ||
 __author__ = "Brandon Pickett"
 __copyright_owner__ = "Brandon Pickett"
 __copyright_year__ = "2019"
 __version__ = str(pkgutil.get_data(__package__, "VERSION").decode(encoding="UTF-8")).rstrip('\n')
+# subcommands: "tanos <subcommand> ..." runs the main() of the named module
+__subcommands__ = {
+	"batch": "batch",
+	"jackknife-alignment": "jackknifeAlignment",
+	"merge": "merge",
+	"rf": "rf",
+	"run-jackknife": "runJackknife",
+	"serve": "serve",
+	"watch": "watch",
+}
+# incompatible options: none of the options (or inputs) listed with each one can be given with it (see checkIncompatibleOptions)
+__removal_sets__ = "jackknifed trees built without 2+ taxa"
+__incompatible_options__ = (
+	("--tolerance", ("--sample-fraction", "--sample-size")),
+	("-u/--unrooted", ("--sample-fraction", "--sample-size")),
+	("--shard", ("--tolerance", "--sample-fraction", "--sample-size")),
+	("--consensus", ("--shard", "--sample-fraction", "--sample-size")),
+	("--output-matrix", ("--shard", "--sample-fraction", "--sample-size")),
+	("--output-destabilizing", ("--shard", "--sample-fraction", "--sample-size")),
+	("--verify-sample", ("-u/--unrooted", "--shard", "--tolerance", "--sample-fraction", "--sample-size")),
+	("--max-memory", ("--consensus", "--tolerance", "--sample-fraction", "--sample-size")),
+	("--sketch-memory", ("--max-memory", "--consensus", "--shard", "--verify-sample", "--tolerance", "--sample-fraction", "--sample-size")),
+	("--fingerprints", ("--store", "--max-memory", "--sketch-memory", "--consensus", "--shard", "--tolerance", "--sample-fraction", "--sample-size")),
+	("--fast-path", ("--store", "--sketch-memory", "--fingerprints", "--consensus", "--tolerance", "--sample-fraction", "--sample-size")),
+	("--store", ("--shard", "--sample-fraction", "--sample-size")),
+	(__removal_sets__, ("--tolerance", "--sample-fraction", "--sample-size", "--consensus", "--output-matrix", "--output-destabilizing", "--max-memory", "--verify-sample", "--sketch-memory", "--fingerprints")), # they are only scored through the replicate index, taxon by taxon outputs aside
+)
 
 # ----------- CLASSES ---------------------------- ||
 class CalcScoreException(Exception):
 	pass
 
 # ---------- FUNCTIONS --------------------------- ||
-def handleArgs():
-	# define the main argument parser
-	parser = argparse.ArgumentParser(prog=Path(sys.argv[0]).name, add_help=False, allow_abbrev=True, 
-									formatter_class=argparse.RawTextHelpFormatter, 
-									description="Calculate the taxa resiliency for a provided tree. Please see the README file\n" 
-									"distributed with this projects repository for further explanation.\n")
-
-	# define argument groups
-	input_group = parser.add_argument_group("Input Options", "These options affect how input files are found and/or interpreted.")
-	output_group = parser.add_argument_group("Output Options", "These options affect which and how output files are generated. Specify an output" 
-																" filename as \"\" to skip outputting it.")
-	misc_group = parser.add_argument_group("Misc. Options", "")
-
-	# 	define input group options
-	#		main tree
-	input_group.add_argument("-m", "--main-tree", dest="main_tree", metavar="tree.nwk", action="store", type=str, required=False,  default="data/mainTree/tree.nwk", 
+def addMainTreeArgument(input_group):
+	input_group.add_argument("-m", "--main-tree", dest="main_trees", metavar="tree.nwk", action="append", type=str, required=False,  default=None, 
 						help="The main tree in Newick format for which you wish to determine the resiliency\n" 
-						"against the removal of taxa." 
+						"against the removal of taxa. You may specify this option more than once and/or\n" 
+						"provide a file with more than one tree (one tree per semi-colon) to score several\n" 
+						"main trees (e.g., the ML tree, a consensus tree, and alternate topologies) against\n" 
+						"the same jackknifed trees. The jackknifed trees are read only once. All main trees\n" 
+						"must have the same taxa. When more than one main tree is scored, each output\n" 
+						"filename gets the (1-based) number of the main tree appended to its stem (e.g.,\n" 
+						"out-1.nwk, out-2.nwk, ...). The file may also be NEXUS (every TREE statement of its\n" 
+						"TREES block(s) is a main tree)." 
 						" [data/mainTree/tree.nwk]\n \n")
-	#		jackknife trees
+
+def addJackknifeTreeArguments(input_group):
 	input_group.add_argument("-t", "--jackknife-tree", dest="jack_tree_dir", metavar="path/to/jackknife/tree/", action="store", type=str, required=False, default="data/jackknife/tree", 
 						help="The directory in which the jackknife tree data exists. The directory should\n"
 						"contain one subdirectory per taxon in the main tree. Each directory name should\n"
 						"match the taxon name from the main tree file (case-sensitive!). In turn, each\n"
-						"subdirectory should contain tree files in Newick format. Unless specified  by\n"
-						"other options, the file names should be tree-${num}.nwk, where ${num} ranges from\n"
+						"subdirectory should contain tree files in Newick (or NEXUS, with one TREE each)\n"
+						"format. Unless specified  by other options, the file names should be\n"
+						"tree-${num}.nwk, where ${num} ranges from\n"
 						"1-${rep}, where ${rep} is the number of jackknife replicates. In thoery, your\n"
 						"files should fit in a nice range from 1-${rep}, but that is not strictly\n"
 						"necessary. Using this option, the program will search for all files in the\n"
@@ -58,7 +95,8 @@ def handleArgs():
 						"output Newick trees are in files with the extension \".treefile\". Note that this\n"
 						"changes only the end of the expected filename pattern. The beginning of the\n"
 						"filename must still match this reg. exp: \"tree-\d+\". For more control over the\n"
-						"filenames, you will need to use other options." 
+						"filenames, you will need to use other options. NEXUS files named tree-${num}.nex\n"
+						"or tree-${num}.nexus are found whatever this extension is." 
 						" [nwk]\n \n")
 	input_group.add_argument("-f", "--jackknife-tree-fofn", dest="jack_tree_fofn", metavar="path/to/trees.tsv", action="store", type=str, required=False, default=None, 
 						help="Instead of using -t and -e to provide the jackknifed trees, you may use this\n"
@@ -67,7 +105,8 @@ def handleArgs():
 						"should exist. The first column should contain the taxon name (case-sensitive!).\n"
 						"The second column should contain the path (absolute -or- relative to the\n"
 						"directory from which the program is being run) to a jackknifed tree file in\n"
-						"Newick format. This option overrides -t and -e for the jackknife tree files.\n"
+						"Newick or NEXUS format. This option overrides -t and -e for the jackknife tree\n"
+						"files.\n"
 						"The following is an example of how the file should look:\n" 
 						"\tCignobilis\tdata/jackknife/tree/Cignobilis/tree-1.treefile\n" 
 						"\t...\n" 
@@ -81,9 +120,26 @@ def handleArgs():
 						"\tOclarkiistomias\tdata/jackknife/tree/Oclarkiistomias/tree-1.treefile\n" 
 						"\t...\n" 
 						"\tOclarkiistomias\tdata/jackknife/tree/Oclarkiistomias/tree-50.treefile\n" 
-						"\t...\n \n")
+						"\t...\n"
+						"To score against trees built without several taxa at once (e.g., pairs), list\n"
+						"the removed taxa in the first column separated by commas (e.g.,\n"
+						"\"Rmuscosa,Aglossodonta\"); with -t, name the subdirectory the same way. Each set\n"
+						"of removed taxa then counts for every node whose clade it overlaps, as a single\n"
+						"taxon does. Every taxon must be in at least one set, but a set need not exist for\n"
+						"each taxon alone. Sets of 2+ taxa may not be used with --consensus,\n"
+						"--output-matrix, --output-destabilizing, sequential mode, or approximate mode.\n \n")
 
-	# 	define output group options
+def validateJackknifeTreeInputs(args):
+	if args.jack_tree_fofn is not None: # fofn is provided
+		p = Path(args.jack_tree_fofn)
+		if not (p.exists() and p.is_file()): # exists and is file?
+			raise CalcScoreException(f"ERROR: You provided -f \"{args.jack_tree_fofn}\", but it either did not exist or was not a regular file.")
+	else: # fofn not specificed
+		p = Path(args.jack_tree_dir)
+		if not (p.exists() and p.is_dir()): # exists and is dir?
+			raise CalcScoreException(f"ERROR: Problem with argument used for -t, \"{args.jack_tree_dir}\" either did not exist or was not a directory.")
+
+def addTreeOutputArguments(output_group): # the outputs written by writeOutputs
 	#		newick format
 	output_group.add_argument("-n", "--output-nwk", dest="output_nwk", metavar="out.nwk", action="store", type=str, required=False, default="out.nwk", 
 						help="The output tree in Newick format with the taxon resiliency score in a comment\n"
@@ -120,6 +176,280 @@ def handleArgs():
 						"the \"-s\" option, similar to the Newick output. This file is not generated by\n" 
 						"default.\n \n") 
 
+def validateMainTreeFiles(args):
+	# default main tree
+	if args.main_trees is None:
+		args.main_trees = ["data/mainTree/tree.nwk"]
+
+	for fn in args.main_trees:
+		p = Path(fn)
+		if not (p.exists() and p.is_file()): # exists and is file?
+			raise CalcScoreException(f"ERROR: You provided -m \"{fn}\", but it either did not exist or was not a regular file.")
+
+def validateOutputFiles(ofns):
+	for ofn in ofns:
+		if ofn != '':
+			p = Path(ofn)
+			p = p.resolve()
+			if p.exists():
+				if not p.is_file():
+					raise CalcScoreException(f"ERROR: Output file \"{ofn}\" exists and is not a regular file. It cannot be\noverwritten since it is not a regular file.")
+			else:
+				d = p.parent
+				if d.exists():
+					if not d.is_dir():
+						raise CalcScoreException(f"ERROR: Output file \"{ofn}\" cannot be created because its theoretical parent\ndirectory already exists as a non-directory file.")
+				else:
+					d.mkdir(parents=True)
+
+def memorySizeType(size_str): # argparse type for --max-memory and --sketch-memory
+	try:
+		size = parseMemorySize(size_str)
+	except ReplicateIndexException as e:
+		raise argparse.ArgumentTypeError(str(e))
+	if size < 1:
+		raise argparse.ArgumentTypeError(f"ERROR: a memory size must be positive, not \"{size_str}\".")
+	return size
+
+def shardType(shard_str): # argparse type for --shard
+	try:
+		return parseShard(shard_str)
+	except ShardException as e:
+		raise argparse.ArgumentTypeError(str(e))
+
+def getGivenOptions(args, removal_sets=False): # the options (and inputs) of __incompatible_options__ that were given
+	given = {
+		"-u/--unrooted": args.unrooted,
+		"--tolerance": args.tolerance is not None,
+		"--sample-fraction": args.sample_fraction is not None,
+		"--sample-size": args.sample_size is not None,
+		"--shard": args.shard is not None,
+		"--consensus": args.consensus is not None,
+		"--output-matrix": bool(args.output_matrix),
+		"--output-destabilizing": bool(args.output_destabilizing),
+		"--verify-sample": args.verify_sample is not None,
+		"--max-memory": args.max_memory is not None,
+		"--sketch-memory": args.sketch_memory is not None,
+		"--fingerprints": args.fingerprints, # also set by --verify-fingerprints
+		"--fast-path": args.fast_path,
+		"--store": args.store is not None,
+		__removal_sets__: removal_sets,
+	}
+	return frozenset(option for option,is_given in given.items() if is_given)
+
+def checkIncompatibleOptions(args, removal_sets=False):
+	given = getGivenOptions(args, removal_sets=removal_sets)
+	for option,others in __incompatible_options__:
+		if option in given and any(other in given for other in others):
+			message = f"ERROR: {option} cannot be combined with {', '.join(others[:-1])}{',' if len(others) > 2 else ''} or {others[-1]}."
+			raise CalcScoreException(textwrap.fill(message, width=80, break_long_words=False, break_on_hyphens=False))
+
+def handleArgs():
+	# define the main argument parser
+	parser = argparse.ArgumentParser(prog=Path(sys.argv[0]).name, add_help=False, allow_abbrev=True, 
+									formatter_class=argparse.RawTextHelpFormatter, 
+									description="Calculate the taxa resiliency for a provided tree. Please see the README file\n" 
+									"distributed with this projects repository for further explanation.\n"
+									"\n"
+									"Other commands (run with -h for details):\n"
+									"\tbatch\tscore many independent studies (e.g., loci) listed in a manifest\n"
+									"\tjackknife-alignment\twrite the leave-one-out alignments, one per taxon\n"
+									"\tmerge\tcombine the partial counts files written by --shard\n"
+									"\trf\tRobinson-Foulds distances between the jackknifed trees and the main tree\n"
+									"\trun-jackknife\tbuild the jackknifed trees on this machine (e.g., with IQ-TREE)\n"
+									"\tserve\tkeep the jackknifed trees in memory and score main trees sent over HTTP\n"
+									"\twatch\tscore jackknifed trees as they are written, with provisional outputs\n")
+
+	# define argument groups
+	input_group = parser.add_argument_group("Input Options", "These options affect how input files are found and/or interpreted.")
+	output_group = parser.add_argument_group("Output Options", "These options affect which and how output files are generated. Specify an output" 
+																" filename as \"\" to skip outputting it.")
+	sequential_group = parser.add_argument_group("Sequential Options", "These options score the jackknifed trees as they are read and report how many\n"
+																"replicates each taxon needed for its scores to stabilize.")
+	approximate_group = parser.add_argument_group("Approximate Options", "These options trade exact scores for speed. Each node checks only a random\n"
+																"sample of its (excluded taxon, jackknifed tree) pairs and reports its score with a\n"
+																"confidence interval (\"taxa-resiliency-ci-lower\" and \"taxa-resiliency-ci-upper\").")
+	shard_group = parser.add_argument_group("Shard Options", "These options split scoring across several independent runs (e.g., a SLURM job\n"
+																"array). Each run handles a subset of the taxa and writes a partial counts file.\n"
+																"Combine them with \"merge\".")
+	engine_group = parser.add_argument_group("Engine Options", "These options spread the parsing of the jackknifed trees and the scoring of the\n"
+																"main tree nodes over several threads or processes. The scores do not change.")
+	memory_group = parser.add_argument_group("Memory Options", "These options bound the memory used for the clade counts of the jackknifed trees.")
+	misc_group = parser.add_argument_group("Misc. Options", "")
+
+	# 	define input group options
+	addMainTreeArgument(input_group)
+	addJackknifeTreeArguments(input_group)
+	#		unrooted comparison
+	input_group.add_argument("-u", "--unrooted", dest="unrooted", action="store_true", required=False, 
+						help="Treat the jackknifed trees as unrooted. A node in the main tree is then supported\n" 
+						"by a jackknifed tree if the tree has the same bipartition (split), no matter where\n" 
+						"the jackknifed tree was rooted, so they need not be rerooted beforehand. Each\n" 
+						"jackknifed tree must have every taxon in the main tree except the excluded one.\n" 
+						"Not supported with --sample-fraction or --sample-size.\n \n")
+
+	# 	define sequential group options
+	sequential_group.add_argument("--tolerance", dest="tolerance", metavar="0.1", action="store", type=float, required=False, default=None, 
+						help="Read the jackknifed trees in order (replicate 1 of every taxon, then replicate 2\n" 
+						"of every taxon, etc.) and, after each one, estimate every node's support as a\n" 
+						"binomial proportion with a confidence interval. A taxon has converged once every\n" 
+						"interval involving it is narrower than this tolerance. The replicate count at\n" 
+						"which each taxon converged is written to the file given by --output-convergence,\n" 
+						"and each scored node gets the interval as \"taxa-resiliency-ci-lower\" and\n" 
+						"\"taxa-resiliency-ci-upper\" metadata. Sequential mode is off by default.\n \n")
+	sequential_group.add_argument("--confidence", dest="confidence", metavar="0.95", action="store", type=float, required=False, default=0.95, 
+						help="The confidence level of the (Wilson score) intervals used by --tolerance,\n" 
+						"--sample-fraction, and --sample-size." 
+						" [0.95]\n \n")
+	sequential_group.add_argument("--min-replicates", dest="min_replicates", metavar="int", action="store", type=int, required=False, default=1, 
+						help="With --tolerance, a taxon cannot converge before this many of its jackknifed\n" 
+						"trees have been read." 
+						" [1]\n \n")
+	sequential_group.add_argument("--early-stop", dest="early_stop", action="store_true", required=False, 
+						help="With --tolerance, stop reading a taxon's jackknifed trees once it has converged.\n" 
+						"Scores are then based only on the jackknifed trees that were read.\n \n")
+
+	#	define approximate group options
+	approximate_group.add_argument("--sample-fraction", dest="sample_fraction", metavar="0.1", action="store", type=float, required=False, default=None, 
+						help="Check this fraction (0,1] of each node's (excluded taxon, jackknifed tree) pairs.\n \n")
+	approximate_group.add_argument("--sample-size", dest="sample_size", metavar="int", action="store", type=int, required=False, default=None, 
+						help="Check this many of each node's (excluded taxon, jackknifed tree) pairs (or all of\n" 
+						"them, if there are fewer). Overrides --sample-fraction.\n \n")
+	approximate_group.add_argument("--seed", dest="seed", metavar="int", action="store", type=int, required=False, default=None, 
+						help="Seed for the random number generator, for reproducible samples (also those of\n"
+						"--verify-sample).\n \n")
+
+	#	define shard group options
+	shard_group.add_argument("--shard", dest="shard", metavar="i/N", action="store", type=shardType, required=False, default=None, 
+						help="Process only shard i (1-based) of N. The taxa are sorted and every N-th one,\n" 
+						"starting with the i-th, belongs to this shard; only their jackknifed trees are\n" 
+						"read. Instead of the usual outputs, the hits and totals of every main tree node\n" 
+						"for this shard's taxa are written to the file given by --output-partial.\n \n")
+	shard_group.add_argument("--output-partial", dest="output_partial", metavar="partial-i.tsv", action="store", type=str, required=False, default=None, 
+						help="With --shard, the partial counts file." 
+						" [partial-${i}.tsv]\n \n")
+
+	#	define engine group options
+	engine_group.add_argument("-k", "--workers", dest="workers", metavar="int", action="store", type=int, required=False, default=1, 
+						help="The number of threads or processes to use. 1 means everything runs in this one." 
+						" [1]\n \n")
+	engine_group.add_argument("--engine", dest="engine", metavar="auto", action="store", type=str, required=False, default="auto", choices=ENGINES, 
+						help="How to use -k/--workers: \"thread\" (the threads share one copy of the jackknifed\n" 
+						"trees' clade counts; only faster on a free-threaded Python, e.g., python3.13t,\n" 
+						"running without the GIL), \"process\" (each process gets its own copy), \"serial\"\n" 
+						"(ignore -k), or \"auto\" (\"thread\" if the GIL is off, \"process\" otherwise). In\n" 
+						"sequential mode, the trees are always read here, in order. In approximate mode,\n" 
+						"only \"thread\" parses the trees in parallel, and the nodes are always sampled\n" 
+						"here, so that --seed gives the same samples." 
+						" [auto]\n \n")
+	engine_group.add_argument("--fast-path", dest="fast_path", action="store_true", required=False, 
+						help="Compare the topology of each jackknifed tree with that of the (first) main tree\n" 
+						"without the tree's taxon, by a canonical hash of each (see\n" 
+						"Tree.getTopologyHash). A tree that matches supports every main tree clade, so it\n" 
+						"is counted once instead of clade by clade; in well-supported datasets, that is\n" 
+						"most of them. How many trees took this fast path is written to stderr. Not\n" 
+						"supported with --store, --sketch-memory, --fingerprints, --consensus, sequential\n" 
+						"mode, or approximate mode.\n \n")
+	engine_group.add_argument("--verify-sample", dest="verify_sample", metavar="int", action="store", type=int, required=False, default=None, 
+						help="After scoring, score a random sample of this many main tree nodes (or all of\n" 
+						"them, if there are fewer) again with the original, slow algorithm, which checks\n" 
+						"every jackknifed tree for the node's clade, and stop with an error if any score\n" 
+						"differs. Only the jackknifed trees of the taxa in the sampled clades are read\n" 
+						"again, one at a time (they are not all held in memory). Not supported with\n" 
+						"-u/--unrooted, --shard, approximate mode, sequential mode, or sets of 2+ removed\n" 
+						"taxa (the original algorithm does not handle them).\n \n")
+
+	#	define memory group options
+	memory_group.add_argument("--max-memory", dest="max_memory", metavar="4G", action="store", type=memorySizeType, required=False, default=None, 
+						help="Keep the clade counts of the jackknifed trees within about this much memory (in\n" 
+						"bytes, or with a K, M, G, or T suffix). Whenever they reach it, they are written\n" 
+						"to a sorted run file in --scratch-dir and dropped from memory. Once every tree is\n" 
+						"read, the runs are merged (one sequential pass over each) and only the counts\n" 
+						"needed to score the main tree(s) are kept. The rest of the program (e.g., the\n" 
+						"main trees) is not counted. No limit by default. Not supported with\n" 
+						"--consensus, sequential mode, approximate mode, or sets of 2+ removed taxa.\n \n")
+	memory_group.add_argument("--scratch-dir", dest="scratch_dir", metavar="path/to/scratch/", action="store", type=str, required=False, default=None, 
+						help="With --max-memory, the directory for the run files (ideally on a fast local\n" 
+						"disk). They are deleted when no longer needed. [the system's temporary directory]\n \n")
+	memory_group.add_argument("--sketch-memory", dest="sketch_memory", metavar="256M", action="store", type=memorySizeType, required=False, default=None, 
+						help="Sketch mode: instead of exact clade counts, keep one count-min sketch per excluded\n" 
+						"taxon, all of them together in this much memory (in bytes, or with a K, M, G, or\n" 
+						"T suffix), however many jackknifed trees there are. Scores are then estimates\n" 
+						"that are never below the exact scores. Each scored node also gets\n" 
+						"\"taxa-resiliency-sketch-error\": with a probability of at least 1 - k * e^-depth\n" 
+						"(for a node of k taxa; see --sketch-depth), its score is at most this much above\n" 
+						"the exact score. More memory makes the bound tighter (see sketch.py). Not\n" 
+						"supported with --max-memory, --consensus, --shard, --verify-sample, sequential\n" 
+						"mode, approximate mode, or sets of 2+ removed taxa.\n \n")
+	memory_group.add_argument("--sketch-depth", dest="sketch_depth", metavar="int", action="store", type=int, required=False, default=4, 
+						help="With --sketch-memory, the number of hash functions (rows) per sketch. Each one\n" 
+						"makes it e times less likely that an estimate is off by more than the bound, but\n" 
+						"takes a share of the memory (so the bound itself gets wider)." 
+						" [4]\n \n")
+	memory_group.add_argument("--fingerprints", dest="fingerprints", action="store_true", required=False, 
+						help="Key the clade counts by 128-bit clade fingerprints (the sum of per-taxon hashes)\n" 
+						"instead of bitmasks of every taxon, which take far less memory and time with very\n" 
+						"large taxon sets: each node's fingerprint is the sum of its children's, and a\n" 
+						"clade without the excluded taxon is one subtraction away. Two different clades\n" 
+						"sharing a fingerprint is possible but astronomically unlikely (about 2^-128 per\n" 
+						"pair); see --verify-fingerprints to rule it out. Not supported with --store,\n" 
+						"--max-memory, --sketch-memory, --consensus, --shard, sequential mode,\n" 
+						"approximate mode, or sets of 2+ removed taxa.\n \n")
+	memory_group.add_argument("--verify-fingerprints", dest="verify_fingerprints", action="store_true", required=False, 
+						help="With --fingerprints (implied), also check every jackknifed tree clade whose\n" 
+						"fingerprint is looked up when scoring against the exact clade expected under it,\n" 
+						"and stop with an error on any collision. This takes the bitmasks of every clade\n" 
+						"again (in time, not in the index's memory).\n \n")
+
+	# 	define output group options
+	addTreeOutputArguments(output_group)
+	#		convergence report
+	output_group.add_argument("--output-convergence", dest="output_convergence", metavar="convergence.tsv", action="store", type=str, required=False, default="convergence.tsv", 
+						help="With --tolerance, a tab-separated report with one line per taxon: the number of\n" 
+						"jackknifed trees read, the number after which the taxon converged (NA if it did\n" 
+						"not), and the widest interval remaining. Ignored (and not created) without\n" 
+						"--tolerance." 
+						" [convergence.tsv]\n \n") 
+	#		consensus trees
+	output_group.add_argument("--consensus", dest="consensus", metavar="majority", action="store", type=str, required=False, default=None, choices=("majority", "extended"), 
+						help="Also build consensus trees of the jackknifed trees from the clade counts gathered\n" 
+						"for scoring: \"majority\" (majority-rule; clades in more than half of the trees)\n" 
+						"or \"extended\" (then any other compatible clade, most frequent first). One tree\n" 
+						"is built per excluded taxon (from its jackknifed trees), and one overall (from\n" 
+						"all of them; a clade counts as found in a jackknifed tree if the tree has it with\n" 
+						"the excluded taxon removed). Each clade's frequency is stored as \"clade-frequency\"\n" 
+						"metadata. With -u/--unrooted, the trees are rooted at the first taxon (sorted).\n" 
+						"Not supported with --shard, --sample-fraction, or --sample-size.\n \n") 
+	#		support matrix
+	output_group.add_argument("--output-matrix", dest="output_matrix", metavar="matrix.tsv", action="store", type=str, required=False, default="", 
+						help="The support each scored node gets from each taxon's jackknifed trees: one line\n" 
+						"per node and taxon in the node's clade, with the tree number, node (its position\n" 
+						"in a depth first traversal, from 0), taxon, hits, total, and fraction (hits /\n" 
+						"total). The taxa outside a node's clade have no line. Comma-separated if the name\n" 
+						"ends in \".csv\", and a NumPy .npz file (one array per column, plus \"taxa\", which\n" 
+						"the \"taxon\" column indexes) if it ends in \".npz\". Not generated by default.\n" 
+						"Not supported with --shard, --sample-fraction, or --sample-size.\n \n") 
+	output_group.add_argument("--output-destabilizing", dest="output_destabilizing", metavar="destabilizing.tsv", action="store", type=str, required=False, default="", 
+						help="The taxa ranked by how much support the main tree loses without them: for each\n" 
+						"taxon, the number of scored nodes containing it, its mean fraction (see\n" 
+						"--output-matrix) over those nodes, and their sum of 1 - fraction (the rank).\n" 
+						"Not generated by default. Same restrictions as --output-matrix.\n \n") 
+	#		run store
+	output_group.add_argument("--store", dest="store", metavar="runs.sqlite", action="store", type=str, required=False, default=None, 
+						help="Also record this run in a SQLite database (created if needed): the arguments,\n" 
+						"the sha1 of every input file, and the clade, hits, total, and score of every scored\n" 
+						"node, indexed by run and by clade (so that, e.g., the nodes that scored below 0.7\n" 
+						"in any run are one query away). The clades of each jackknifed tree file are also\n" 
+						"cached in it by the file's contents, so later runs with the same taxa need not\n" 
+						"parse the file again. A run is recorded only once all of its nodes are scored. See\n" 
+						"runStore.py for the tables. Not supported with --shard,\n" 
+						"--sample-fraction, or --sample-size.\n \n") 
+	output_group.add_argument("--output-consensus", dest="output_consensus", metavar="consensus", action="store", type=str, required=False, default="consensus", 
+						help="With --consensus, the prefix of the consensus tree files: ${prefix}.nwk and\n" 
+						"${prefix}.json (overall), and ${prefix}-taxa.tsv (taxon and Newick tree, one line\n" 
+						"per taxon) and ${prefix}-taxa.json (per taxon)." 
+						" [consensus]\n \n") 
+
 	# 	define misc. group options
 	misc_group.add_argument("-c", "--cite", dest="display_citation", action="store_true", required=False,
 							help="Describe how to cite this program.\n \n")
@@ -174,41 +504,133 @@ def handleArgs():
 		sys.exit(0)
 	else: # don't display some info, don't quit (immediately)
 		# sanity check on input paths
-		if args.jack_tree_fofn is not None: # fofn is provided
-			p = Path(args.jack_tree_fofn)
-			if not (p.exists() and p.is_file()): # exists and is file?
-				raise CalcScoreException(f"ERROR: You provided -f \"{args.jack_tree_fofn}\", but it either did not exist or was not a regular file.")
-		else: # fofn not specificed
-			p = Path(args.jack_tree_dir)
+		validateMainTreeFiles(args)
+		validateJackknifeTreeInputs(args)
+
+		if args.tolerance is not None:
+			if not 0 < args.tolerance <= 1:
+				raise CalcScoreException(f"ERROR: --tolerance must be in the range (0,1], not {args.tolerance}.")
+			if not 0 < args.confidence < 1:
+				raise CalcScoreException(f"ERROR: --confidence must be in the range (0,1), not {args.confidence}.")
+
+		if args.sample_fraction is not None or args.sample_size is not None:
+			if args.sample_size is not None and args.sample_size < 1:
+				raise CalcScoreException(f"ERROR: --sample-size must be at least 1, not {args.sample_size}.")
+			if args.sample_size is None and not 0 < args.sample_fraction <= 1:
+				raise CalcScoreException(f"ERROR: --sample-fraction must be in the range (0,1], not {args.sample_fraction}.")
+
+		if args.shard is not None:
+			if args.output_partial is None:
+				args.output_partial = f"partial-{args.shard[0]}.tsv"
+			validateOutputFiles((args.output_partial,))
+
+		if args.workers < 1:
+			raise CalcScoreException(f"ERROR: -k/--workers must be at least 1, not {args.workers}.")
+		if args.verify_sample is not None:
+			if args.verify_sample < 1:
+				raise CalcScoreException(f"ERROR: --verify-sample must be at least 1, not {args.verify_sample}.")
+		if args.sketch_memory is not None:
+			if args.sketch_depth < 1:
+				raise CalcScoreException(f"ERROR: --sketch-depth must be at least 1, not {args.sketch_depth}.")
+		if args.verify_fingerprints:
+			args.fingerprints = True
+		checkIncompatibleOptions(args)
+		if args.store is not None:
+			validateOutputFiles((args.store,))
+		if args.scratch_dir is not None:
+			p = Path(args.scratch_dir)
 			if not (p.exists() and p.is_dir()): # exists and is dir?
-				raise CalcScoreException(f"ERROR: Problem with argument used for -t, \"{args.jack_tree_dir}\" either did not exist or was not a directory.")
+				raise CalcScoreException(f"ERROR: Problem with argument used for --scratch-dir, \"{args.scratch_dir}\" either did not exist or was not a directory.")
+		if args.consensus is not None:
+			validateOutputFiles([f"{args.output_consensus}{suffix}" for suffix in (".nwk", ".json", "-taxa.tsv", "-taxa.json")])
+		validateOutputFiles((args.output_matrix, args.output_destabilizing))
 
 		# sanity check on output files
-		for ofn in (args.output_nwk, args.output_json, args.output_json_pretty):
-			if ofn != '':
-				p = Path(ofn)
-				p = p.resolve()
-				if p.exists():
-					if not p.is_file():
-						raise CalcScoreException(f"ERROR: Output file \"{ofn}\" exists and is not a regular file. It cannot be\noverwritten since it is not a regular file.")
-				else:
-					d = p.parent
-					if d.exists():
-						if not d.is_dir():
-							raise CalcScoreException(f"ERROR: Output file \"{ofn}\" cannot be created because its theoretical parent\ndirectory already exists as a non-directory file.")
-					else:
-						d.mkdir(parents=True)
+		validateOutputFiles((args.output_nwk, args.output_json, args.output_json_pretty))
+		if args.tolerance is not None: # the convergence report is only written in sequential mode
+			validateOutputFiles((args.output_convergence,))
 
 
 	# return the parsed arguments object
 	return args
 
-def createTreeFromNewickFile(filename, treename):
+def createTreeFromNewickFile(filename, treename, namespace=None): # the file may also be NEXUS (see nexus.py), with one tree
+	if isNexusFile(filename):
+		trees = generateNexusTrees(filename, treename, namespace=namespace)
+		tree = next(trees)
+		if next(trees, None) is not None:
+			raise NexusException(f"ERROR: NEXUS file \"{filename}\" has more than one tree; expected one.")
+		return tree
+	nwk = ''
+	with open(filename, 'r') as ifd:
+		for line in ifd:
+			nwk += line.rstrip('\n')
+	return Tree(newick=nwk, name=treename, namespace=namespace)
+
+def splitNewickTrees(nwk): # returns list of newick strings, one per tree (i.e., per semi-colon)
+	nwks = []
+	start = 0
+	i = 0
+	while i < len(nwk):
+		if nwk[i] == '[': # skip comments
+			i = nwk.find(']', i)
+			if i == -1:
+				break
+		elif nwk[i] == '"' or nwk[i] == "'": # skip quoted labels
+			i = nwk.find(nwk[i], i + 1)
+			if i == -1:
+				break
+		elif nwk[i] == ';':
+			nwks.append(nwk[start:i+1])
+			start = i + 1
+		i += 1
+	if nwk[start:] and not nwk[start:].isspace():
+		nwks.append(nwk[start:]) # let Tree complain about the missing semi-colon
+	return nwks
+
+def createTreesFromNewickFile(filename, treename): # like createTreeFromNewickFile, but allows 1+ trees in the file
+	if isNexusFile(filename):
+		return list(generateNexusTrees(filename, treename))
 	nwk = ''
 	with open(filename, 'r') as ifd:
 		for line in ifd:
 			nwk += line.rstrip('\n')
-	return Tree(newick=nwk, name=treename)
+	nwks = splitNewickTrees(nwk)
+	if len(nwks) == 1:
+		return [Tree(newick=nwks[0], name=treename)]
+	return [Tree(newick=tree_nwk, name=f"{treename}-{i}") for i,tree_nwk in enumerate(nwks, start=1)]
+
+def createMainTrees(fns):
+	main_trees = []
+	for fn in fns:
+		try:
+			main_trees.extend(createTreesFromNewickFile(fn, "main"))
+		except MalformedNewickTree as e:
+			raise CalcScoreException(f"ERROR: failed to create Tree object(s) from main tree file \"{fn}\": {e}")
+		except NexusException as e:
+			raise CalcScoreException(f"{e}\n(main tree file: \"{fn}\")")
+
+	# name them by their position if there are multiple
+	if len(main_trees) > 1:
+		for i,mt in enumerate(main_trees, start=1):
+			mt.name = f"main-{i}"
+
+	# do all main trees have the same taxa?
+	taxa = sorted(main_trees[0].getLeafLabels())
+	for mt in main_trees[1:]:
+		if sorted(mt.getLeafLabels()) != taxa:
+			raise CalcScoreException(f"ERROR: All main trees must have the same taxa, but \"{mt.name}\" differs from\n\"{main_trees[0].name}\".")
+
+	return main_trees
+
+def isJackknifedTreeFileName(fn, tree_ext): # NEXUS files (.nex or .nexus) are always found, too
+	return re.match(r"tree-[0-9]+\.(?:" + re.escape(tree_ext) + r"|nex|nexus)\Z", fn) is not None # e.g., not "tree-3.nwk.tmp" or "tree-3.nwk~"
+
+def getRemovedTaxa(key): # e.g., "B,A" -> ("A", "B"); a key of taxa_x_fns names the taxon or taxa removed from its jackknifed trees
+	return tuple(sorted(taxon.strip() for taxon in key.split(',')))
+
+def getRemovalKey(key): # the same removed taxa always get the same key, e.g., "B, A" -> "A,B"
+	return ','.join(getRemovedTaxa(key))
 
 def getJackknifedTreesFileNames(tree_dir, tree_ext, trees_fofn):
 	taxa_x_fns = {}
@@ -216,21 +638,20 @@ def getJackknifedTreesFileNames(tree_dir, tree_ext, trees_fofn):
 		with open(trees_fofn, 'r') as ifd:
 			for line in ifd:
 				fields = line.rstrip('\n').split('\t')
-				taxon = fields[0]
+				taxon = getRemovalKey(fields[0])
 				fn = fields[1]
 				if not taxon in taxa_x_fns:
 					taxa_x_fns[taxon] = []
 				taxa_x_fns[taxon].append(fn)
 
 	else: # user did not specify the fofn
-		match_pattern = r"tree-[0-9]+\." + tree_ext
 		# we assume tree_dir exists and is a directory (handled during handleArgs)
 		d = Path(tree_dir)
 		for sd in d.iterdir(): # search for sub directories (one level, assume one dir per taxa)
 			if sd.is_dir(): # look only at dirs
-				taxon = sd.name
+				taxon = getRemovalKey(sd.name)
 				for f in sd.iterdir(): # search for files in the dir
-					if f.is_file() and re.match(match_pattern, f.name) is not None: # look only at files. they must match f"tree-\d+.{tree_ext}"
+					if f.is_file() and isJackknifedTreeFileName(f.name, tree_ext): # look only at files. they must match f"tree-\d+.{tree_ext}"
 						if not taxon in taxa_x_fns:
 							taxa_x_fns[taxon] = []
 						taxa_x_fns[taxon].append(str(f.resolve()))
@@ -261,21 +682,27 @@ def generateReplicatesHistogram(reps):
 	
 	return output
 
+def hasRemovalSets(taxa_x_fns): # true if any jackknifed trees were built without 2+ taxa
+	return any(len(getRemovedTaxa(key)) > 1 for key in taxa_x_fns.keys())
+
 def validateAndResolveJackknifedTrees(taxa_x_fns, taxa):
-	# are all taxa present in taxa_x_fns?
-	taxa_set = frozenset(list(taxa_x_fns.keys()))
+	# are all taxa present in taxa_x_fns (alone or in a set)?
+	taxa_set = frozenset(taxon for key in taxa_x_fns.keys() for taxon in getRemovedTaxa(key))
 	for taxon in taxa:
 		if not taxon in taxa_set:
 			raise CalcScoreException("ERROR: One or more taxa from the original/main tree were not present in the\njackknifed trees dir.")
 
 	# are all taxa in taxa_x_fns present in taxa?
 	taxa_set = frozenset(taxa)
-	for taxon in taxa_x_fns.keys():
-		if not taxon in taxa_set:
+	for key in taxa_x_fns.keys():
+		removed_taxa = getRemovedTaxa(key)
+		if not all(taxon in taxa_set for taxon in removed_taxa):
 			raise CalcScoreException("ERROR: One or more taxa from the jackknifed trees dir were not present in in the\noriginal/main tree.")
+		if len(frozenset(removed_taxa)) != len(removed_taxa):
+			raise CalcScoreException(f"ERROR: the set of removed taxa \"{key}\" names a taxon more than once.")
 	
-	# do all taxa have equal number of replicates?
-	reps = [len(taxa_x_fns[taxon]) for taxon in taxa_set]
+	# do all taxa (or sets of taxa) have equal number of replicates?
+	reps = [len(taxa_x_fns[key]) for key in taxa_x_fns.keys()]
 	first_len = reps[0]
 	if not all(rep == first_len for rep in reps):
 		hist = generateReplicatesHistogram(reps)
@@ -296,68 +723,256 @@ def validateAndResolveJackknifedTrees(taxa_x_fns, taxa):
 
 def sortJackknifedTrees(taxa_x_fns):
 	for taxon in taxa_x_fns.keys():
-		taxa_x_fns[taxon].sort(key=lambda x: int(re.sub(r"^.*(\d+).*$", r"\1", Path(x).stem)))
+		taxa_x_fns[taxon].sort(key=lambda x: int(re.sub(r"^\D*(\d+).*$", r"\1", Path(x).stem)))
+
+def parseJackknifedTreeFiles(jobs, namespace): # jobs: list of (taxon, i, fn); returns their trees
+	trees = []
+	for taxon,i,fn in jobs:
+		try:
+			trees.append(createTreeFromNewickFile(fn, f"{taxon}-{i}", namespace=namespace))
+		except (TaxonNamespaceException,NexusException) as e:
+			raise CalcScoreException(f"{e}\n(file: \"{fn}\")")
+		except:
+			raise CalcScoreException(f"ERROR: failed to create Tree object from newick tree file \"{fn}\" (taxon: {taxon})")
+	return trees
+
+def parseJackknifedTreeClades(jobs, taxa, pruned_main_hashes=None, unrooted=False): # runs in a worker thread or process; like parseJackknifedTreeFiles, but returns each tree's clades (see ReplicateIndex.addClades), or None for a tree whose topology hash is its taxon's in pruned_main_hashes (see ReplicateIndex.setMainTree)
+	clades = []
+	for (taxon,i,fn),tree in zip(jobs, parseJackknifedTreeFiles(jobs, TaxonNamespace(taxa))):
+		if pruned_main_hashes is not None and taxon in pruned_main_hashes and tree.getTopologyHash(unrooted=unrooted) == pruned_main_hashes[taxon]:
+			clades.append(None)
+		else:
+			clades.append(tree.getEachSubTreeIdMasks()) # the namespace's ids are the index's bit positions
+	return clades
+
+def parseJackknifedTreeFingerprints(jobs, taxa, with_clades=False): # runs in a worker thread or process; like parseJackknifedTreeClades, but returns each tree's (fingerprints, clades or None) (see FingerprintIndex.addFingerprints)
+	return [(tree.getEachSubTreeFingerprints(), tree.getEachSubTreeIdMasks() if with_clades else None) for tree in parseJackknifedTreeFiles(jobs, TaxonNamespace(taxa))] # the same taxa have the same fingerprints in any namespace
+
+def getJackknifedTreeJobs(taxa_x_fns): # (taxon, i, fn) for each jackknifed tree file
+	return [(taxon, i, fn) for taxon in taxa_x_fns.keys() for i,fn in enumerate(taxa_x_fns[taxon])]
+
+def buildJackknifedTreesFromFiles(taxa_x_fns, taxa, engine="serial", workers=1):
+	# the trees all share one copy of each taxon's label; with the thread engine, so do the
+	#	threads that parse them (the trees themselves are too big to send back from processes)
+	namespace = TaxonNamespace(taxa)
+	jobs = getJackknifedTreeJobs(taxa_x_fns)
+	if engine == "thread":
+		trees = []
+		with createPool(engine, workers) as pool:
+			chunks = getChunks(jobs, workers)
+			for chunk_trees in pool.map(parseJackknifedTreeFiles, chunks, [namespace] * len(chunks)):
+				trees.extend(chunk_trees)
+	else:
+		trees = parseJackknifedTreeFiles(jobs, namespace)
 
-def buildJackknifedTreesFromFiles(taxa_x_fns):
 	taxa_x_trees = {}
-	for taxon in taxa_x_fns.keys():
+	for (taxon,i,fn),tree in zip(jobs, trees):
 		if not taxon in taxa_x_trees:
 			taxa_x_trees[taxon] = []
-		fns = taxa_x_fns[taxon]
-		for i,fn in enumerate(fns):
-			try:
-				taxa_x_trees[taxon].append(createTreeFromNewickFile(fn, f"{taxon}-{i}"))
-			except:
-				raise CalcScoreException(f"ERROR: failed to create Tree object from newick tree file \"{fn}\" (taxon: {taxon})")
+		taxa_x_trees[taxon].append(tree)
 
 	return taxa_x_trees
 
-# ------------- MAIN ----------------------------- ||
-def main():
-	# handle the arguments
-	args = handleArgs()
+def addJackknifedTreeFromFile(index, taxon, fn, i): # index may be a ReplicateIndex or a SequentialScorer; taxon may be a set of taxa (see getRemovedTaxa) only for a ReplicateIndex
+	try:
+		tree = createTreeFromNewickFile(fn, f"{taxon}-{i}", namespace=index.namespace)
+	except (TaxonNamespaceException,NexusException) as e:
+		raise CalcScoreException(f"{e}\n(file: \"{fn}\")")
+	except:
+		raise CalcScoreException(f"ERROR: failed to create Tree object from newick tree file \"{fn}\" (taxon: {taxon})")
+	try:
+		removed_taxa = getRemovedTaxa(taxon)
+		if len(removed_taxa) > 1:
+			index.addTreeWithoutTaxa(removed_taxa, tree)
+		else:
+			index.addTree(taxon, tree)
+	except ReplicateIndexException as e:
+		raise CalcScoreException(f"{e}\n(file: \"{fn}\")")
 
-	# read in the main tree
-	mt = createTreeFromNewickFile(args.main_tree, "main")
+def addJackknifedTreeFromFileOrCache(index, taxon, fn, i, store): # like addJackknifedTreeFromFile, but the tree's clades are taken from (or put in) the store's cache
+	taxa_key = getTaxaKey(index.taxa)
+	clade_bytes = (len(index.taxa) + 7) // 8
+	clades = store.getCachedClades(fn, taxa_key, clade_bytes)
+	if clades is None:
+		try:
+			tree = createTreeFromNewickFile(fn, f"{taxon}-{i}", namespace=index.namespace)
+		except (TaxonNamespaceException,NexusException) as e:
+			raise CalcScoreException(f"{e}\n(file: \"{fn}\")")
+		except:
+			raise CalcScoreException(f"ERROR: failed to create Tree object from newick tree file \"{fn}\" (taxon: {taxon})")
+		clades = tree.getEachSubTreeIdMasks() # the namespace's ids are the index's bit positions
+		store.cacheClades(fn, taxa_key, clade_bytes, clades)
+	try:
+		index.addCladesWithoutTaxa(getRemovedTaxa(taxon), clades)
+	except ReplicateIndexException as e:
+		raise CalcScoreException(f"{e}\n(file: \"{fn}\")")
 
-	# get a list of taxa
-	taxa = sorted(mt.getLeafLabels())
+def verifyScores(main_trees, taxa_x_fns, taxa, sample_size, seed=None):
+	# re-scores a random sample of the (already scored) main tree nodes as Node.scoreResiliency,
+	#	the reference algorithm, does, but streaming: only the jackknifed trees that those nodes
+	#	need are read, one at a time, and each is checked only against the sampled nodes with its taxon
+	nodes = [] # (tree number, depth first position, node)
+	for tree_num,mt in enumerate(main_trees, start=1):
+		for i,node in mt.generateScoredNodes():
+			nodes.append((tree_num, i, node))
+	sample = sorted(random.Random(seed).sample(nodes, min(sample_size, len(nodes))), key=lambda item: item[:2])
 
-	# obtain list of jackknifed tree files mapped to taxa names
-	taxa_x_fns = getJackknifedTreesFileNames(args.jack_tree_dir, args.jack_tree_fn_ext, args.jack_tree_fofn)
-	
-	# validate and resolve jackknifed trees (paths, not tree objects)
-	validateAndResolveJackknifedTrees(taxa_x_fns, taxa) # side-effect (arg1), no change (arg2), no return
+	taxa_x_sampled = {} # maps each excluded taxon to the sampled nodes with it: (position in sample, the node's other taxa)
+	for j,(tree_num,i,node) in enumerate(sample):
+		labels = sorted(node.getLeafLabels())
+		for k,taxon in enumerate(labels):
+			taxa_x_sampled.setdefault(taxon, []).append((j, labels[:k] + labels[k+1:]))
 
-	# sort jackknifed trees (individually sort each path list) (arguably not necessary, but it feels nice)
-	sortJackknifedTrees(taxa_x_fns) # side-effect, no return
+	counts = [0] * len(sample)
+	totals = [0] * len(sample)
+	namespace = TaxonNamespace(taxa)
+	for taxon in sorted(taxa_x_sampled.keys()):
+		for i,fn in enumerate(taxa_x_fns[taxon]):
+			tree = parseJackknifedTreeFiles([(taxon, i, fn)], namespace)[0]
+			for j,included_taxa in taxa_x_sampled[taxon]:
+				totals[j] += 1
+				if tree.containsSubtreeBasedOnPreFetchedSetOfLeafLabels(included_taxa):
+					counts[j] += 1
+
+	mismatches = []
+	for (tree_num,i,node),count,total_possible in zip(sample, counts, totals):
+		score = node.metadata.get("taxa-resiliency")
+		node.setResiliencyScore(count, total_possible) # the reference score replaces the one being checked...
+		reference = node.metadata.get("taxa-resiliency")
+		if score is None: # ...so put it back
+			node.metadata.pop("taxa-resiliency", None)
+		else:
+			node.metadata["taxa-resiliency"] = score
+		if score != reference:
+			mismatches.append(f"\ttree {tree_num}, node {i} ({','.join(sorted(node.getLeafLabels()))}): {score} (reference: {reference})")
+	if mismatches:
+		raise CalcScoreException(f"ERROR: --verify-sample found {len(mismatches)} of {len(sample)} sampled nodes scored differently than\nthe reference algorithm:\n" + '\n'.join(mismatches))
+	sys.stderr.write(f"Verified {len(sample)} of {len(nodes)} scored nodes against the reference algorithm.\n")
 
-	# build jackknifed trees from file
-	taxa_x_trees = buildJackknifedTreesFromFiles(taxa_x_fns)
+def buildReplicateIndexFromFiles(taxa_x_fns, taxa, unrooted=False, max_memory=None, scratch_dir=None, store=None, engine="serial", workers=1, sketch_memory=None, sketch_depth=4, fingerprints=False, verify_trees=None, main_tree=None):
+	# each jackknifed tree is parsed (unless its clades are in the store's cache), summarized
+	#	into the index, and discarded (with max_memory, call index.finish() before scoring);
+	#	with sketch_memory, the index is a SketchIndex of that size; with fingerprints, it is a
+	#	FingerprintIndex, which checks for collisions with the clades of verify_trees, if given;
+	#	with main_tree, the trees with its topology (without their taxon) take the fast path
+	#	(see ReplicateIndex.setMainTree)
+	if sketch_memory is not None:
+		try:
+			index = SketchIndex(taxa, sketch_memory, depth=sketch_depth, unrooted=unrooted)
+		except ReplicateIndexException as e:
+			raise CalcScoreException(str(e))
+	elif fingerprints:
+		index = FingerprintIndex(taxa, unrooted=unrooted)
+		if verify_trees is not None:
+			try:
+				index.expectQueries(verify_trees)
+			except ReplicateIndexException as e:
+				raise CalcScoreException(str(e))
+	else:
+		index = ReplicateIndex(taxa, unrooted=unrooted, max_memory=max_memory, scratch_dir=scratch_dir)
+		if main_tree is not None:
+			index.setMainTree(main_tree)
+	if engine == "serial":
+		for taxon in taxa_x_fns.keys():
+			for i,fn in enumerate(taxa_x_fns[taxon]):
+				if store is not None:
+					addJackknifedTreeFromFileOrCache(index, taxon, fn, i, store)
+				else:
+					addJackknifedTreeFromFile(index, taxon, fn, i)
+	elif fingerprints:
+		# the workers parse the trees and return their fingerprints (and clades, to verify them)
+		jobs = getJackknifedTreeJobs(taxa_x_fns)
+		with createPool(engine, workers) as pool:
+			chunks = getChunks(jobs, workers)
+			parsed = (fps_clades for chunk_fps in pool.map(parseJackknifedTreeFingerprints, chunks, [taxa] * len(chunks), [index.isVerifying()] * len(chunks)) for fps_clades in chunk_fps)
+			for (taxon,i,fn),(fps,clades) in zip(jobs, parsed):
+				try:
+					index.addFingerprints(taxon, fps, clades)
+				except ReplicateIndexException as e:
+					raise CalcScoreException(f"{e}\n(file: \"{fn}\")")
+	else:
+		# the workers parse the trees (except those in the store's cache) and return their clades;
+		#	only this thread touches the index and the store, in the same order as above
+		taxa_key = getTaxaKey(taxa)
+		clade_bytes = (len(taxa) + 7) // 8
+		jobs = getJackknifedTreeJobs(taxa_x_fns)
+		to_parse = [job for job in jobs if store is None or not store.hasCachedClades(job[2], taxa_key)]
+		pruned_main_hashes = None
+		if main_tree is not None: # the workers only compare with them (the main tree stays here)
+			pruned_main_hashes = {taxon: index.getPrunedMainTreeHash(taxon) for taxon in taxa_x_fns.keys() if taxon in index.taxon_bits}
+		with createPool(engine, workers) as pool:
+			chunks = getChunks(to_parse, workers)
+			parsed = (clades for chunk_clades in pool.map(parseJackknifedTreeClades, chunks, [taxa] * len(chunks), [pruned_main_hashes] * len(chunks), [unrooted] * len(chunks)) for clades in chunk_clades)
+			num_parsed = 0
+			for taxon,i,fn in jobs:
+				if num_parsed < len(to_parse) and to_parse[num_parsed][2] == fn and to_parse[num_parsed][0] == taxon:
+					clades = next(parsed)
+					num_parsed += 1
+					if store is not None:
+						store.cacheClades(fn, taxa_key, clade_bytes, clades)
+				else:
+					clades = store.getCachedClades(fn, taxa_key, clade_bytes)
+				try:
+					if clades is None: # see parseJackknifedTreeClades
+						index.addPrunedMainTree(taxon)
+					else:
+						index.addCladesWithoutTaxa(getRemovedTaxa(taxon), clades)
+				except ReplicateIndexException as e:
+					raise CalcScoreException(f"{e}\n(file: \"{fn}\")")
+	if store is not None:
+		store.commit() # keep the cached clades, even if scoring fails later; the run is not recorded yet (see main)
 
-	# compare
-	mt.scoreResiliency(taxa_x_trees) # changes mt, but not taxa_x_trees
+	return index
+
+def writeFastPathReport(index):
+	sys.stderr.write(f"{index.getNumPrunedMainTrees()} of {index.getNumTrees()} jackknifed trees matched the main tree without their taxon (fast path).\n")
+
+def buildReplicateIndexSequentiallyFromFiles(taxa_x_fns, taxa, main_trees, tolerance, confidence, min_replicates, early_stop, unrooted=False):
+	# read replicate 1 of every taxon, then replicate 2 of every taxon, etc.
+	scorer = SequentialScorer(ReplicateIndex(taxa, unrooted=unrooted), main_trees, tolerance, confidence=confidence, min_replicates=min_replicates)
+	num_rounds = max(len(fns) for fns in taxa_x_fns.values())
+	for i in range(num_rounds):
+		for taxon in sorted(taxa_x_fns.keys()):
+			if early_stop and scorer.isConverged(taxon):
+				continue
+			if i < len(taxa_x_fns[taxon]):
+				addJackknifedTreeFromFile(scorer, taxon, taxa_x_fns[taxon][i], i)
+		if early_stop and scorer.allConverged():
+			break
+
+	return scorer
+
+def getOutputFileName(ofn, tree_num, num_trees): # e.g., out.nwk -> out-2.nwk when scoring several main trees
+	if not ofn or num_trees == 1:
+		return ofn
+	p = Path(ofn)
+	return str(p.with_name(f"{p.stem}-{tree_num}{p.suffix}"))
+
+def writeOutputs(mt, args, tree_num=1, num_trees=1):
+	output_json = getOutputFileName(args.output_json, tree_num, num_trees)
+	output_json_pretty = getOutputFileName(args.output_json_pretty, tree_num, num_trees)
+	output_mmd = getOutputFileName(args.output_mmd, tree_num, num_trees)
+	output_nwk = getOutputFileName(args.output_nwk, tree_num, num_trees)
 
-	# generate output
 	#	json
 	#		ugly
-	if args.output_json:
-		with open(args.output_json, 'w') as ofd:
+	if output_json:
+		with open(output_json, 'w') as ofd:
 			ofd.write(mt.getJson())
 
 	#		pretty
-	if args.output_json_pretty:
-		with open(args.output_json_pretty, 'w') as ofd:
+	if output_json_pretty:
+		with open(output_json_pretty, 'w') as ofd:
 			ofd.write(mt.getPrettyJson())
 
 	# 	mmd
-	if args.output_mmd:
-		with open(args.output_mmd, 'w') as ofd:
+	if output_mmd:
+		with open(output_mmd, 'w') as ofd:
 			ofd.write(mt.getMermaid(replace_internal=args.replace_internal_labels))
 
 	#	nwk
-	if args.output_nwk:
-		with open(args.output_nwk, 'w') as ofd:
+	if output_nwk:
+		with open(output_nwk, 'w') as ofd:
 			if args.replace_branch_len or args.replace_internal_labels:
 				if args.replace_branch_len:
 					mt.replaceBranchLenWithOtherValue("taxa-resiliency")
@@ -366,6 +981,129 @@ def main():
 				ofd.write(mt.getNewick())
 			else:
 				ofd.write(mt.getNewickWithCommentedMetadata())
+
+# ------------- MAIN ----------------------------- ||
+def main():
+	# hand off to a subcommand, if one was given
+	if len(sys.argv) > 1 and sys.argv[1] in __subcommands__:
+		subcommand = importlib.import_module(f".{__subcommands__[sys.argv[1]]}", __package__)
+		subcommand.main(sys.argv[2:])
+		return
+
+	# handle the arguments
+	args = handleArgs()
+
+	# read in the main tree(s)
+	main_trees = createMainTrees(args.main_trees)
+
+	# get a list of taxa
+	taxa = sorted(main_trees[0].getLeafLabels())
+
+	# obtain list of jackknifed tree files mapped to taxa names
+	taxa_x_fns = getJackknifedTreesFileNames(args.jack_tree_dir, args.jack_tree_fn_ext, args.jack_tree_fofn)
+	
+	# validate and resolve jackknifed trees (paths, not tree objects)
+	validateAndResolveJackknifedTrees(taxa_x_fns, taxa) # side-effect (arg1), no change (arg2), no return
+
+	# sort jackknifed trees (individually sort each path list) (arguably not necessary, but it feels nice)
+	sortJackknifedTrees(taxa_x_fns) # side-effect, no return
+
+	# sets of 2+ removed taxa are only known once the jackknifed trees are listed
+	if hasRemovalSets(taxa_x_fns):
+		checkIncompatibleOptions(args, removal_sets=True)
+
+	# where to parse the jackknifed trees and count the support of the main tree nodes (see engine.py)
+	engine = resolveEngine(args.engine, args.workers)
+
+	# shard mode writes only the partial counts of this shard's taxa (a set of taxa belongs
+	#	to the shard of its first taxon, so that each set is counted by exactly one shard)
+	if args.shard is not None:
+		shard, num_shards = args.shard
+		shard_taxa = frozenset(getShardTaxa(taxa, shard, num_shards))
+		shard_taxa_x_fns = {}
+		for key in taxa_x_fns.keys():
+			if getRemovedTaxa(key)[0] in shard_taxa:
+				shard_taxa_x_fns[key] = taxa_x_fns[key]
+		index = buildReplicateIndexFromFiles(shard_taxa_x_fns, taxa, unrooted=args.unrooted, max_memory=args.max_memory, scratch_dir=args.scratch_dir, engine=engine, workers=args.workers, main_tree=(main_trees[0] if args.fast_path else None))
+		if args.fast_path:
+			writeFastPathReport(index)
+		index.finish(index.getQueriedCladeKeys(main_trees))
+		partial = PartialCounts(shard, num_shards, unrooted=args.unrooted)
+		for tree_num,mt in enumerate(main_trees, start=1):
+			partial.addTree(tree_num, mt, index)
+		partial.write(args.output_partial)
+		return
+
+	# approximate mode works directly on the jackknifed trees (not on a summary of them)
+	if args.sample_fraction is not None or args.sample_size is not None:
+		taxa_x_trees = buildJackknifedTreesFromFiles(taxa_x_fns, taxa, engine=engine, workers=args.workers)
+		for tree_num,mt in enumerate(main_trees, start=1):
+			mt.scoreResiliency(taxa_x_trees, sample_fraction=args.sample_fraction, sample_size=args.sample_size, seed=args.seed, confidence=args.confidence) # changes mt, but not taxa_x_trees
+			writeOutputs(mt, args, tree_num=tree_num, num_trees=len(main_trees))
+		return
+
+	# open the run store (the run itself is recorded only once it is scored, see below)
+	store = None
+	if args.store is not None:
+		try:
+			store = RunStore(args.store)
+		except RunStoreException as e:
+			raise CalcScoreException(str(e))
+
+	# summarize jackknifed trees from file (once, no matter how many main trees)
+	z = None
+	if args.tolerance is not None: # sequential mode
+		scorer = buildReplicateIndexSequentiallyFromFiles(taxa_x_fns, taxa, main_trees, args.tolerance, args.confidence, args.min_replicates, args.early_stop, unrooted=args.unrooted)
+		index = scorer.index
+		z = scorer.z
+		if args.output_convergence:
+			with open(args.output_convergence, 'w') as ofd:
+				ofd.write(scorer.getConvergenceReport())
+	else:
+		index = buildReplicateIndexFromFiles(taxa_x_fns, taxa, unrooted=args.unrooted, max_memory=args.max_memory, scratch_dir=args.scratch_dir, store=store, engine=engine, workers=args.workers, sketch_memory=args.sketch_memory, sketch_depth=args.sketch_depth, fingerprints=args.fingerprints, verify_trees=(main_trees if args.verify_fingerprints else None), main_tree=(main_trees[0] if args.fast_path else None))
+		if args.fast_path:
+			writeFastPathReport(index)
+		index.finish(index.getQueriedCladeKeys(main_trees))
+
+	# consensus trees, from the same clade counts
+	if args.consensus is not None:
+		overall, taxa_x_consensus = getConsensusTrees(index, extended=(args.consensus == "extended"))
+		writeConsensusTrees(args.output_consensus, overall, taxa_x_consensus)
+
+	# compare and generate output
+	trees_node_counts = None
+	if engine != "serial":
+		trees_node_counts = getNodeCounts(main_trees, index, engine, args.workers)
+	for tree_num,mt in enumerate(main_trees, start=1):
+		if trees_node_counts is not None:
+			mt.scoreResiliencyFromCounts(trees_node_counts[tree_num-1], z=z) # the same scores, counted by the workers
+		else:
+			mt.scoreResiliencyWithIndex(index, z=z) # changes mt, but not index
+		if args.sketch_memory is not None:
+			index.addErrorBounds(mt)
+	if args.verify_fingerprints:
+		sys.stderr.write(f"Verified {index.num_verified} looked-up jackknifed tree clades against their fingerprints.\n")
+	if args.verify_sample is not None: # before anything is written
+		verifyScores(main_trees, taxa_x_fns, taxa, args.verify_sample, seed=args.seed)
+	matrix = None
+	if args.output_matrix or args.output_destabilizing:
+		matrix = SupportMatrixWriter(args.output_matrix, taxa)
+	if store is not None: # committed together with its nodes (see RunStore.close), so a failed run leaves no partial record
+		store.startRun(__version__, sys.argv[1:], args.unrooted, taxa)
+		store.addInputs(args.main_trees, taxa_x_fns)
+	for tree_num,mt in enumerate(main_trees, start=1):
+		if matrix is not None:
+			matrix.addTree(tree_num, mt, index)
+		if store is not None:
+			store.addTree(tree_num, mt, index)
+		writeOutputs(mt, args, tree_num=tree_num, num_trees=len(main_trees))
+	if store is not None:
+		store.close()
+	if matrix is not None:
+		matrix.close()
+		if args.output_destabilizing:
+			with open(args.output_destabilizing, 'w') as ofd:
+				ofd.write(matrix.getDestabilizingReport())
 	
 if __name__ == "__main__":
 	main()
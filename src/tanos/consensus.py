@@ -0,0 +1,125 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+from .node import Node
+from .tree import Tree
+from .replicateIndex import getPopCount
+
+# ---------- FUNCTIONS --------------------------- ||
+def isInformativeClade(clade, leaves, unrooted=False): # clade is a subset of leaves; single taxa and (rooted) the whole tree are not informative
+	if unrooted:
+		return getPopCount(clade) >= 2 and getPopCount(leaves ^ clade) >= 2
+	return getPopCount(clade) >= 2 and clade != leaves
+
+def getTaxonCladeFrequencies(index, taxon): # maps each informative clade of the taxon's jackknifed trees to the fraction of them containing it
+	leaves = index.all_taxa ^ index.taxon_bits[taxon]
+	num_reps = index.getNumReplicates(taxon)
+	clade_freqs = {}
+	for clade,count in index.taxa_x_clade_counts.get(taxon, {}).items():
+		if isInformativeClade(clade, leaves, unrooted=index.unrooted):
+			clade_freqs[clade] = count / num_reps
+	return clade_freqs
+
+def getOverallCladeFrequencies(index): # like getTaxonCladeFrequencies, but for clades of every taxon, over every jackknifed tree
+	# A jackknifed tree (without taxon u) agrees with clade K if it has the clade K - u (see
+	#	ReplicateIndex.getCladeKey). So each clade c of u's trees counts for K = c and
+	#	K = c + u (and, when unrooted, for the same with the other side of the split).
+	hits = {}
+	for taxon,clade_counts in index.taxa_x_clade_counts.items():
+		bit = index.taxon_bits[taxon]
+		leaves = index.all_taxa ^ bit
+		for clade,count in clade_counts.items():
+			if not isInformativeClade(clade, leaves, unrooted=index.unrooted):
+				continue
+			candidates = {clade, clade | bit}
+			if index.unrooted:
+				candidates.update((leaves ^ clade, (leaves ^ clade) | bit))
+			for candidate in candidates:
+				if index.unrooted and index.getCanonicalSplit(candidate, index.all_taxa) != candidate:
+					continue
+				if index.getCladeKey(taxon, candidate) == clade:
+					hits[candidate] = hits.get(candidate, 0) + count
+
+	# K's frequency is over the trees in which K - u is informative, which is every tree unless K
+	#	or its complement is tiny, so only the taxa of a tiny side need checking
+	num_reps = sum(index.taxa_x_num_reps.values())
+	clade_freqs = {}
+	for clade,count in hits.items():
+		if not isInformativeClade(clade, index.all_taxa, unrooted=index.unrooted):
+			continue
+		total_possible = num_reps
+		for side in (clade, index.all_taxa ^ clade):
+			if getPopCount(side) <= 3:
+				for taxon in index.getTaxaInClade(side):
+					leaves = index.all_taxa ^ index.taxon_bits[taxon]
+					if not isInformativeClade(index.getCladeKey(taxon, clade), leaves, unrooted=index.unrooted):
+						total_possible -= index.getNumReplicates(taxon)
+		if total_possible > 0:
+			clade_freqs[clade] = count / total_possible
+	return clade_freqs
+
+def getConsensusClades(clade_freqs, extended=False): # majority-rule: the clades in more than half of the trees; extended: then every other clade compatible with those already chosen, most frequent first
+	chosen = []
+	for clade in sorted(clade_freqs.keys(), key=lambda c: (-clade_freqs[c], c)):
+		if clade_freqs[clade] <= 0.5 and not extended:
+			break
+		if all(clade & other in (0, clade, other) for other in chosen): # nested or disjoint
+			chosen.append(clade)
+	return chosen
+
+def buildConsensusTree(index, clade_freqs, clades, leaves, name=""): # clades must be compatible; when unrooted, the tree is rooted at the lowest taxon in leaves
+	# build from the smallest clades up; top maps each taxon's bit to the largest node built so far containing it
+	top = {}
+	for taxon in index.getTaxaInClade(leaves):
+		node = Node()
+		node.label = taxon
+		top[index.taxon_bits[taxon]] = node
+	for clade in sorted(clades, key=lambda c: (getPopCount(c), c)):
+		node = Node()
+		freq = clade_freqs[clade]
+		node.metadata["clade-frequency"] = freq if freq < 1 else 1
+		adoptTopNodes(node, clade, top, index)
+	root = Node()
+	adoptTopNodes(root, leaves, top, index)
+	return Tree(name=name, root=root)
+
+def adoptTopNodes(node, clade, top, index): # makes the top nodes of clade's taxa node's children, and node their new top
+	adopted = set()
+	for taxon in index.getTaxaInClade(clade):
+		bit = index.taxon_bits[taxon]
+		child = top[bit]
+		if not id(child) in adopted:
+			adopted.add(id(child))
+			node.children.append(child)
+		top[bit] = node
+
+def getConsensusTrees(index, extended=False): # returns the overall consensus tree and a dict mapping each taxon to its consensus tree
+	clade_freqs = getOverallCladeFrequencies(index)
+	overall = buildConsensusTree(index, clade_freqs, getConsensusClades(clade_freqs, extended=extended), index.all_taxa, name="consensus")
+	taxa_x_consensus = {}
+	for taxon in index.taxa:
+		if index.getNumReplicates(taxon):
+			clade_freqs = getTaxonCladeFrequencies(index, taxon)
+			leaves = index.all_taxa ^ index.taxon_bits[taxon]
+			taxa_x_consensus[taxon] = buildConsensusTree(index, clade_freqs, getConsensusClades(clade_freqs, extended=extended), leaves, name=f"consensus-{taxon}")
+	return overall, taxa_x_consensus
+
+def writeConsensusTrees(prefix, overall, taxa_x_consensus):
+	# overall: ${prefix}.nwk and ${prefix}.json; per taxon: ${prefix}-taxa.tsv (taxon, Newick) and ${prefix}-taxa.json (taxon: tree)
+	with open(f"{prefix}.nwk", 'w') as ofd:
+		ofd.write(overall.getNewickWithCommentedMetadata())
+	with open(f"{prefix}.json", 'w') as ofd:
+		ofd.write(overall.getJson())
+	with open(f"{prefix}-taxa.tsv", 'w') as ofd:
+		for taxon,tree in taxa_x_consensus.items():
+			ofd.write(f"{taxon}\t{tree.getNewickWithCommentedMetadata()}")
+	with open(f"{prefix}-taxa.json", 'w') as ofd:
+		ofd.write('{' + ','.join(f'"{taxon}":{tree.getJson()}' for taxon,tree in taxa_x_consensus.items()) + '}')
+
+# ------------- MAIN ----------------------------- ||
+if __name__ == "__main__":
+	sys.stderr.write("ERROR: This is a module, it is meant to be imported -- not run directly!\n")
+	sys.exit(1)
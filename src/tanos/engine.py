@@ -0,0 +1,80 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+from concurrent.futures import ThreadPoolExecutor,ProcessPoolExecutor
+
+# Where the work that can be split (parsing the jackknifed trees, counting the
+# support of the main tree nodes) runs: "serial" (here), "thread" (threads that
+# share the one replicate index, without copying it; only faster on a
+# free-threaded build, e.g., python3.13t, running without the GIL), or
+# "process" (processes, which each get a copy of what they need). "auto" picks
+# "thread" when the GIL is off and "process" otherwise.
+ENGINES = ("auto", "serial", "thread", "process")
+
+# ----------- GLOBALS ---------------------------- ||
+# __worker_index__: the replicate index of a worker process (see createScoringPool)
+__worker_index__ = None
+
+# ---------- FUNCTIONS --------------------------- ||
+def isGilEnabled(): # false only on a free-threaded build running without the GIL
+	is_gil_enabled = getattr(sys, "_is_gil_enabled", None) # new in 3.13
+	return True if is_gil_enabled is None else is_gil_enabled()
+
+def resolveEngine(engine, workers): # returns "serial", "thread", or "process"
+	if workers <= 1 or engine == "serial":
+		return "serial"
+	if engine == "auto":
+		return "process" if isGilEnabled() else "thread"
+	return engine
+
+def createPool(engine, workers): # engine: "thread" or "process"
+	if engine == "thread":
+		return ThreadPoolExecutor(max_workers=workers)
+	return ProcessPoolExecutor(max_workers=workers)
+
+def createScoringPool(engine, workers, index): # a pool for countSupportOfClades; threads share index, processes get a copy each (once, not per task)
+	if engine == "thread":
+		return ThreadPoolExecutor(max_workers=workers)
+	return ProcessPoolExecutor(max_workers=workers, initializer=setWorkerIndex, initargs=(index,))
+
+def setWorkerIndex(index): # runs once in each worker process
+	global __worker_index__
+	__worker_index__ = index
+
+def countSupportOfClades(clades, index=None): # runs in a worker; returns index.countSupport of each clade (index is None in a worker process)
+	if index is None:
+		index = __worker_index__
+	return [index.countSupport(clade) for clade in clades]
+
+def getChunks(items, workers): # splits items into a few chunks per worker, so that each task is big enough to be worth sending but the work still evens out
+	size = max(1, len(items) // (workers * 4))
+	return [items[i:i+size] for i in range(0, len(items), size)]
+
+def getNodeCounts(main_trees, index, engine, workers): # returns, per main tree, a dict that maps each scored node's depth first position to index.countSupport(its clade) (see Tree.scoreResiliencyFromCounts)
+	jobs = [] # (tree position, node position, clade)
+	for t,mt in enumerate(main_trees):
+		clades = mt.getEachSubTreeBitmasks(index.taxon_bits)
+		for i,node in mt.generateScoredNodes():
+			clade = clades[i]
+			jobs.append((t, i, clade))
+	chunks = getChunks(jobs, workers)
+
+	trees_node_counts = [{} for mt in main_trees]
+	with createScoringPool(engine, workers, index) as pool:
+		if engine == "thread":
+			results = pool.map(countSupportOfClades, [[clade for t,i,clade in chunk] for chunk in chunks], [index] * len(chunks))
+		else:
+			results = pool.map(countSupportOfClades, [[clade for t,i,clade in chunk] for chunk in chunks])
+		for chunk,counts in zip(chunks, results):
+			for (t,i,clade),count in zip(chunk, counts):
+				trees_node_counts[t][i] = count
+	return trees_node_counts
+
+
+# ------------- MAIN ----------------------------- ||
+if __name__ == "__main__":
+	sys.stderr.write("ERROR: This is a module, it is meant to be imported -- not run directly!\n")
+	sys.exit(1)
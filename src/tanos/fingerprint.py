@@ -0,0 +1,172 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+from .taxonNamespace import FINGERPRINT_MASK
+from .replicateIndex import ReplicateIndex,ReplicateIndexException
+
+# ---------- FUNCTIONS --------------------------- ||
+
+# ----------- CLASSES ---------------------------- ||
+# A ReplicateIndex whose clade counts are keyed by 128-bit clade fingerprints
+# instead of bitmasks, which take len(taxa) bits each (e.g., 1.25 KB per clade
+# with 10k taxa). A clade's fingerprint is the sum (mod 2^128) of its taxa's
+# (see TaxonNamespace.getFingerprints), so each node's fingerprint is the sum of
+# its children's (see Tree.getEachSubTreeFingerprints) and the key of "clade
+# minus the excluded taxon" is one subtraction. In unrooted mode, a bipartition's
+# key is the smaller of the fingerprints of its two sides.
+#
+# Two different clades may (with a probability of about 2^-128 per pair) have
+# the same fingerprint, and so share a count. With verification (see
+# expectQueries), every clade added with its bitmask is checked against the
+# exact clade that scoring will look up under the same key, and any such
+# collision is an error.
+#
+# Sets of 2+ removed taxa and --max-memory are not supported (see
+# addCladesWithoutTaxa and spill), and the clades cannot be listed, e.g., for
+# consensus trees.
+class FingerprintIndex(ReplicateIndex):
+
+	# constructor(s)
+	def __init__(self, taxa, unrooted=False):
+		super().__init__(taxa, unrooted=unrooted)
+
+		# "normal" "public" member fields
+		#	taxon_fingerprints: the fingerprint of each taxon, indexed by its bit position
+		self.taxon_fingerprints = self.namespace.getFingerprints()
+		#	all_fingerprint: the fingerprint of the clade of every taxon
+		self.all_fingerprint = sum(self.taxon_fingerprints) & FINGERPRINT_MASK
+		#	num_verified: the number of clades checked against an expected exact clade
+		self.num_verified = 0
+
+		# "private" member fields
+		#	__expected: None (no verification), or maps each excluded taxon to a dict
+		#	that maps each key scoring will look up to its exact clade (see
+		#	ReplicateIndex.getCladeKey)
+		self.__expected = None
+
+	# "normal" "public" member functions
+	def isVerifying(self):
+		return self.__expected is not None
+
+	def expectQueries(self, trees): # turns on verification (before any tree is added) for the keys that scoring the trees looks up
+		self.__expected = {}
+		for tree in trees:
+			clades = tree.getEachSubTreeBitmasks(self.taxon_bits)
+			for i,node in tree.generateScoredNodes():
+				clade = clades[i]
+				fp = self.getFingerprint(clade)
+				for taxon in self.getTaxaInClade(clade):
+					key = self.__getKey__(fp, taxon)
+					exact = ReplicateIndex.getCladeKey(self, taxon, clade)
+					expected = self.__expected.setdefault(taxon, {})
+					if expected.get(key, exact) != exact:
+						raise ReplicateIndexException(f"ERROR: two clades of the main tree(s) have the same fingerprint (without taxon \"{taxon}\").")
+					expected[key] = exact
+
+	def addTree(self, excluded_taxon, tree):
+		if not excluded_taxon in self.taxon_bits:
+			raise ReplicateIndexException(f"ERROR: \"{excluded_taxon}\" is not a taxon in the original/main tree.")
+		if tree.namespace is not self.namespace: # e.g., built elsewhere; its bitmasks give its fingerprints, too
+			try:
+				clades = tree.getEachSubTreeBitmasks(self.taxon_bits)
+			except KeyError as e:
+				raise ReplicateIndexException(f"ERROR: jackknifed tree \"{tree.name}\" (taxon: {excluded_taxon}) has a leaf ({e}) that\nis not a taxon in the original/main tree.")
+			return self.addClades(excluded_taxon, clades)
+		self.addFingerprints(excluded_taxon, tree.getEachSubTreeFingerprints(), tree.getEachSubTreeIdMasks() if self.isVerifying() else None)
+
+	def addClades(self, excluded_taxon, clades): # clades: bitmasks, as for a ReplicateIndex (slower: each fingerprint is summed over the clade's taxa)
+		self.addFingerprints(excluded_taxon, [self.getFingerprint(clade) for clade in clades], clades)
+
+	def addFingerprints(self, excluded_taxon, fingerprints, clades=None): # like addClades, but with the tree's fingerprints (see Tree.getEachSubTreeFingerprints), and its clades only for verification
+		if not excluded_taxon in self.taxon_bits:
+			raise ReplicateIndexException(f"ERROR: \"{excluded_taxon}\" is not a taxon in the original/main tree.")
+		if self.unrooted:
+			leaves = fingerprints[-1] # the root's fingerprint
+			keys = [min(fp, (leaves - fp) & FINGERPRINT_MASK) for fp in fingerprints]
+		else:
+			keys = fingerprints
+		if self.__expected is not None and clades is not None:
+			self.__verify__(excluded_taxon, keys, clades)
+
+		if not excluded_taxon in self.taxa_x_clade_counts:
+			self.taxa_x_clade_counts[excluded_taxon] = {}
+			self.taxa_x_num_reps[excluded_taxon] = 0
+		clade_counts = self.taxa_x_clade_counts[excluded_taxon]
+		for key in frozenset(keys):
+			clade_counts[key] = clade_counts.get(key, 0) + 1
+		self.taxa_x_num_reps[excluded_taxon] += 1
+
+	def addCladesWithoutTaxa(self, excluded_taxa, clades):
+		if len(excluded_taxa) == 1:
+			return self.addClades(excluded_taxa[0], clades)
+		raise ReplicateIndexException("ERROR: jackknifed trees built without 2+ taxa cannot be added to a fingerprint index.")
+
+	def spill(self):
+		raise ReplicateIndexException("ERROR: a fingerprint index cannot be spilled to disk.")
+
+	def getFingerprint(self, clade): # the fingerprint of a clade (bitmask)
+		fp = 0
+		while clade:
+			bit = clade & -clade # lowest set bit
+			clade ^= bit
+			fp += self.taxon_fingerprints[bit.bit_length() - 1]
+		return fp & FINGERPRINT_MASK
+
+	def getCladeKey(self, excluded_taxon, clade): # key of (clade - excluded_taxon) in the excluded taxon's clade counts
+		return self.__getKey__(self.getFingerprint(clade), excluded_taxon)
+
+	def generateTaxonSupport(self, clade): # as for a ReplicateIndex, but the clade's fingerprint is summed only once
+		fp = self.getFingerprint(clade)
+		for taxon in self.getTaxaInClade(clade):
+			yield taxon, self.getCladeCount(taxon, self.__getKey__(fp, taxon)), self.taxa_x_num_reps.get(taxon, 0)
+
+	def getQueriedCladeKeys(self, trees): # as for a ReplicateIndex, but each clade's fingerprint is summed only once
+		queried = {}
+		for tree in trees:
+			clades = tree.getEachSubTreeBitmasks(self.taxon_bits)
+			for i,node in tree.generateScoredNodes():
+				clade = clades[i]
+				fp = self.getFingerprint(clade)
+				for taxon in self.getTaxaInClade(clade):
+					queried.setdefault(taxon, set()).add(self.__getKey__(fp, taxon))
+		return queried
+
+	# "private" member functions
+	def __getKey__(self, fp, excluded_taxon): # the key of (the clade with fingerprint fp) - excluded_taxon
+		taxon_fp = self.taxon_fingerprints[self.taxon_bits[excluded_taxon].bit_length() - 1]
+		key = (fp - taxon_fp) & FINGERPRINT_MASK
+		if self.unrooted: # the jackknifed trees are assumed to have every taxon but the excluded one
+			return min(key, (self.all_fingerprint - taxon_fp - key) & FINGERPRINT_MASK)
+		return key
+
+	def __verify__(self, excluded_taxon, keys, clades):
+		expected = self.__expected.get(excluded_taxon)
+		if not expected:
+			return
+		leaves = clades[-1] # the root's clade
+		for key,clade in zip(keys, clades):
+			exact = expected.get(key)
+			if exact is None:
+				continue
+			if self.unrooted:
+				clade = self.getCanonicalSplit(clade, leaves)
+			if clade != exact:
+				raise ReplicateIndexException(f"ERROR: fingerprint collision: the clades {{{','.join(self.getTaxaInClade(clade))}}} and\n{{{','.join(self.getTaxaInClade(exact))}}} have the same fingerprint (taxon: {excluded_taxon}).")
+			self.num_verified += 1
+
+	# make str(some_index) meaningful
+	def __str__(self):
+		return f'{{ taxa: {len(self.taxa)}, replicates: {self.getNumTrees()}, fingerprints: 128 bits, verifying: {self.isVerifying()}, unrooted: {self.unrooted} }}'
+
+	# make print(some_index) meaningful
+	def __repr__(self):
+		return "FingerprintIndex: " + self.__str__()
+
+
+# ------------- MAIN ----------------------------- ||
+if __name__ == "__main__":
+	sys.stderr.write("ERROR: This is a module, it is meant to be imported -- not run directly!\n")
+	sys.exit(1)
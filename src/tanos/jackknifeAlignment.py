@@ -0,0 +1,99 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+import os
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from .calcScore import CalcScoreException
+from .alignment import AlignmentException,readAlignment
+
+# ---------- FUNCTIONS --------------------------- ||
+def handleArgs(argv):
+	# define the argument parser
+	parser = argparse.ArgumentParser(prog=f"{Path(sys.argv[0]).name} jackknife-alignment", add_help=False, allow_abbrev=True,
+									formatter_class=argparse.RawTextHelpFormatter,
+									description="Write one leave-one-out alignment per taxon: ${taxon}.fa contains every sequence\n"
+									"in the original alignment except that taxon's. These are the input to the\n"
+									"jackknifed tree searches (see \"tanos run-jackknife\" or scripts/04-*).\n")
+
+	# define argument groups
+	input_group = parser.add_argument_group("Input Options", "These options affect how input files are found and/or interpreted.")
+	output_group = parser.add_argument_group("Output Options", "These options affect which and how output files are generated.")
+	misc_group = parser.add_argument_group("Misc. Options", "")
+
+	# 	define input group options
+	input_group.add_argument("-a", "--alignment", dest="alignment", metavar="path/to/aln.phy", action="store", type=str, required=False, default="data/orig/supermatrix_dna.phy",
+						help="The original alignment, in PHYLIP (interleaved or sequential, with names\n"
+						"separated from the sequences by whitespace) or FASTA format."
+						" [data/orig/supermatrix_dna.phy]\n \n")
+	input_group.add_argument("--format", dest="format", metavar="auto", action="store", type=str, required=False, default="auto",
+						choices=("auto", "fasta", "phylip", "phylip-interleaved", "phylip-sequential"),
+						help="The format of the alignment: auto, fasta, phylip, phylip-interleaved, or\n"
+						"phylip-sequential. \"auto\" looks for a leading \">\" (FASTA); PHYLIP is read as\n"
+						"interleaved and, if that fails, as sequential."
+						" [auto]\n \n")
+
+	# 	define output group options
+	output_group.add_argument("-o", "--output-dir", dest="output_dir", metavar="path/to/jackknife/aln/", action="store", type=str, required=False, default="data/jackknife/aln",
+						help="The directory for the leave-one-out alignments. It is created if needed."
+						" [data/jackknife/aln]\n \n")
+	output_group.add_argument("-z", "--gzip", dest="compress_level", metavar="level", action="store", type=int, required=False, default=None, nargs='?', const=6,
+						help="Compress the output files with gzip (${taxon}.fa.gz), optionally with a\n"
+						"compression level from 1 (fastest) to 9 (smallest). [6, when given]\n \n")
+	output_group.add_argument("-k", "--threads", dest="threads", metavar="int", action="store", type=int, required=False, default=os.cpu_count(),
+						help="The number of files written at the same time."
+						f" [{os.cpu_count()}]\n \n")
+
+	# 	define misc. group options
+	misc_group.add_argument("-h", "--help", action="help", help="Show this help message and exit.\n \n")
+
+	# parse the arguments
+	args = parser.parse_args(argv)
+
+	# sanity check on input and output paths
+	p = Path(args.alignment)
+	if not (p.exists() and p.is_file()): # exists and is file?
+		raise CalcScoreException(f"ERROR: You provided -a \"{args.alignment}\", but it either did not exist or was not a regular file.")
+	p = Path(args.output_dir)
+	if p.exists() and not p.is_dir():
+		raise CalcScoreException(f"ERROR: Output directory \"{args.output_dir}\" exists and is not a directory.")
+	if args.compress_level is not None and not 1 <= args.compress_level <= 9:
+		raise CalcScoreException(f"ERROR: the -z/--gzip level must be in the range [1,9], not {args.compress_level}.")
+	if args.threads < 1:
+		raise CalcScoreException(f"ERROR: -k/--threads must be at least 1, not {args.threads}.")
+
+	# return the parsed arguments object
+	return args
+
+def getJackknifedAlignmentFileName(output_dir, taxon, compressed=False):
+	return str(Path(output_dir) / (f"{taxon}.fa.gz" if compressed else f"{taxon}.fa"))
+
+# ------------- MAIN ----------------------------- ||
+def main(argv=None):
+	# handle the arguments
+	args = handleArgs(argv)
+
+	# read the whole alignment once
+	try:
+		aln = readAlignment(args.alignment, fmt=args.format)
+	except AlignmentException as e:
+		raise CalcScoreException(f"{e}\n(file: \"{args.alignment}\")")
+	sys.stderr.write(f"read {len(aln.names)} sequences of {aln.num_pos} positions\n")
+
+	# write the leave-one-out alignments; the writes (and compression) release the GIL, so threads suffice
+	Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+	compressed = args.compress_level is not None
+	with ThreadPoolExecutor(max_workers=args.threads) as pool:
+		futures = []
+		for i,taxon in enumerate(aln.names):
+			ofn = getJackknifedAlignmentFileName(args.output_dir, taxon, compressed=compressed)
+			futures.append(pool.submit(aln.writeWithout, i, ofn, compress_level=args.compress_level))
+		for future in futures:
+			future.result() # re-raises any error from writing
+
+if __name__ == "__main__":
+	main()
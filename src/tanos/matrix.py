@@ -0,0 +1,94 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+from .npy import NpzColumnWriter,getStringsNpy
+
+# ---------- FUNCTIONS --------------------------- ||
+
+# ----------- CLASSES ---------------------------- ||
+# Writes, for each scored node of each main tree and each taxon in the node's
+# clade, the support that taxon's jackknifed trees give the node: the hits and
+# totals that ReplicateIndex.countSupport adds up for the node's score. Nodes are
+# identified by tree number (1-based) and depth first traversal position (as in
+# the partial counts files of --shard). The matrix is sparse (taxa outside the
+# clade have no entry) and is written as it is computed, so only the per-taxon
+# summary is kept in memory. Formats, by file name:
+#	.tsv (or anything else) / .csv: tree, node, taxon, hits, total, fraction
+#	.npz: the same columns as arrays (taxon as an index into the "taxa" array)
+class SupportMatrixWriter:
+
+	COLUMNS = ("tree", "node", "taxon", "hits", "total", "fraction")
+
+	# constructor(s)
+	def __init__(self, filename, taxa):
+		# "normal" "public" member fields
+		self.filename = filename
+		self.taxa = sorted(taxa)
+		#	tree_taxa_x_summary: maps (tree number, taxon) to [number of nodes, sum of fractions]
+		self.tree_taxa_x_summary = {}
+
+		# "private" member fields
+		self.__taxon_ids = {taxon: i for i,taxon in enumerate(self.taxa)}
+		self.__npz = None
+		self.__ofd = None
+		if not filename:
+			pass
+		elif filename.endswith(".npz"):
+			self.__npz = NpzColumnWriter(filename, [("tree", 'i'), ("node", 'i'), ("taxon", 'i'), ("hits", 'i'), ("total", 'i'), ("fraction", 'd')])
+			self.__npz.addNpy("taxa", getStringsNpy(self.taxa))
+		else:
+			self.__sep = ',' if filename.endswith(".csv") else '\t'
+			self.__ofd = open(filename, 'w')
+			self.__ofd.write(self.__sep.join(SupportMatrixWriter.COLUMNS) + '\n')
+
+	# "normal" "public" member functions
+	def addTree(self, tree_num, tree, index):
+		clades = tree.getEachSubTreeBitmasks(index.taxon_bits)
+		for i,node in tree.generateScoredNodes():
+			clade = clades[i]
+			for taxon,count,num_reps in index.generateTaxonSupport(clade):
+				if not num_reps:
+					continue # nothing to compare against
+				fraction = count / num_reps
+				if self.__npz is not None:
+					self.__npz.append((tree_num, i, self.__taxon_ids[taxon], count, num_reps, fraction))
+				elif self.__ofd is not None:
+					self.__ofd.write(self.__sep.join((str(tree_num), str(i), taxon, str(count), str(num_reps), str(fraction))) + '\n')
+				summary = self.tree_taxa_x_summary.setdefault((tree_num, taxon), [0, 0.0])
+				summary[0] += 1
+				summary[1] += fraction
+
+	def close(self):
+		if self.__npz is not None:
+			self.__npz.close()
+		elif self.__ofd is not None:
+			self.__ofd.close()
+
+	def getDestabilizingReport(self): # tsv; per tree, the taxa ranked by how much support their removal cost (sum of 1 - fraction over their nodes)
+		lines = ["tree\trank\ttaxon\tnodes\tmean_support\tlost_support\n"]
+		for tree_num in sorted(frozenset(tree_num for tree_num,taxon in self.tree_taxa_x_summary.keys())):
+			rows = []
+			for (num,taxon),(num_nodes,total_fraction) in self.tree_taxa_x_summary.items():
+				if num == tree_num:
+					rows.append((num_nodes - total_fraction, taxon, num_nodes, total_fraction / num_nodes))
+			rows.sort(key=lambda row: (-row[0], row[1]))
+			for rank,(lost_support,taxon,num_nodes,mean_support) in enumerate(rows, start=1):
+				lines.append(f"{tree_num}\t{rank}\t{taxon}\t{num_nodes}\t{mean_support}\t{lost_support}\n")
+		return ''.join(lines)
+
+	# make str(some_writer) meaningful
+	def __str__(self):
+		return f'{{ filename: "{self.filename}", taxa: {len(self.taxa)} }}'
+
+	# make print(some_writer) meaningful
+	def __repr__(self):
+		return "SupportMatrixWriter: " + self.__str__()
+
+
+# ------------- MAIN ----------------------------- ||
+if __name__ == "__main__":
+	sys.stderr.write("ERROR: This is a module, it is meant to be imported -- not run directly!\n")
+	sys.exit(1)
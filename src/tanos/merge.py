@@ -0,0 +1,84 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+import argparse
+from pathlib import Path
+from .calcScore import CalcScoreException,addMainTreeArgument,addTreeOutputArguments,validateMainTreeFiles,validateOutputFiles,createMainTrees,writeOutputs
+from .shard import PartialCounts,ShardException,mergePartialCounts,getTreeChecksum
+
+# ---------- FUNCTIONS --------------------------- ||
+def handleArgs(argv):
+	# define the argument parser
+	parser = argparse.ArgumentParser(prog=f"{Path(sys.argv[0]).name} merge", add_help=False, allow_abbrev=True,
+									formatter_class=argparse.RawTextHelpFormatter,
+									description="Combine the partial counts files written by --shard into the final scored tree(s).\n"
+									"Every shard (1-N) must be provided exactly once, along with the same main tree(s)\n"
+									"that were given to each shard.\n")
+
+	# define argument groups
+	input_group = parser.add_argument_group("Input Options", "These options affect how input files are found and/or interpreted.")
+	output_group = parser.add_argument_group("Output Options", "These options affect which and how output files are generated. Specify an output"
+																" filename as \"\" to skip outputting it.")
+	misc_group = parser.add_argument_group("Misc. Options", "")
+
+	# 	define input group options
+	input_group.add_argument("partials", metavar="partial.tsv", nargs='+', type=str,
+						help="The partial counts files, one per shard.\n \n")
+	addMainTreeArgument(input_group)
+
+	# 	define output group options
+	addTreeOutputArguments(output_group)
+
+	# 	define misc. group options
+	misc_group.add_argument("-h", "--help", action="help", help="Show this help message and exit.\n \n")
+
+	# parse the arguments
+	args = parser.parse_args(argv)
+
+	# sanity check on input paths
+	validateMainTreeFiles(args)
+	for fn in args.partials:
+		p = Path(fn)
+		if not (p.exists() and p.is_file()): # exists and is file?
+			raise CalcScoreException(f"ERROR: partial counts file \"{fn}\" either did not exist or was not a regular file.")
+
+	# sanity check on output files
+	validateOutputFiles((args.output_nwk, args.output_json, args.output_json_pretty))
+
+	# return the parsed arguments object
+	return args
+
+# ------------- MAIN ----------------------------- ||
+def main(argv=None):
+	# handle the arguments
+	args = handleArgs(argv)
+
+	# read in the main tree(s)
+	main_trees = createMainTrees(args.main_trees)
+
+	# read in and add up the partial counts
+	try:
+		merged = mergePartialCounts([PartialCounts.read(fn) for fn in args.partials])
+	except ShardException as e:
+		raise CalcScoreException(str(e))
+
+	# are these the main trees the shards were scored against?
+	if len(merged.checksums) != len(main_trees):
+		raise CalcScoreException(f"ERROR: the shards were scored against {len(merged.checksums)} main tree(s), but {len(main_trees)} were provided.")
+	for tree_num,mt in enumerate(main_trees, start=1):
+		if merged.checksums.get(tree_num) != getTreeChecksum(mt):
+			raise CalcScoreException(f"ERROR: main tree \"{mt.name}\" differs from the one the shards were scored against.")
+
+	# score and generate output
+	for tree_num,mt in enumerate(main_trees, start=1):
+		node_counts = merged.getNodeCounts(tree_num)
+		if any(total_possible == 0 for count,total_possible in node_counts.values()):
+			raise CalcScoreException(f"ERROR: one or more nodes of main tree \"{mt.name}\" had no jackknifed trees in any shard.")
+		mt.scoreResiliencyFromCounts(node_counts) # changes mt
+		writeOutputs(mt, args, tree_num=tree_num, num_trees=len(main_trees))
+
+if __name__ == "__main__":
+	main()
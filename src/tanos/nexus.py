@@ -0,0 +1,165 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+import re
+from .tree import Tree
+
+# The trees of a NEXUS file are the TREE (or UTREE) statements of its TREES
+# block(s), each a Newick tree after "name =", e.g.,
+#	#NEXUS
+#	BEGIN TREES;
+#		TRANSLATE 1 Homo_sapiens, 2 Pan_troglodytes, 3 Gorilla_gorilla;
+#		TREE rep1 = [&U] ((1:0.1,2:0.2):0.05,3:0.3);
+#	END;
+# If there is a TRANSLATE table, the leaf labels are its keys (e.g., short
+# integers) rather than the taxa. Every other block and command is skipped.
+CHUNK_SIZE = 1 << 20
+NEXUS_SPECIAL_CHARS = re.compile(r"[;\['\"]")
+NEXUS_COMMAND = re.compile(r"\s*(?:(?:#NEXUS|\[[^\]]*\])\s*)*([A-Za-z]+)", re.IGNORECASE) # the first statement starts with "#NEXUS"
+NEXUS_TREE_NAME = re.compile(r"u?tree\s+(?:\*\s*)?('(?:[^']|'')*'|[^\s=]+)\s*=", re.IGNORECASE)
+NEXUS_TOKEN = re.compile(r"'((?:[^']|'')*)'|\"([^\"]*)\"|([^\s,]+)|(,)")
+
+# ---------- FUNCTIONS --------------------------- ||
+def isNexusFile(filename): # true if the file starts (after any whitespace) with "#NEXUS"
+	with open(filename, 'r') as ifd:
+		return ifd.read(1024).lstrip()[:6].upper() == "#NEXUS"
+
+def removeNexusComments(text):
+	return re.sub(r"\[[^\]]*\]", ' ', text)
+
+def generateNexusStatements(ifd): # yields each statement (without its semi-colon), reading a chunk of the file at a time
+	parts = []
+	closer = None # the character that ends the comment or quoted label that the chunk ended in, if any
+	for chunk in iter(lambda: ifd.read(CHUNK_SIZE), ''):
+		start = 0
+		i = 0
+		while True:
+			if closer is None:
+				m = NEXUS_SPECIAL_CHARS.search(chunk, i)
+				if m is None:
+					break
+				i = m.start()
+				if chunk[i] == ';':
+					parts.append(chunk[start:i])
+					yield ''.join(parts)
+					parts = []
+					start = i + 1
+				else:
+					closer = ']' if chunk[i] == '[' else chunk[i]
+				i += 1
+			else:
+				i = chunk.find(closer, i)
+				if i == -1:
+					break
+				closer = None
+				i += 1
+		parts.append(chunk[start:])
+	rest = ''.join(parts)
+	if rest and not rest.isspace():
+		yield rest # e.g., a last END without its semi-colon
+
+def parseTranslateTable(statement): # statement: the TRANSLATE command's entries, without comments; returns dict that maps each key to its taxon
+	tokens = []
+	for quoted,double_quoted,word,comma in NEXUS_TOKEN.findall(statement):
+		if comma:
+			tokens.append(None)
+		elif quoted:
+			tokens.append(quoted.replace("''", "'"))
+		else:
+			tokens.append(double_quoted or word)
+	key_x_taxon = {}
+	entry = []
+	for token in tokens + [None]:
+		if token is not None:
+			entry.append(token)
+			continue
+		if not entry:
+			continue
+		if len(entry) != 2:
+			raise NexusException(f"ERROR: malformed TRANSLATE entry \"{' '.join(entry)}\"; expected a key and a taxon.")
+		if entry[0] in key_x_taxon:
+			raise NexusException(f"ERROR: the TRANSLATE key \"{entry[0]}\" was given more than once.")
+		key_x_taxon[entry[0]] = entry[1]
+		entry = []
+	return key_x_taxon
+
+def generateNexusTrees(filename, treename, namespace=None): # yields the Tree of each TREE statement, one statement at a time; the trees are named after treename (and their position, if there are several)
+	pending = None # the previous statement's tree, which is named once we know whether it is the only one
+	num_trees = 0
+	in_trees_block = False
+	resolver = namespace # what the leaf labels are resolved with
+	with open(filename, 'r') as ifd:
+		for statement in generateNexusStatements(ifd):
+			m = NEXUS_COMMAND.match(statement)
+			if m is None:
+				continue
+			command = m.group(1).upper()
+			if command == "BEGIN":
+				words = removeNexusComments(statement[m.end():]).split()
+				in_trees_block = len(words) > 0 and words[0].upper() == "TREES"
+				resolver = namespace
+			elif command in ("END", "ENDBLOCK"):
+				in_trees_block = False
+			elif in_trees_block and command == "TRANSLATE":
+				resolver = TranslatedNamespace(parseTranslateTable(removeNexusComments(statement[m.end():])), namespace)
+			elif in_trees_block and command in ("TREE", "UTREE"):
+				m = NEXUS_TREE_NAME.match(statement, m.start(1))
+				if m is None:
+					raise NexusException(f"ERROR: malformed TREE statement in NEXUS file \"{filename}\"; expected \"TREE name = (...)\".")
+				if pending is not None:
+					pending.name = f"{treename}-{num_trees}"
+					yield pending
+				num_trees += 1
+				pending = Tree(newick=statement[m.end():] + ';', name=treename, namespace=resolver)
+				pending.namespace = namespace # the translated labels were resolved in namespace itself (see ReplicateIndex)
+	if pending is None:
+		raise NexusException(f"ERROR: NEXUS file \"{filename}\" has no TREE statements in a TREES block.")
+	if num_trees > 1:
+		pending.name = f"{treename}-{num_trees}"
+	yield pending
+
+# ----------- CLASSES ---------------------------- ||
+class NexusException(Exception):
+	pass
+
+# Resolves the leaf labels of a tree from a NEXUS file with a TRANSLATE table:
+# each key is translated to its taxon, which is resolved in namespace (a
+# TaxonNamespace, or None for the label alone) only once, however many trees
+# use the table. Labels that are not keys are taken as taxa.
+class TranslatedNamespace:
+
+	# constructor(s)
+	def __init__(self, key_x_taxon, namespace=None):
+		# "normal" "public" member fields
+		self.key_x_taxon = key_x_taxon
+		self.namespace = namespace
+
+		# "private" member fields
+		#	__resolved: maps each label resolved so far to (taxon id, label)
+		self.__resolved = {}
+
+	# "normal" "public" member functions
+	def resolve(self, label): # returns (taxon id or None, taxon), as TaxonNamespace.resolve does
+		resolved = self.__resolved.get(label)
+		if resolved is None:
+			taxon = self.key_x_taxon.get(label, label)
+			resolved = self.namespace.resolve(taxon) if self.namespace is not None else (None, taxon)
+			self.__resolved[label] = resolved
+		return resolved
+
+	# make str(some_namespace) meaningful
+	def __str__(self):
+		return f'{{ keys: {len(self.key_x_taxon)}, namespace: {self.namespace} }}'
+
+	# make print(some_namespace) meaningful
+	def __repr__(self):
+		return "TranslatedNamespace: " + self.__str__()
+
+
+# ------------- MAIN ----------------------------- ||
+if __name__ == "__main__":
+	sys.stderr.write("ERROR: This is a module, it is meant to be imported -- not run directly!\n")
+	sys.exit(1)
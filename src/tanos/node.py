@@ -4,6 +4,10 @@ __author__ = "Brandon Pickett"
 
 # ----------- IMPORTS ---------------------------- ||
 import sys
+import math
+import bisect
+from .stats import getWilsonInterval
+from .taxonNamespace import FINGERPRINT_MASK
 
 # ---------- FUNCTIONS --------------------------- ||
 
@@ -25,6 +29,9 @@ class Node:
 		self.children = []
 		#	label: used to store a taxon name for leaf Nodes or clade name for internal nodes
 		self.label = ""
+		#	taxon_id: the leaf's taxon id in the TaxonNamespace the tree was parsed
+		#	with (None for internal nodes or without a namespace)
+		self.taxon_id = None
 		#	metadata: Here we enable the storage
 		#	of multiple name value pairs.
 		#	The values can be numbers or strings.
@@ -44,16 +51,22 @@ class Node:
 		##	position in __subtree_leaf_scores
 		#self.__subtree_leaf_scores = []
 	
-	def initializeNode(self, newick, index=0):
+	def initializeNode(self, newick, index=0, namespace=None): # namespace: a TaxonNamespace to resolve the leaf labels with (optional)
 		# 1- conceptual str.lstrip() beginning at position index 
 		index = self.__consumeNewickWhitespace__(newick, index=index)
 
 		# 2- process children (recursively if neeeded)
-		while index < len(newick) and ( newick[index] == '(' or newick[index] == ',' ):
-			index += 1 # get past the recursive signal (left paren or comma)
-			self.children.append(Node())
-			index = self.children[-1].initializeNode(newick, index=index)
-			index = self.__consumeNewickWhitespace__(newick, index=index)
+		if index < len(newick) and newick[index] == '(':
+			while index < len(newick) and ( newick[index] == '(' or newick[index] == ',' ):
+				index += 1 # get past the recursive signal (left paren or comma)
+				self.children.append(Node())
+				index = self.children[-1].initializeNode(newick, index=index, namespace=namespace)
+				index = self.__consumeNewickWhitespace__(newick, index=index)
+			if index < len(newick) and newick[index] == ')':
+				index += 1 # get past the right paren that closes this node's children
+				index = self.__consumeNewickWhitespace__(newick, index=index)
+			else:
+				raise MalformedNewickTree("Reached end of tree (while processing a node's children) without encountering a right paren")
 
 		# 3- process label (quote or unquoted)
 		if index < len(newick):
@@ -67,6 +80,8 @@ class Node:
 				index = self.__consumeNewickWhitespace__(newick, index=index)
 		else:
 			raise MalformedNewickTree("Reached end of tree (while about to process a potential label) without encountering a semi-colon")
+		if namespace is not None and not self.children:
+			self.taxon_id, self.label = namespace.resolve(self.label)
 
 		# 4- process branch length
 		if index < len(newick):
@@ -77,12 +92,8 @@ class Node:
 
 		# 5- process end of node (possibly of entire tree)
 		if index < len(newick):
-			if newick[index] == ')':
-				index += 1 # get past the )
-				return index # position of char after )
-
-			elif newick[index] == ',' or newick[index] == ';':
-				return index # position of comma or semi-colon
+			if newick[index] == ')' or newick[index] == ',' or newick[index] == ';':
+				return index # position of right paren (closing the parent's children), comma, or semi-colon
 
 			else:
 				raise MalformedNewickTree("Reached what should have been the end of a node (and possibly the entire tree), but found a character other than a right paren, comma, or semi-colon")
@@ -211,6 +222,69 @@ class Node:
 			leaves.append(''.join(self.getLeafLabels()))
 		return leaves
 	
+	def getEachSubTreeBitmasks(self, taxon_bits): # returns list of bitmasks for each subtree (same order as getEachSubTreeLeafLabelSets), e.g., [ 0b001, 0b010, 0b011, 0b100, 0b111, ... ]
+		masks = []
+		if self.isLeaf():
+			masks.append(taxon_bits[self.label])
+		else:
+			mask = 0
+			for child in self.children:
+				child_masks = child.getEachSubTreeBitmasks(taxon_bits)
+				mask |= child_masks[-1] # the last one is always the child itself
+				masks.extend(child_masks)
+			masks.append(mask)
+		return masks
+
+	def getEachSubTreeIdMasks(self): # like getEachSubTreeBitmasks, but each leaf's bit is its taxon id (the tree must have been parsed with a TaxonNamespace)
+		if self.isLeaf():
+			return [1 << self.taxon_id]
+		masks = []
+		mask = 0
+		for child in self.children:
+			child_masks = child.getEachSubTreeIdMasks()
+			mask |= child_masks[-1] # the last one is always the child itself
+			masks.extend(child_masks)
+		masks.append(mask)
+		return masks
+
+	def getEachSubTreeFingerprints(self, fingerprints): # like getEachSubTreeIdMasks, but each subtree's fingerprint, the sum of its leaves' (fingerprints is indexed by taxon id; see TaxonNamespace.getFingerprints); constant work per node, whatever the number of taxa
+		if self.isLeaf():
+			return [fingerprints[self.taxon_id]]
+		fps = []
+		fp = 0
+		for child in self.children:
+			child_fps = child.getEachSubTreeFingerprints(fingerprints)
+			fp += child_fps[-1] # the last one is always the child itself
+			fps.extend(child_fps)
+		fps.append(fp & FINGERPRINT_MASK)
+		return fps
+
+	def getPruned(self, labels, namespace=None): # returns a copy of this subtree without the leaves in labels (a set), or None if no leaf is left; a node left with one child is replaced by it (branch lengths are added); namespace: resolve the copied leaves in it instead (see initializeNode)
+		if self.isLeaf():
+			if self.label in labels:
+				return None
+			node = Node()
+			node.taxon_id, node.label = namespace.resolve(self.label) if namespace is not None else (self.taxon_id, self.label)
+			node.metadata = dict(self.metadata)
+			return node
+		children = []
+		for child in self.children:
+			pruned_child = child.getPruned(labels, namespace)
+			if pruned_child is not None:
+				children.append(pruned_child)
+		if not children:
+			return None
+		if len(children) == 1 and len(self.children) > 1:
+			child = children[0]
+			if "branch_length" in child.metadata and "branch_length" in self.metadata:
+				child.metadata["branch_length"] += self.metadata["branch_length"]
+			return child
+		node = Node()
+		node.label = self.label
+		node.metadata = dict(self.metadata)
+		node.children = children
+		return node
+
 	def containsSubtreeBasedOnSetOfLeafLabels(self, node):
 		subtree_of_interest = sorted(node.getLeafLabels())
 		return self.containsSubtreeBasedOnPreFetchedSetOfLeafLabels(subtree_of_interest)
@@ -226,20 +300,70 @@ class Node:
 			yield from child.generateNodesViaDepthFirstTraversal()
 		yield self
 	
-	def scoreResiliency(self, taxa_x_trees, meaningful=True):
+	def scoreResiliency(self, taxa_x_trees, meaningful=True, rng=None, sample_fraction=None, sample_size=None, z=None):
+		count = 0
+		total_possible = 0
+		if meaningful and self.hasGrandChildren() and rng is not None: # approximate
+			count, total_possible = self.__sampleResiliency__(taxa_x_trees, rng, sample_fraction, sample_size, z)
+		elif meaningful and self.hasGrandChildren():
+			taxa = sorted(self.getLeafLabels())
+			for i in range(0, len(taxa), 1):
+				excluded_taxon = taxa[i]
+				included_taxa = taxa[:i] + taxa[i+1:]
+				total_possible += len(taxa_x_trees[excluded_taxon])
+				for tree in taxa_x_trees[excluded_taxon]:
+					if tree.containsSubtreeBasedOnPreFetchedSetOfLeafLabels(included_taxa):
+						count += 1
+		self.setResiliencyScore(count, total_possible, meaningful=meaningful)
+
+	def __sampleResiliency__(self, taxa_x_trees, rng, sample_fraction, sample_size, z):
+		# the population is every (excluded taxon, jackknifed tree) pair that the
+		# exact score would check; a random subset of them is checked instead
+		taxa = sorted(self.getLeafLabels())
+		bounds = [] # bounds[i]: number of pairs for taxa[0], ..., taxa[i]
+		population_size = 0
+		for taxon in taxa:
+			population_size += len(taxa_x_trees[taxon])
+			bounds.append(population_size)
+
+		if sample_size is not None:
+			num_samples = min(sample_size, population_size)
+		else:
+			num_samples = min(max(1, math.ceil(sample_fraction * population_size)), population_size)
+
+		count = 0
+		for pair in rng.sample(range(population_size), num_samples):
+			i = bisect.bisect_right(bounds, pair)
+			excluded_taxon = taxa[i]
+			tree = taxa_x_trees[excluded_taxon][pair - (bounds[i-1] if i else 0)]
+			if tree.containsSubtreeBasedOnPreFetchedSetOfLeafLabels(taxa[:i] + taxa[i+1:]):
+				count += 1
+
+		# report the interval (it has no width if every pair was checked)
+		if num_samples == population_size:
+			self.setResiliencyInterval(float(count) / num_samples, float(count) / num_samples)
+		else:
+			self.setResiliencyInterval(*getWilsonInterval(count, num_samples, z))
+		self.metadata["taxa-resiliency-samples"] = num_samples
+
+		return count, num_samples
+
+	def scoreResiliencyWithIndex(self, index, clade, meaningful=True, z=None): # clade is this node's bitmask (see getEachSubTreeBitmasks)
+		count = 0
+		total_possible = 0
+		if meaningful and self.hasGrandChildren():
+			count, total_possible = index.countSupport(clade)
+			if z is not None: # also report a confidence interval
+				self.setResiliencyInterval(*getWilsonInterval(count, total_possible, z))
+		self.setResiliencyScore(count, total_possible, meaningful=meaningful)
+
+	def setResiliencyScore(self, count, total_possible, meaningful=True):
 		score = 0
 		if meaningful: # root has no meaningful resiliency score
 			if self.hasGrandChildren():
-				taxa = sorted(self.getLeafLabels())
-				total_possible = 0
-				count = 0
-				for i in range(0, len(taxa), 1):
-					excluded_taxon = taxa[i]
-					included_taxa = taxa[:i] + taxa[i+1:]
-					total_possible += len(taxa_x_trees[excluded_taxon])
-					for tree in taxa_x_trees[excluded_taxon]:
-						if tree.containsSubtreeBasedOnPreFetchedSetOfLeafLabels(included_taxa):
-							count += 1
+				if not total_possible: # nothing to compare against (yet), e.g., see "tanos watch": no score, rather than 0
+					self.metadata.pop("taxa-resiliency", None)
+					return
 				score = float(count) / total_possible
 			else:
 				score = 1 # nodes that have _no_ grandchildren have no meaningful resiliency score
@@ -247,9 +371,15 @@ class Node:
 				score = int(score)
 		self.metadata["taxa-resiliency"] = score
 
+	def setResiliencyInterval(self, lower, upper):
+		self.metadata["taxa-resiliency-ci-lower"] = lower
+		self.metadata["taxa-resiliency-ci-upper"] = upper
+
 	def replaceBranchLenWithOtherValue(self, meta_key):
 		if meta_key in self.metadata:
 			self.metadata["branch_length"] = self.metadata[meta_key]
+		else:
+			self.metadata.pop("branch_length", None) # e.g., an unscored node; don't pass off its branch length as a score
 	
 	def replaceInternalLabelWithOtherValue(self, meta_key):
 		if self.hasChildren():
@@ -0,0 +1,93 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+import array
+import shutil
+import tempfile
+import zipfile
+
+# Just enough of NumPy's .npy (version 1.0) and .npz formats to write 1-D and
+# n-D arrays of numbers (and a 1-D array of strings) without needing NumPy.
+
+# ---------- FUNCTIONS --------------------------- ||
+def getNpyHeader(descr, shape): # descr: e.g., '<i4' or '<f8'
+	header = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': {tuple(shape)}, }}"
+	header += ' ' * (63 - (10 + len(header)) % 64) + '\n' # the data must start on a multiple of 64 bytes
+	return b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header.encode(encoding="latin1")
+
+def getNpyData(typecode, values): # typecode: an array module typecode, e.g., 'i' (int32) or 'd' (float64)
+	data = array.array(typecode, values)
+	if sys.byteorder != "little":
+		data.byteswap()
+	return data.tobytes()
+
+def writeNpy(filename, shape, values): # int32 values in C order
+	with open(filename, 'wb') as ofd:
+		ofd.write(getNpyHeader('<i4', shape))
+		ofd.write(getNpyData('i', values))
+
+def getStringsNpy(strings): # a 1-D array of unicode strings
+	max_len = max((len(s) for s in strings), default=1)
+	data = b''.join(s.ljust(max_len, '\0').encode(encoding="utf-32-le") for s in strings)
+	return getNpyHeader(f'<U{max_len}', (len(strings),)) + data
+
+# ----------- CLASSES ---------------------------- ||
+# Writes a .npz file whose 1-D arrays are appended to a bit at a time. Each array
+# is kept in a temporary file until close(), when its length (needed for the
+# header) is known, so memory use does not depend on the array lengths.
+class NpzColumnWriter:
+
+	# constructor(s)
+	def __init__(self, filename, columns): # columns: list of (name, typecode: 'i' or 'd'), e.g., [("node", 'i'), ("fraction", 'd')]
+		# "normal" "public" member fields
+		self.filename = filename
+		self.columns = list(columns)
+		self.length = 0
+
+		# "private" member fields
+		#	__buffers: the values appended since the last flush, per column
+		self.__buffers = [array.array(typecode) for name,typecode in self.columns]
+		#	__files: temporary files with the flushed values, per column
+		self.__files = [tempfile.TemporaryFile() for column in self.columns]
+		#	__extras: other (small) arrays to include, as complete .npy contents
+		self.__extras = []
+
+	# "normal" "public" member functions
+	def append(self, row): # one value per column
+		for buf,value in zip(self.__buffers, row):
+			buf.append(value)
+		self.length += 1
+		if len(self.__buffers[0]) >= 65536:
+			self.__flush__()
+
+	def addNpy(self, name, npy): # npy: the complete contents of a .npy file, e.g., from getStringsNpy
+		self.__extras.append((name, npy))
+
+	def close(self):
+		self.__flush__()
+		with zipfile.ZipFile(self.filename, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+			for (name,typecode),tmp in zip(self.columns, self.__files):
+				descr = '<i4' if typecode == 'i' else '<f8'
+				with zf.open(f"{name}.npy", 'w', force_zip64=True) as ofd:
+					ofd.write(getNpyHeader(descr, (self.length,)))
+					tmp.seek(0)
+					shutil.copyfileobj(tmp, ofd)
+				tmp.close()
+			for name,npy in self.__extras:
+				zf.writestr(f"{name}.npy", npy)
+
+	# "private" member functions
+	def __flush__(self):
+		for buf,tmp in zip(self.__buffers, self.__files):
+			if sys.byteorder != "little":
+				buf.byteswap()
+			tmp.write(buf.tobytes())
+			del buf[:]
+
+# ------------- MAIN ----------------------------- ||
+if __name__ == "__main__":
+	sys.stderr.write("ERROR: This is a module, it is meant to be imported -- not run directly!\n")
+	sys.exit(1)
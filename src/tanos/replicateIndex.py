@@ -0,0 +1,367 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+import heapq
+import tempfile
+from .taxonNamespace import TaxonNamespace
+
+# ---------- FUNCTIONS --------------------------- ||
+def getPopCount(bits): # the number of bits set, e.g., the number of taxa in a clade
+	return bin(bits).count('1')
+
+def parseMemorySize(size_str): # e.g., "512M" -> 536870912; a plain number is bytes
+	units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+	size_str = size_str.strip().upper().rstrip('B')
+	try:
+		if size_str and size_str[-1] in units:
+			return int(float(size_str[:-1]) * units[size_str[-1]])
+		return int(size_str)
+	except ValueError:
+		raise ReplicateIndexException(f"ERROR: expected a memory size like \"512M\" or \"4G\", but found \"{size_str}\".")
+
+def generateRunRecords(run, record_size): # yields each record of a run file (see ReplicateIndex.spill), in order
+	run.seek(0)
+	while True:
+		chunk = run.read(record_size * 8192)
+		if not chunk:
+			break
+		for i in range(0, len(chunk), record_size):
+			yield chunk[i:i+record_size]
+
+# ----------- CLASSES ---------------------------- ||
+class ReplicateIndexException(Exception):
+	pass
+
+class ReplicateIndex:
+
+	# class level variables (define once, not for every instance of the class)
+	#	ENTRY_BYTES: about how much memory a clade count takes, besides the clade
+	#	(an int) itself: its dict slot, hash table growth, and count
+	ENTRY_BYTES = 112
+
+	# constructor(s)
+	def __init__(self, taxa, unrooted=False, max_memory=None, scratch_dir=None):
+		# "normal" "public" member fields
+
+		#	taxa: every taxon in the main tree(s), sorted. A taxon's position in
+		#	this list is its bit position in a clade bitmask.
+		self.taxa = sorted(taxa)
+		#	taxon_bits: maps each taxon name to its bit (e.g., { "A": 0b001, "B": 0b010, ... })
+		self.taxon_bits = {}
+		for i,taxon in enumerate(self.taxa):
+			self.taxon_bits[taxon] = 1 << i
+		#	namespace: parse the jackknifed trees with it (see Tree) to share the
+		#	label strings and use the taxon ids (which are the bit positions)
+		#	instead of looking up each leaf's label in taxon_bits
+		self.namespace = TaxonNamespace(self.taxa)
+		#	all_taxa: bitmask with every taxon's bit set
+		self.all_taxa = (1 << len(self.taxa)) - 1
+		#	unrooted: if true, clades are stored as canonical bipartitions (see
+		#	getCanonicalSplit), so the root placement of a jackknifed tree does
+		#	not matter
+		self.unrooted = unrooted
+		#	taxa_x_clade_counts: maps each excluded taxon to a dict that maps
+		#	each clade (bitmask) to the number of that taxon's jackknifed trees
+		#	containing the clade. Each jackknifed tree counts a clade only once.
+		self.taxa_x_clade_counts = {}
+		#	taxa_x_num_reps: maps each excluded taxon to its number of jackknifed trees
+		self.taxa_x_num_reps = {}
+		#	removals_x_clade_counts: like taxa_x_clade_counts, but for the jackknifed
+		#	trees built without a set of 2+ taxa, keyed by the set's bitmask
+		self.removals_x_clade_counts = {}
+		#	removals_x_num_reps: maps each removed set (bitmask) to its number of jackknifed trees
+		self.removals_x_num_reps = {}
+		#	taxa_x_removals: maps each taxon to the removed sets (bitmasks) that
+		#	contain it, so that the sets overlapping a clade are found without
+		#	looking at every set
+		self.taxa_x_removals = {}
+		#	max_memory: if not None, the clade counts are written to sorted run files
+		#	(in scratch_dir, or the system's temporary directory) whenever they take
+		#	about this many bytes, and are only read back by finish()
+		self.max_memory = max_memory
+		self.scratch_dir = scratch_dir
+		#	taxa_x_num_pruned_main: maps each excluded taxon to its number of jackknifed
+		#	trees with the same topology as the main tree without it (see
+		#	setMainTree), which are counted once here instead of clade by clade
+		self.taxa_x_num_pruned_main = {}
+
+		# "private" member fields
+		#	__memory: about how many bytes the clade counts in memory take
+		self.__memory = 0
+		#	__runs: the run files written so far
+		self.__runs = []
+		#	__clade_bytes: the size of a clade in a run file
+		self.__clade_bytes = (len(self.taxa) + 7) // 8
+		#	__main_tree: the main tree, if set (see setMainTree), until finish()
+		self.__main_tree = None
+		#	__main_clades: the clades (bitmasks) of the main tree, if set
+		self.__main_clades = None
+		#	__pruned_main_hashes: maps each excluded taxon to the topology hash of the
+		#	main tree without it (see getPrunedMainTreeHash)
+		self.__pruned_main_hashes = {}
+
+	# "normal" "public" member functions
+	def setMainTree(self, tree): # turns on the fast path: a jackknifed tree with the topology of tree without its excluded taxon supports each of that tree's clades, so it is counted once (see addPrunedMainTree) instead of clade by clade; not for a SketchIndex or FingerprintIndex
+		self.__main_tree = tree
+		self.__main_clades = frozenset(tree.getEachSubTreeBitmasks(self.taxon_bits))
+		self.__pruned_main_hashes = {}
+
+	def getPrunedMainTreeHash(self, excluded_taxon): # the topology hash (see Tree.getTopologyHash) of the main tree without the taxon; computed only when first needed
+		pruned_hash = self.__pruned_main_hashes.get(excluded_taxon)
+		if pruned_hash is None:
+			pruned_hash = self.__main_tree.getPruned((excluded_taxon,), namespace=self.namespace).getTopologyHash(unrooted=self.unrooted)
+			self.__pruned_main_hashes[excluded_taxon] = pruned_hash
+		return pruned_hash
+
+	def addTree(self, excluded_taxon, tree):
+		if not excluded_taxon in self.taxon_bits:
+			raise ReplicateIndexException(f"ERROR: \"{excluded_taxon}\" is not a taxon in the original/main tree.")
+		if self.__main_tree is not None and tree.namespace is not None:
+			if tree.getTopologyHash(unrooted=self.unrooted) == self.getPrunedMainTreeHash(excluded_taxon):
+				return self.addPrunedMainTree(excluded_taxon)
+		try:
+			clades = tree.getEachSubTreeIdMasks() if tree.namespace is self.namespace else tree.getEachSubTreeBitmasks(self.taxon_bits)
+		except KeyError as e:
+			raise ReplicateIndexException(f"ERROR: jackknifed tree \"{tree.name}\" (taxon: {excluded_taxon}) has a leaf ({e}) that\nis not a taxon in the original/main tree.")
+		self.addClades(excluded_taxon, clades)
+
+	def addClades(self, excluded_taxon, clades): # like addTree, but with the tree's clades (as from Tree.getEachSubTreeBitmasks) instead, e.g., from a cache
+		if not excluded_taxon in self.taxon_bits:
+			raise ReplicateIndexException(f"ERROR: \"{excluded_taxon}\" is not a taxon in the original/main tree.")
+		if self.unrooted:
+			leaves = clades[-1] # the root's clade
+			clades = frozenset(self.getCanonicalSplit(clade, leaves) for clade in clades)
+		else:
+			clades = frozenset(clades)
+
+		if not excluded_taxon in self.taxa_x_clade_counts:
+			self.taxa_x_clade_counts[excluded_taxon] = {}
+			self.taxa_x_num_reps[excluded_taxon] = 0
+		clade_counts = self.taxa_x_clade_counts[excluded_taxon]
+		for clade in clades:
+			if clade in clade_counts:
+				clade_counts[clade] += 1
+			else:
+				clade_counts[clade] = 1
+				self.__memory += sys.getsizeof(clade) + ReplicateIndex.ENTRY_BYTES
+		self.taxa_x_num_reps[excluded_taxon] += 1
+		if self.max_memory is not None and self.__memory >= self.max_memory:
+			self.spill()
+
+	def addPrunedMainTree(self, excluded_taxon): # like addTree, but for a jackknifed tree with the topology of the main tree without the taxon (see setMainTree)
+		if not excluded_taxon in self.taxon_bits:
+			raise ReplicateIndexException(f"ERROR: \"{excluded_taxon}\" is not a taxon in the original/main tree.")
+		if not excluded_taxon in self.taxa_x_clade_counts:
+			self.taxa_x_clade_counts[excluded_taxon] = {}
+			self.taxa_x_num_reps[excluded_taxon] = 0
+		self.taxa_x_num_reps[excluded_taxon] += 1
+		self.taxa_x_num_pruned_main[excluded_taxon] = self.taxa_x_num_pruned_main.get(excluded_taxon, 0) + 1
+
+	def getNumPrunedMainTrees(self): # how many jackknifed trees took the fast path (see setMainTree)
+		return sum(self.taxa_x_num_pruned_main.values())
+
+	def spill(self): # writes the clade counts in memory to a new run file and forgets them
+		# a run is a sequence of fixed size records sorted by (taxon, clade): the taxon's
+		#	position in taxa (4 bytes), the clade (__clade_bytes), and the count (4 bytes),
+		#	all big-endian, so that the records sort as bytes
+		run = tempfile.TemporaryFile(dir=self.scratch_dir, prefix="tanos-run-")
+		buf = bytearray()
+		for taxon_id,taxon in enumerate(self.taxa):
+			clade_counts = self.taxa_x_clade_counts.get(taxon)
+			if not clade_counts:
+				continue
+			taxon_bytes = taxon_id.to_bytes(4, "big")
+			for clade in sorted(clade_counts.keys()):
+				buf += taxon_bytes + clade.to_bytes(self.__clade_bytes, "big") + clade_counts[clade].to_bytes(4, "big")
+				if len(buf) >= 1 << 20:
+					run.write(buf)
+					buf = bytearray()
+			clade_counts.clear()
+		run.write(buf)
+		self.__runs.append(run)
+		self.__memory = 0
+
+	def finish(self, queried=None): # merges the run files (if any) back into memory, keeping only the clades in queried (see getQueriedCladeKeys), if given
+		self.__main_tree = None # no more jackknifed trees to compare with it (its clades are kept)
+		if not self.__runs:
+			return
+		self.spill()
+		key_size = 4 + self.__clade_bytes
+		record_size = key_size + 4
+		wanted = None
+		if queried is not None:
+			wanted = set()
+			for taxon,clades in queried.items():
+				taxon_bytes = self.namespace.getId(taxon).to_bytes(4, "big")
+				for clade in clades:
+					wanted.add(taxon_bytes + clade.to_bytes(self.__clade_bytes, "big"))
+
+		# k-way merge; the records of a (taxon, clade) are next to each other, one per run at most
+		key = None
+		count = 0
+		for record in heapq.merge(*(generateRunRecords(run, record_size) for run in self.__runs)):
+			if record[:key_size] != key:
+				self.__addMergedCount__(key, count, wanted)
+				key = record[:key_size]
+				count = 0
+			count += int.from_bytes(record[key_size:], "big")
+		self.__addMergedCount__(key, count, wanted)
+
+		for run in self.__runs:
+			run.close()
+		self.__runs = []
+		self.max_memory = None # nothing more is expected, but do not spill what was just read back
+
+	def getQueriedCladeKeys(self, trees): # maps each taxon to the keys (see getCladeKey) that scoring the trees looks up
+		queried = {}
+		for tree in trees:
+			clades = tree.getEachSubTreeBitmasks(self.taxon_bits)
+			for i,node in tree.generateScoredNodes():
+				clade = clades[i]
+				for taxon in self.getTaxaInClade(clade):
+					queried.setdefault(taxon, set()).add(self.getCladeKey(taxon, clade))
+		return queried
+
+	def addTreeWithoutTaxa(self, excluded_taxa, tree): # a jackknifed tree built without every taxon in excluded_taxa
+		if len(excluded_taxa) == 1:
+			return self.addTree(excluded_taxa[0], tree)
+		for taxon in excluded_taxa:
+			if not taxon in self.taxon_bits:
+				raise ReplicateIndexException(f"ERROR: \"{taxon}\" is not a taxon in the original/main tree.")
+		try:
+			clades = tree.getEachSubTreeIdMasks() if tree.namespace is self.namespace else tree.getEachSubTreeBitmasks(self.taxon_bits)
+		except KeyError as e:
+			raise ReplicateIndexException(f"ERROR: jackknifed tree \"{tree.name}\" (taxa: {','.join(excluded_taxa)}) has a leaf ({e}) that\nis not a taxon in the original/main tree.")
+		self.addCladesWithoutTaxa(excluded_taxa, clades)
+
+	def addCladesWithoutTaxa(self, excluded_taxa, clades): # like addTreeWithoutTaxa, but with the tree's clades (see addClades)
+		if len(excluded_taxa) == 1:
+			return self.addClades(excluded_taxa[0], clades)
+		for taxon in excluded_taxa:
+			if not taxon in self.taxon_bits:
+				raise ReplicateIndexException(f"ERROR: \"{taxon}\" is not a taxon in the original/main tree.")
+		removed = self.getBitmask(excluded_taxa)
+		if self.unrooted:
+			leaves = clades[-1] # the root's clade
+			clades = frozenset(self.getCanonicalSplit(clade, leaves) for clade in clades)
+		else:
+			clades = frozenset(clades)
+
+		if not removed in self.removals_x_clade_counts:
+			self.removals_x_clade_counts[removed] = {}
+			self.removals_x_num_reps[removed] = 0
+			for taxon in excluded_taxa:
+				self.taxa_x_removals.setdefault(taxon, []).append(removed)
+		clade_counts = self.removals_x_clade_counts[removed]
+		for clade in clades:
+			clade_counts[clade] = clade_counts.get(clade, 0) + 1
+		self.removals_x_num_reps[removed] += 1
+
+	def addTrees(self, taxa_x_trees):
+		for taxon in taxa_x_trees.keys():
+			for tree in taxa_x_trees[taxon]:
+				self.addTree(taxon, tree)
+
+	def getNumReplicates(self, excluded_taxon):
+		return self.taxa_x_num_reps.get(excluded_taxon, 0)
+
+	def getNumTrees(self): # every jackknifed tree, whether built without one taxon or several
+		return sum(self.taxa_x_num_reps.values()) + sum(self.removals_x_num_reps.values())
+
+	def getCladeCount(self, excluded_taxon, clade):
+		count = self.taxa_x_clade_counts.get(excluded_taxon, {}).get(clade, 0)
+		num_pruned_main = self.taxa_x_num_pruned_main.get(excluded_taxon)
+		if num_pruned_main and self.__isPrunedMainClade__(excluded_taxon, clade):
+			count += num_pruned_main
+		return count
+
+	def getBitmask(self, leaf_labels):
+		mask = 0
+		for label in leaf_labels:
+			mask |= self.taxon_bits[label]
+		return mask
+
+	def getTaxaInClade(self, clade): # returns list of taxa (sorted) whose bits are set in clade
+		taxa = []
+		while clade:
+			bit = clade & -clade # lowest set bit
+			clade ^= bit
+			taxa.append(self.taxa[bit.bit_length() - 1])
+		return taxa
+
+	def getCanonicalSplit(self, clade, leaves): # the side of the bipartition (clade | leaves - clade) without the lowest taxon in leaves
+		reference_taxon = leaves & -leaves
+		if clade & reference_taxon:
+			return leaves ^ clade
+		return clade
+
+	def getCladeKey(self, excluded_taxon, clade): # key of (clade - excluded_taxon) in the excluded taxon's clade counts
+		bit = self.taxon_bits[excluded_taxon]
+		if self.unrooted: # the jackknifed trees are assumed to have every taxon but the excluded one
+			return self.getCanonicalSplit(clade & ~bit, self.all_taxa ^ bit)
+		return clade & ~bit
+
+	def generateTaxonSupport(self, clade): # yields (taxon, count, num_reps) for each taxon in clade; these add up to countSupport
+		for taxon in self.getTaxaInClade(clade):
+			yield taxon, self.getCladeCount(taxon, self.getCladeKey(taxon, clade)), self.taxa_x_num_reps.get(taxon, 0)
+
+	def generateRemovalSupport(self, clade): # like generateTaxonSupport, but yields (removed set, count, num_reps) for each removed set of 2+ taxa overlapping clade
+		# each overlapping set is found once per taxon it shares with clade, and used only from
+		#	the lowest of them, so the cost follows the number of overlapping sets (not of all sets)
+		remaining = clade
+		while remaining:
+			bit = remaining & -remaining # lowest set bit
+			remaining ^= bit
+			for removed in self.taxa_x_removals.get(self.taxa[bit.bit_length() - 1], ()):
+				overlap = removed & clade
+				if overlap & -overlap != bit:
+					continue # already used from a lower taxon
+				leaves = self.all_taxa ^ removed
+				key = clade & leaves
+				if getPopCount(key) < 2 or (getPopCount(leaves ^ key) < 2 if self.unrooted else key == leaves):
+					continue # too little of the clade (or of the rest) is left for these trees to say anything about it
+				if self.unrooted: # the jackknifed trees are assumed to have every taxon but the removed ones
+					key = self.getCanonicalSplit(key, leaves)
+				yield removed, self.removals_x_clade_counts[removed].get(key, 0), self.removals_x_num_reps[removed]
+
+	def countSupport(self, clade): # returns (count, total_possible) as in Node.scoreResiliency
+		count = 0
+		total_possible = 0
+		for taxon,taxon_count,num_reps in self.generateTaxonSupport(clade):
+			total_possible += num_reps
+			count += taxon_count
+		for removed,removed_count,num_reps in self.generateRemovalSupport(clade):
+			total_possible += num_reps
+			count += removed_count
+		return count, total_possible
+
+	# "private" member functions
+	def __isPrunedMainClade__(self, excluded_taxon, clade): # true if clade (a key, see getCladeKey) is in the main tree without the taxon
+		bit = self.taxon_bits[excluded_taxon]
+		if self.unrooted: # either side of the bipartition may be the clade in the (rooted) main tree
+			other_side = (self.all_taxa ^ bit) ^ clade
+			return clade in self.__main_clades or clade | bit in self.__main_clades or other_side in self.__main_clades or other_side | bit in self.__main_clades
+		return clade in self.__main_clades or clade | bit in self.__main_clades
+
+	def __addMergedCount__(self, key, count, wanted):
+		if key is None or (wanted is not None and not key in wanted):
+			return
+		taxon = self.taxa[int.from_bytes(key[:4], "big")]
+		self.taxa_x_clade_counts[taxon][int.from_bytes(key[4:], "big")] = count
+
+	# make str(some_index) meaningful
+	def __str__(self):
+		return f'{{ taxa: {len(self.taxa)}, replicates: {self.getNumTrees()}, removed sets: {len(self.taxa_x_num_reps) + len(self.removals_x_num_reps)}, unrooted: {self.unrooted} }}'
+
+	# make print(some_index) meaningful
+	def __repr__(self):
+		return "ReplicateIndex: " + self.__str__()
+
+
+# ------------- MAIN ----------------------------- ||
+if __name__ == "__main__":
+	sys.stderr.write("ERROR: This is a module, it is meant to be imported -- not run directly!\n")
+	sys.exit(1)
@@ -0,0 +1,212 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+import os
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from .calcScore import CalcScoreException,addMainTreeArgument,addJackknifeTreeArguments,validateMainTreeFiles,validateJackknifeTreeInputs,validateOutputFiles,createMainTrees,createTreeFromNewickFile,getJackknifedTreesFileNames,validateAndResolveJackknifedTrees,sortJackknifedTrees,hasRemovalSets
+from .replicateIndex import ReplicateIndex,getPopCount
+from .npy import writeNpy
+
+# ---------- FUNCTIONS --------------------------- ||
+def handleArgs(argv):
+	# define the argument parser
+	parser = argparse.ArgumentParser(prog=f"{Path(sys.argv[0]).name} rf", add_help=False, allow_abbrev=True,
+									formatter_class=argparse.RawTextHelpFormatter,
+									description="Compute Robinson-Foulds (RF) distances: between each jackknifed tree and the main\n"
+									"tree (with the excluded taxon pruned from it) and, optionally, between every pair\n"
+									"of jackknifed trees of the same excluded taxon. The RF distance is the number of\n"
+									"clades (or, with -u, bipartitions) found in only one of the two trees; clades of\n"
+									"one taxon or of every taxon are not counted.\n")
+
+	# define argument groups
+	input_group = parser.add_argument_group("Input Options", "These options affect how input files are found and/or interpreted.")
+	output_group = parser.add_argument_group("Output Options", "These options affect which and how output files are generated. Files whose\n"
+																"names end in \".npy\" are written as NumPy arrays instead of tab-separated values.")
+	misc_group = parser.add_argument_group("Misc. Options", "")
+
+	# 	define input group options
+	addMainTreeArgument(input_group)
+	addJackknifeTreeArguments(input_group)
+	input_group.add_argument("-u", "--unrooted", dest="unrooted", action="store_true", required=False,
+						help="Compare bipartitions instead of clades, so that where the trees are rooted does not\n"
+						"matter.\n \n")
+
+	# 	define output group options
+	output_group.add_argument("-o", "--output", dest="output", metavar="rf.tsv", action="store", type=str, required=False, default="rf.tsv",
+						help="The distances between each jackknifed tree and the main tree. As tsv: one line per\n"
+						"jackknifed tree with the taxon, replicate number (1-based, in file name order),\n"
+						"file, RF distance, and normalized RF distance (RF divided by the number of\n"
+						"clades in both trees). As npy: an int32 matrix with one row per taxon (sorted) and\n"
+						"one column per replicate, padded with -1."
+						" [rf.tsv]\n \n")
+	output_group.add_argument("-a", "--all-pairs", dest="output_pairs", metavar="rf-pairs.tsv", action="store", type=str, required=False, default="",
+						help="Also compute the distances between every pair of jackknifed trees of the same\n"
+						"taxon. As tsv: one line per pair with the taxon, both replicate numbers, and the\n"
+						"RF distance. As npy: an int32 array of shape (taxa, replicates, replicates),\n"
+						"padded with -1. Not computed by default.\n \n")
+	output_group.add_argument("-k", "--processes", dest="processes", metavar="int", action="store", type=int, required=False, default=os.cpu_count(),
+						help="The number of taxa processed at the same time."
+						f" [{os.cpu_count()}]\n \n")
+
+	# 	define misc. group options
+	misc_group.add_argument("-h", "--help", action="help", help="Show this help message and exit.\n \n")
+
+	# parse the arguments
+	args = parser.parse_args(argv)
+
+	# sanity check on input paths
+	validateMainTreeFiles(args)
+	validateJackknifeTreeInputs(args)
+	if args.processes < 1:
+		raise CalcScoreException(f"ERROR: -k/--processes must be at least 1, not {args.processes}.")
+
+	# sanity check on output files
+	validateOutputFiles((args.output, args.output_pairs))
+
+	# return the parsed arguments object
+	return args
+
+def getInformativeClades(masks, index, excluded_taxon_bit=0): # the set of clades (or canonical splits) from getEachSubTreeBitmasks, without the excluded taxon
+	leaves = masks[-1] & ~excluded_taxon_bit
+	num_leaves = getPopCount(leaves)
+	max_size = num_leaves - 2 if index.unrooted else num_leaves - 1
+	clades = set()
+	for mask in masks:
+		mask &= ~excluded_taxon_bit
+		if index.unrooted:
+			mask = index.getCanonicalSplit(mask, leaves)
+		if 2 <= getPopCount(mask) <= max_size:
+			clades.add(mask)
+	return clades
+
+def computeTaxonDistances(taxon, fns, taxa, main_tree_masks, unrooted, all_pairs): # runs in a worker process
+	index = ReplicateIndex(taxa, unrooted=unrooted) # for its taxon bits and canonical splits only
+	excluded_taxon_bit = index.taxon_bits[taxon]
+	expected_leaves = main_tree_masks[-1] & ~excluded_taxon_bit
+	main_clades = getInformativeClades(main_tree_masks, index, excluded_taxon_bit=excluded_taxon_bit)
+
+	# each distinct clade gets a bit, and each tree becomes a bitset of its clades; the RF
+	#	distance between two trees is then the number of bits set in their XOR
+	clade_bits = {}
+	def getCladeSet(clades):
+		clade_set = 0
+		for clade in clades:
+			if not clade in clade_bits:
+				clade_bits[clade] = 1 << len(clade_bits)
+			clade_set |= clade_bits[clade]
+		return clade_set
+
+	main_clade_set = getCladeSet(main_clades)
+	rep_clade_sets = []
+	distances = []
+	for i,fn in enumerate(fns):
+		try:
+			masks = createTreeFromNewickFile(fn, f"{taxon}-{i}").getEachSubTreeBitmasks(index.taxon_bits)
+		except KeyError as e:
+			raise CalcScoreException(f"ERROR: jackknifed tree \"{fn}\" (taxon: {taxon}) has a leaf ({e}) that is not a taxon in the\noriginal/main tree.")
+		except Exception:
+			raise CalcScoreException(f"ERROR: failed to create Tree object from newick tree file \"{fn}\" (taxon: {taxon})")
+		if masks[-1] != expected_leaves:
+			raise CalcScoreException(f"ERROR: jackknifed tree \"{fn}\" (taxon: {taxon}) does not have exactly the taxa of the main\ntree without \"{taxon}\".")
+		rep_clades = getInformativeClades(masks, index)
+		rep_clade_set = getCladeSet(rep_clades)
+		rep_clade_sets.append(rep_clade_set)
+		num_clades = len(main_clades) + len(rep_clades)
+		distances.append((getPopCount(main_clade_set ^ rep_clade_set), num_clades))
+
+	pairs = None
+	if all_pairs:
+		pairs = []
+		for i in range(len(rep_clade_sets)):
+			for j in range(i + 1, len(rep_clade_sets)):
+				pairs.append(getPopCount(rep_clade_sets[i] ^ rep_clade_sets[j]))
+
+	return taxon, distances, pairs
+
+def writeDistances(ofn, taxa, taxa_x_fns, taxa_x_distances):
+	if ofn.endswith(".npy"):
+		num_reps = max(len(distances) for distances in taxa_x_distances.values())
+		values = []
+		for taxon in taxa:
+			distances = taxa_x_distances.get(taxon, [])
+			values.extend(rf for rf,num_clades in distances)
+			values.extend([-1] * (num_reps - len(distances)))
+		writeNpy(ofn, (len(taxa), num_reps), values)
+	else:
+		with open(ofn, 'w') as ofd:
+			ofd.write("taxon\treplicate\tfile\trf\tnormalized_rf\n")
+			for taxon in taxa:
+				for i,(rf,num_clades) in enumerate(taxa_x_distances.get(taxon, []), start=1):
+					normalized_rf = rf / num_clades if num_clades else 0
+					ofd.write(f"{taxon}\t{i}\t{taxa_x_fns[taxon][i-1]}\t{rf}\t{normalized_rf}\n")
+
+def writePairDistances(ofn, taxa, taxa_x_num_reps, taxa_x_pairs):
+	if ofn.endswith(".npy"):
+		num_reps = max(taxa_x_num_reps.values())
+		values = []
+		for taxon in taxa:
+			n = taxa_x_num_reps.get(taxon, 0)
+			matrix = [[-1] * num_reps for i in range(num_reps)]
+			pairs = iter(taxa_x_pairs.get(taxon, []))
+			for i in range(n):
+				matrix[i][i] = 0
+				for j in range(i + 1, n):
+					matrix[i][j] = matrix[j][i] = next(pairs)
+			for row in matrix:
+				values.extend(row)
+		writeNpy(ofn, (len(taxa), num_reps, num_reps), values)
+	else:
+		with open(ofn, 'w') as ofd:
+			ofd.write("taxon\treplicate_1\treplicate_2\trf\n")
+			for taxon in taxa:
+				n = taxa_x_num_reps.get(taxon, 0)
+				pairs = iter(taxa_x_pairs.get(taxon, []))
+				for i in range(1, n + 1):
+					for j in range(i + 1, n + 1):
+						ofd.write(f"{taxon}\t{i}\t{j}\t{next(pairs)}\n")
+
+# ------------- MAIN ----------------------------- ||
+def main(argv=None):
+	# handle the arguments
+	args = handleArgs(argv)
+
+	# read in the main tree
+	main_trees = createMainTrees(args.main_trees)
+	if len(main_trees) != 1:
+		raise CalcScoreException(f"ERROR: rf compares the jackknifed trees to one main tree, but {len(main_trees)} were provided.")
+	taxa = sorted(main_trees[0].getLeafLabels())
+	main_tree_masks = main_trees[0].getEachSubTreeBitmasks(ReplicateIndex(taxa).taxon_bits)
+
+	# obtain, validate, and sort the list of jackknifed tree files mapped to taxa names
+	taxa_x_fns = getJackknifedTreesFileNames(args.jack_tree_dir, args.jack_tree_fn_ext, args.jack_tree_fofn)
+	validateAndResolveJackknifedTrees(taxa_x_fns, taxa)
+	if hasRemovalSets(taxa_x_fns):
+		raise CalcScoreException("ERROR: rf compares the jackknifed trees of each taxon, so it cannot use trees built\nwithout 2+ taxa.")
+	sortJackknifedTrees(taxa_x_fns)
+
+	# one taxon per task; each process parses its taxon's trees and compares them
+	taxa_x_distances = {}
+	taxa_x_pairs = {}
+	with ProcessPoolExecutor(max_workers=args.processes) as pool:
+		futures = []
+		for taxon in sorted(taxa_x_fns.keys()):
+			futures.append(pool.submit(computeTaxonDistances, taxon, taxa_x_fns[taxon], taxa, main_tree_masks, args.unrooted, bool(args.output_pairs)))
+		for future in futures:
+			taxon, distances, pairs = future.result()
+			taxa_x_distances[taxon] = distances
+			taxa_x_pairs[taxon] = pairs
+
+	# generate output
+	if args.output:
+		writeDistances(args.output, taxa, taxa_x_fns, taxa_x_distances)
+	if args.output_pairs:
+		taxa_x_num_reps = {taxon: len(distances) for taxon,distances in taxa_x_distances.items()}
+		writePairDistances(args.output_pairs, taxa, taxa_x_num_reps, taxa_x_pairs)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,183 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+import os
+import re
+import shlex
+import argparse
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor,as_completed
+from .calcScore import CalcScoreException,validateOutputFiles
+
+# ---------- FUNCTIONS --------------------------- ||
+def handleArgs(argv):
+	# define the argument parser
+	parser = argparse.ArgumentParser(prog=f"{Path(sys.argv[0]).name} run-jackknife", add_help=False, allow_abbrev=True,
+									formatter_class=argparse.RawTextHelpFormatter,
+									description="Build the jackknifed trees on this machine: run a tree inference command once per\n"
+									"taxon and replicate, several at a time, and write a list of the resulting trees for\n"
+									"\"tanos -f\". Trees that already exist are not built again, so an interrupted run can\n"
+									"simply be restarted.\n")
+
+	# define argument groups
+	input_group = parser.add_argument_group("Input Options", "These options affect how input files are found and/or interpreted.")
+	job_group = parser.add_argument_group("Job Options", "These options affect which commands are run and how many at once.")
+	output_group = parser.add_argument_group("Output Options", "These options affect which and how output files are generated.")
+	misc_group = parser.add_argument_group("Misc. Options", "")
+
+	# 	define input group options
+	input_group.add_argument("-a", "--alignments", dest="aln_dir", metavar="path/to/jackknife/aln/", action="store", type=str, required=False, default="data/jackknife/aln",
+						help="The directory with the leave-one-out alignments, named ${taxon}.fa or\n"
+						"${taxon}.fa.gz (see \"tanos jackknife-alignment\")."
+						" [data/jackknife/aln]\n \n")
+
+	# 	define job group options
+	job_group.add_argument("-c", "--command", dest="command", metavar="template", action="store", type=str, required=False,
+						default="iqtree -nt {threads} -s {alignment} -t RANDOM -pre {prefix} -m GTR+F+I+G4",
+						help="The command that builds one tree. These placeholders are filled in for each job:\n"
+						"\t{alignment}  the leave-one-out alignment\n"
+						"\t{prefix}     the output prefix; the tree must be written to ${prefix}.${ext}\n"
+						"\t             (see -e), e.g., data/jackknife/tree/${taxon}/tree-${replicate}\n"
+						"\t{threads}    the value of -T\n"
+						"\t{taxon}      the taxon left out\n"
+						"\t{replicate}  the replicate number\n"
+						"The command is not run by a shell, so quote arguments as you would in one, but do\n"
+						"not rely on pipes or redirection."
+						" [iqtree -nt {threads} -s {alignment} -t RANDOM -pre {prefix} -m GTR+F+I+G4]\n \n")
+	job_group.add_argument("-r", "--replicates", dest="replicates", metavar="int", action="store", type=int, required=False, default=50,
+						help="The number of trees to build per taxon (numbered 1-${rep})."
+						" [50]\n \n")
+	job_group.add_argument("-T", "--threads-per-job", dest="threads", metavar="int", action="store", type=int, required=False, default=1,
+						help="The number of threads each command may use (i.e., {threads})."
+						" [1]\n \n")
+	job_group.add_argument("-k", "--jobs", dest="jobs", metavar="int", action="store", type=int, required=False, default=None,
+						help="The number of commands run at once. [the number of CPUs / -T]\n \n")
+
+	# 	define output group options
+	output_group.add_argument("-t", "--jackknife-tree", dest="jack_tree_dir", metavar="path/to/jackknife/tree/", action="store", type=str, required=False, default="data/jackknife/tree",
+						help="The directory for the trees, one subdirectory per taxon."
+						" [data/jackknife/tree]\n \n")
+	output_group.add_argument("-e", "--tree-ext", dest="jack_tree_fn_ext", metavar=".ext", action="store", type=str, required=False, default="treefile",
+						help="The filename extension of the tree written by the command (the default suits\n"
+						"IQ-TREE). A job whose tree already exists is skipped."
+						" [treefile]\n \n")
+	output_group.add_argument("-f", "--jackknife-tree-fofn", dest="jack_tree_fofn", metavar="trees.tsv", action="store", type=str, required=False, default="trees.tsv",
+						help="Once every tree exists, list them in this file, in the format expected by\n"
+						"\"tanos -f\". Specify \"\" to skip it."
+						" [trees.tsv]\n \n")
+
+	# 	define misc. group options
+	misc_group.add_argument("-h", "--help", action="help", help="Show this help message and exit.\n \n")
+
+	# parse the arguments
+	args = parser.parse_args(argv)
+
+	# sanity check on input paths and job options
+	p = Path(args.aln_dir)
+	if not (p.exists() and p.is_dir()): # exists and is dir?
+		raise CalcScoreException(f"ERROR: Problem with argument used for -a, \"{args.aln_dir}\" either did not exist or was not a directory.")
+	if args.replicates < 1:
+		raise CalcScoreException(f"ERROR: -r/--replicates must be at least 1, not {args.replicates}.")
+	if args.threads < 1:
+		raise CalcScoreException(f"ERROR: -T/--threads-per-job must be at least 1, not {args.threads}.")
+	if args.jobs is None:
+		args.jobs = max(1, (os.cpu_count() or 1) // args.threads)
+	elif args.jobs < 1:
+		raise CalcScoreException(f"ERROR: -k/--jobs must be at least 1, not {args.jobs}.")
+	args.jack_tree_fn_ext = args.jack_tree_fn_ext.lstrip('.')
+	getJobCommand(args.command, "aln.fa", "tree-1", 1, "taxon", 1) # are the placeholders known?
+
+	# sanity check on output files
+	validateOutputFiles((args.jack_tree_fofn,))
+
+	# return the parsed arguments object
+	return args
+
+def getJackknifedAlignmentFileNames(aln_dir): # maps each taxon to its leave-one-out alignment
+	taxa_x_aln = {}
+	for f in sorted(Path(aln_dir).iterdir()):
+		m = re.match(r"^(.+)\.fa(\.gz)?$", f.name)
+		if f.is_file() and m is not None:
+			taxa_x_aln[m.group(1)] = str(f)
+	return taxa_x_aln
+
+def getJobCommand(template, alignment, prefix, threads, taxon, replicate):
+	try:
+		return [arg.format(alignment=alignment, prefix=prefix, threads=threads, taxon=taxon, replicate=replicate) for arg in shlex.split(template)]
+	except (KeyError, IndexError, ValueError) as e:
+		raise CalcScoreException(f"ERROR: could not use the -c/--command template \"{template}\" ({e}). The known\nplaceholders are {{alignment}}, {{prefix}}, {{threads}}, {{taxon}}, and {{replicate}}.")
+
+def runJob(cmd, prefix, tree_fn): # returns None, or a description of what went wrong
+	with open(f"{prefix}.out", 'w') as log:
+		try:
+			returncode = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT).returncode
+		except OSError as e: # e.g., the program does not exist
+			return str(e)
+	if returncode != 0 or not os.path.exists(tree_fn):
+		if os.path.exists(tree_fn):
+			os.remove(tree_fn) # do not let a failed job look finished next time
+		return f"exit code {returncode}" if returncode != 0 else f"no tree was written to \"{tree_fn}\""
+	return None
+
+def writeJackknifedTreesFofn(ofn, jobs):
+	with open(ofn, 'w') as ofd:
+		for taxon,replicate,tree_fn in sorted(jobs):
+			ofd.write(f"{taxon}\t{tree_fn}\n")
+
+# ------------- MAIN ----------------------------- ||
+def main(argv=None):
+	# handle the arguments
+	args = handleArgs(argv)
+
+	# find the alignments
+	taxa_x_aln = getJackknifedAlignmentFileNames(args.aln_dir)
+	if not taxa_x_aln:
+		raise CalcScoreException(f"ERROR: no alignments (${{taxon}}.fa or ${{taxon}}.fa.gz) were found in \"{args.aln_dir}\".")
+
+	# list the jobs replicate by replicate (rather than taxon by taxon), so that the trees
+	#	finished at any time are spread over the taxa (e.g., for "tanos watch")
+	jobs = []
+	to_run = []
+	for replicate in range(1, args.replicates + 1):
+		for taxon,aln_fn in taxa_x_aln.items():
+			prefix = str(Path(args.jack_tree_dir) / taxon / f"tree-{replicate}")
+			tree_fn = f"{prefix}.{args.jack_tree_fn_ext}"
+			jobs.append((taxon, replicate, tree_fn))
+			if not os.path.exists(tree_fn):
+				to_run.append((getJobCommand(args.command, aln_fn, prefix, args.threads, taxon, replicate), prefix, tree_fn))
+	sys.stderr.write(f"{len(jobs) - len(to_run)} of {len(jobs)} tree(s) already exist; running {len(to_run)} job(s), {args.jobs} at a time\n")
+
+	# run them; each thread just waits on its command, so threads are enough here
+	for taxon in taxa_x_aln.keys():
+		(Path(args.jack_tree_dir) / taxon).mkdir(parents=True, exist_ok=True)
+	failed = []
+	pool = ThreadPoolExecutor(max_workers=args.jobs)
+	futures = {}
+	try:
+		for cmd,prefix,tree_fn in to_run:
+			futures[pool.submit(runJob, cmd, prefix, tree_fn)] = prefix
+		for num_done,future in enumerate(as_completed(futures), start=1):
+			error = future.result()
+			if error is not None:
+				failed.append(futures[future])
+				sys.stderr.write(f"FAILED: {futures[future]}: {error} (see \"{futures[future]}.out\")\n")
+			if not num_done % 10 or num_done == len(futures):
+				sys.stderr.write(f"{num_done} of {len(futures)} job(s) done\n")
+	finally:
+		for future in futures.keys(): # e.g., after Ctrl-C, do not start the jobs still waiting
+			future.cancel()
+		pool.shutdown(wait=True)
+
+	if failed:
+		raise CalcScoreException(f"ERROR: {len(failed)} job(s) failed; run the same command again to retry them.")
+
+	# list the trees for scoring
+	if args.jack_tree_fofn:
+		writeJackknifedTreesFofn(args.jack_tree_fofn, jobs)
+
+if __name__ == "__main__":
+	main()
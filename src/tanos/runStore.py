@@ -0,0 +1,144 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+import json
+import hashlib
+import sqlite3
+import datetime
+
+# ---------- FUNCTIONS --------------------------- ||
+def getFileHash(filename): # sha1 of the file's contents
+	h = hashlib.sha1()
+	with open(filename, 'rb') as ifd:
+		for chunk in iter(lambda: ifd.read(1 << 20), b''):
+			h.update(chunk)
+	return h.hexdigest()
+
+def getTaxaKey(taxa): # identifies a (sorted) list of taxa, and so the bit positions of clades over it
+	return hashlib.sha1('\n'.join(sorted(taxa)).encode(encoding="UTF-8")).hexdigest()
+
+def getCladeKey(labels): # identifies a clade by its taxa, whatever else was in the tree, e.g., across runs
+	return hashlib.sha1('\n'.join(sorted(labels)).encode(encoding="UTF-8")).hexdigest()
+
+# ----------- CLASSES ---------------------------- ||
+class RunStoreException(Exception):
+	pass
+
+# A SQLite database of scoring runs, which also caches the clades of each
+# jackknifed tree file (by its contents) so that later runs need not parse it
+# again. The tables:
+#	runs: run_id, started (UTC, ISO 8601), version, arguments (json), unrooted,
+#		taxa, jackknifed_trees, taxa_key
+#	run_taxa: run_id, bit, taxon; the bit positions of the clade column of nodes
+#	run_inputs: run_id, role ("main" or "jackknife"), removed (the excluded
+#		taxon or taxa, for "jackknife"), path, sha1
+#	nodes: run_id, tree (1-based), node (depth first position, from 0), clade_key
+#		(see getCladeKey; the same clade has the same key in every run), clade
+#		(bitmask as hex), size (number of taxa), hits, total, score; only the nodes
+#		given a meaningful score
+#	replicate_cache: sha1 (of the tree file), taxa_key, clades (the tree's
+#		clades, as from Tree.getEachSubTreeBitmasks, as fixed size big-endian
+#		integers)
+# For example, the nodes that scored below 0.7 in any run:
+#	SELECT run_id, tree, node, score FROM nodes WHERE score < 0.7;
+# and the history of one clade:
+#	SELECT run_id, score FROM nodes WHERE clade_key = ? ORDER BY run_id;
+class RunStore:
+
+	SCHEMA = """
+		CREATE TABLE IF NOT EXISTS runs (run_id INTEGER PRIMARY KEY, started TEXT, version TEXT, arguments TEXT, unrooted INTEGER, taxa INTEGER, jackknifed_trees INTEGER, taxa_key TEXT);
+		CREATE TABLE IF NOT EXISTS run_taxa (run_id INTEGER, bit INTEGER, taxon TEXT);
+		CREATE TABLE IF NOT EXISTS run_inputs (run_id INTEGER, role TEXT, removed TEXT, path TEXT, sha1 TEXT);
+		CREATE TABLE IF NOT EXISTS nodes (run_id INTEGER, tree INTEGER, node INTEGER, clade_key TEXT, clade TEXT, size INTEGER, hits INTEGER, total INTEGER, score REAL);
+		CREATE TABLE IF NOT EXISTS replicate_cache (sha1 TEXT, taxa_key TEXT, clades BLOB, PRIMARY KEY (sha1, taxa_key));
+		CREATE INDEX IF NOT EXISTS run_taxa_run ON run_taxa (run_id);
+		CREATE INDEX IF NOT EXISTS run_inputs_run ON run_inputs (run_id);
+		CREATE INDEX IF NOT EXISTS run_inputs_sha1 ON run_inputs (sha1);
+		CREATE INDEX IF NOT EXISTS nodes_run ON nodes (run_id, tree, node);
+		CREATE INDEX IF NOT EXISTS nodes_clade ON nodes (clade_key);
+		CREATE INDEX IF NOT EXISTS nodes_score ON nodes (score);
+	"""
+
+	# constructor(s)
+	def __init__(self, filename):
+		# "normal" "public" member fields
+		self.filename = filename
+		self.run_id = None
+
+		# "private" member fields
+		try:
+			self.__db = sqlite3.connect(filename)
+			self.__db.executescript(RunStore.SCHEMA)
+		except sqlite3.Error as e:
+			raise RunStoreException(f"ERROR: could not open the run store \"{filename}\" ({e}).")
+		#	__hashes: the sha1 of each file hashed so far, so that each is read only once
+		self.__hashes = {}
+
+	# "normal" "public" member functions
+	def getFileHash(self, filename):
+		if not filename in self.__hashes:
+			self.__hashes[filename] = getFileHash(filename)
+		return self.__hashes[filename]
+
+	def getCachedClades(self, filename, taxa_key, clade_bytes): # returns the cached clades of the tree file, or None
+		row = self.__db.execute("SELECT clades FROM replicate_cache WHERE sha1 = ? AND taxa_key = ?", (self.getFileHash(filename), taxa_key)).fetchone()
+		if row is None:
+			return None
+		data = row[0]
+		return [int.from_bytes(data[i:i+clade_bytes], "big") for i in range(0, len(data), clade_bytes)]
+
+	def hasCachedClades(self, filename, taxa_key):
+		return self.__db.execute("SELECT 1 FROM replicate_cache WHERE sha1 = ? AND taxa_key = ?", (self.getFileHash(filename), taxa_key)).fetchone() is not None
+
+	def cacheClades(self, filename, taxa_key, clade_bytes, clades):
+		data = b''.join(clade.to_bytes(clade_bytes, "big") for clade in clades)
+		self.__db.execute("INSERT OR REPLACE INTO replicate_cache (sha1, taxa_key, clades) VALUES (?, ?, ?)", (self.getFileHash(filename), taxa_key, data))
+
+	def startRun(self, version, arguments, unrooted, taxa):
+		started = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+		cursor = self.__db.execute("INSERT INTO runs (started, version, arguments, unrooted, taxa, jackknifed_trees, taxa_key) VALUES (?, ?, ?, ?, ?, 0, ?)",
+									(started, version, json.dumps(arguments), int(unrooted), len(taxa), getTaxaKey(taxa)))
+		self.run_id = cursor.lastrowid
+		self.__db.executemany("INSERT INTO run_taxa (run_id, bit, taxon) VALUES (?, ?, ?)", ((self.run_id, bit, taxon) for bit,taxon in enumerate(sorted(taxa))))
+		return self.run_id
+
+	def addInputs(self, main_tree_fns, taxa_x_fns):
+		rows = [(self.run_id, "main", None, fn, self.getFileHash(fn)) for fn in main_tree_fns]
+		for removed,fns in taxa_x_fns.items():
+			rows.extend((self.run_id, "jackknife", removed, fn, self.getFileHash(fn)) for fn in fns)
+		self.__db.executemany("INSERT INTO run_inputs (run_id, role, removed, path, sha1) VALUES (?, ?, ?, ?, ?)", rows)
+		self.__db.execute("UPDATE runs SET jackknifed_trees = ? WHERE run_id = ?", (sum(len(fns) for fns in taxa_x_fns.values()), self.run_id))
+
+	def addTree(self, tree_num, tree, index): # the scored nodes of a main tree, scored against index (a ReplicateIndex)
+		rows = []
+		clades = tree.getEachSubTreeBitmasks(index.taxon_bits)
+		for i,node in tree.generateScoredNodes():
+			clade = clades[i]
+			hits, total = index.countSupport(clade)
+			taxa = index.getTaxaInClade(clade)
+			rows.append((self.run_id, tree_num, i, getCladeKey(taxa), format(clade, 'x'), len(taxa), hits, total, node.metadata.get("taxa-resiliency")))
+		self.__db.executemany("INSERT INTO nodes (run_id, tree, node, clade_key, clade, size, hits, total, score) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+	def commit(self):
+		self.__db.commit()
+
+	def close(self):
+		self.__db.commit()
+		self.__db.close()
+
+	# make str(some_store) meaningful
+	def __str__(self):
+		return f'{{ filename: "{self.filename}", run_id: {self.run_id} }}'
+
+	# make print(some_store) meaningful
+	def __repr__(self):
+		return "RunStore: " + self.__str__()
+
+
+# ------------- MAIN ----------------------------- ||
+if __name__ == "__main__":
+	sys.stderr.write("ERROR: This is a module, it is meant to be imported -- not run directly!\n")
+	sys.exit(1)
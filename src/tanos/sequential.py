@@ -0,0 +1,92 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+from .stats import getZScore,getWilsonInterval
+
+# ---------- FUNCTIONS --------------------------- ||
+
+# ----------- CLASSES ---------------------------- ||
+# Wraps a ReplicateIndex that is filled one jackknifed tree at a time. After
+# each tree, the support for every (node, excluded taxon) pair of interest is
+# treated as a binomial proportion, and a taxon is considered converged once
+# every such pair's confidence interval is narrower than the tolerance.
+class SequentialScorer:
+
+	# constructor(s)
+	def __init__(self, index, main_trees, tolerance, confidence=0.95, min_replicates=1):
+		# "normal" "public" member fields
+		self.index = index
+		self.namespace = index.namespace # parse the jackknifed trees with it (see ReplicateIndex)
+		self.tolerance = tolerance
+		self.confidence = confidence
+		self.z = getZScore(confidence)
+		self.min_replicates = min_replicates
+
+		#	taxa_x_clades: for each excluded taxon, the clades (bitmasks, sans the
+		#	taxon) that must be found in its jackknifed trees. Only nodes that get
+		#	a meaningful score (see Node.scoreResiliency) are considered.
+		self.taxa_x_clades = {}
+		for taxon in index.taxa:
+			self.taxa_x_clades[taxon] = set()
+		for mt in main_trees:
+			clades = mt.getEachSubTreeBitmasks(index.taxon_bits)
+			for i,node in mt.generateScoredNodes():
+				clade = clades[i]
+				for taxon in index.getTaxaInClade(clade):
+					self.taxa_x_clades[taxon].add(index.getCladeKey(taxon, clade))
+
+		#	taxa_x_converged_at: number of jackknifed trees after which the taxon converged
+		self.taxa_x_converged_at = {}
+		#	taxa_x_max_width: widest interval among the taxon's clades (as of the last tree added)
+		self.taxa_x_max_width = {}
+		for taxon in index.taxa:
+			self.taxa_x_max_width[taxon] = 1.0
+
+	# "normal" "public" member functions
+	def addTree(self, excluded_taxon, tree):
+		self.index.addTree(excluded_taxon, tree)
+		width = self.getMaxIntervalWidth(excluded_taxon)
+		self.taxa_x_max_width[excluded_taxon] = width
+
+		num_reps = self.index.getNumReplicates(excluded_taxon)
+		if not self.isConverged(excluded_taxon) and num_reps >= self.min_replicates and width < self.tolerance:
+			self.taxa_x_converged_at[excluded_taxon] = num_reps
+
+	def getMaxIntervalWidth(self, excluded_taxon):
+		num_reps = self.index.getNumReplicates(excluded_taxon)
+		max_width = 0.0
+		for clade in self.taxa_x_clades[excluded_taxon]:
+			lower, upper = getWilsonInterval(self.index.getCladeCount(excluded_taxon, clade), num_reps, self.z)
+			if upper - lower > max_width:
+				max_width = upper - lower
+		return max_width
+
+	def isConverged(self, excluded_taxon):
+		return excluded_taxon in self.taxa_x_converged_at
+
+	def allConverged(self):
+		return len(self.taxa_x_converged_at) == len(self.index.taxa)
+
+	def getConvergenceReport(self): # tsv, one line per taxon
+		lines = ["taxon\treplicates_read\tconverged_at\tmax_interval_width\n"]
+		for taxon in self.index.taxa:
+			converged_at = self.taxa_x_converged_at.get(taxon, "NA")
+			lines.append(f"{taxon}\t{self.index.getNumReplicates(taxon)}\t{converged_at}\t{self.taxa_x_max_width[taxon]}\n")
+		return ''.join(lines)
+
+	# make str(some_scorer) meaningful
+	def __str__(self):
+		return f'{{ tolerance: {self.tolerance}, confidence: {self.confidence}, converged: {len(self.taxa_x_converged_at)}/{len(self.index.taxa)} }}'
+
+	# make print(some_scorer) meaningful
+	def __repr__(self):
+		return "SequentialScorer: " + self.__str__()
+
+
+# ------------- MAIN ----------------------------- ||
+if __name__ == "__main__":
+	sys.stderr.write("ERROR: This is a module, it is meant to be imported -- not run directly!\n")
+	sys.exit(1)
@@ -0,0 +1,246 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+import os
+import stat
+import json
+import time
+import socket
+import argparse
+import threading
+import socketserver
+import http.server
+import urllib.parse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from .calcScore import CalcScoreException,addJackknifeTreeArguments,validateJackknifeTreeInputs,getJackknifedTreesFileNames,validateAndResolveJackknifedTrees,sortJackknifedTrees,buildReplicateIndexFromFiles,getRemovedTaxa
+from .tree import Tree
+from .node import MalformedNewickTree
+
+# ---------- FUNCTIONS --------------------------- ||
+def handleArgs(argv):
+	# define the argument parser
+	parser = argparse.ArgumentParser(prog=f"{Path(sys.argv[0]).name} serve", add_help=False, allow_abbrev=True,
+									formatter_class=argparse.RawTextHelpFormatter,
+									description="Read the jackknifed trees once and keep them in memory, answering requests to score\n"
+									"main trees over HTTP (on localhost or a Unix socket). The requests are:\n"
+									"\n"
+									"\tPOST /score    the body is a main tree in Newick format. Add ?format=json\n"
+									"\t               (default), pretty (json), nwk (commented metadata), or\n"
+									"\t               nwk-branch / nwk-label (as with -b / -s).\n"
+									"\tPOST /reload   read the jackknifed trees again (e.g., after they changed).\n"
+									"\tGET  /status   the number of taxa and jackknifed trees, as json.\n"
+									"\n"
+									"For example:\n"
+									"\tcurl --data-binary @tree.nwk 'http://127.0.0.1:8000/score?format=nwk'\n")
+
+	# define argument groups
+	input_group = parser.add_argument_group("Input Options", "These options affect how input files are found and/or interpreted.")
+	server_group = parser.add_argument_group("Server Options", "These options affect where and how requests are answered.")
+	misc_group = parser.add_argument_group("Misc. Options", "")
+
+	# 	define input group options
+	addJackknifeTreeArguments(input_group)
+	input_group.add_argument("-u", "--unrooted", dest="unrooted", action="store_true", required=False,
+						help="Treat the jackknifed trees as unrooted (see \"tanos -h\").\n \n")
+
+	# 	define server group options
+	server_group.add_argument("--host", dest="host", metavar="127.0.0.1", action="store", type=str, required=False, default="127.0.0.1",
+						help="The address to listen on."
+						" [127.0.0.1]\n \n")
+	server_group.add_argument("--port", dest="port", metavar="int", action="store", type=int, required=False, default=8000,
+						help="The port to listen on."
+						" [8000]\n \n")
+	server_group.add_argument("--socket", dest="socket", metavar="path/to/tanos.sock", action="store", type=str, required=False, default=None,
+						help="Listen on this Unix socket instead of --host and --port.\n \n")
+	server_group.add_argument("-k", "--workers", dest="workers", metavar="int", action="store", type=int, required=False, default=4,
+						help="The number of requests answered at the same time."
+						" [4]\n \n")
+	server_group.add_argument("-q", "--quiet", dest="quiet", action="store_true", required=False,
+						help="Do not log each request to stderr.\n \n")
+
+	# 	define misc. group options
+	misc_group.add_argument("-h", "--help", action="help", help="Show this help message and exit.\n \n")
+
+	# parse the arguments
+	args = parser.parse_args(argv)
+
+	# sanity check on input paths
+	validateJackknifeTreeInputs(args)
+	if args.workers < 1:
+		raise CalcScoreException(f"ERROR: -k/--workers must be at least 1, not {args.workers}.")
+
+	# return the parsed arguments object
+	return args
+
+def loadReplicateIndex(args): # the taxa are those of the jackknifed trees, since no main tree is known yet
+	taxa_x_fns = getJackknifedTreesFileNames(args.jack_tree_dir, args.jack_tree_fn_ext, args.jack_tree_fofn)
+	if not taxa_x_fns:
+		raise CalcScoreException("ERROR: no jackknifed trees were found.")
+	taxa = sorted(frozenset(taxon for key in taxa_x_fns.keys() for taxon in getRemovedTaxa(key)))
+	validateAndResolveJackknifedTrees(taxa_x_fns, taxa)
+	sortJackknifedTrees(taxa_x_fns)
+	return buildReplicateIndexFromFiles(taxa_x_fns, taxa, unrooted=args.unrooted)
+
+def scoreNewick(nwk, index, output_format="json"):
+	mt = Tree(newick=nwk, name="main")
+	if sorted(mt.getLeafLabels()) != index.taxa:
+		raise CalcScoreException("ERROR: the main tree must have exactly the taxa of the jackknifed trees.")
+	mt.scoreResiliencyWithIndex(index) # changes mt, but not index
+
+	if output_format == "json":
+		return mt.getJson(), "application/json"
+	elif output_format == "pretty":
+		return mt.getPrettyJson(), "application/json"
+	elif output_format == "nwk":
+		return mt.getNewickWithCommentedMetadata(), "text/plain"
+	elif output_format == "nwk-branch":
+		mt.replaceBranchLenWithOtherValue("taxa-resiliency")
+		return mt.getNewick(), "text/plain"
+	elif output_format == "nwk-label":
+		mt.replaceInternalLabelsWithOtherValue("taxa-resiliency")
+		return mt.getNewick(), "text/plain"
+	raise CalcScoreException(f"ERROR: unknown format \"{output_format}\" (expected json, pretty, nwk, nwk-branch, or nwk-label).")
+
+def isSocket(path): # true if path is a Unix socket (not following a symbolic link)
+	try:
+		return stat.S_ISSOCK(os.lstat(path).st_mode)
+	except FileNotFoundError:
+		return False
+
+def isStaleSocket(path): # true if path is a Unix socket that no server is listening on, e.g., left over from a previous run
+	if not isSocket(path):
+		return False
+	with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+		try:
+			sock.connect(path)
+		except ConnectionRefusedError:
+			return True
+		except OSError:
+			return False
+	return False # a server is still running there
+
+# ----------- CLASSES ---------------------------- ||
+# Hands each accepted connection to a fixed pool of worker threads (rather than
+# a new thread per connection, as socketserver.ThreadingMixIn would).
+class PooledHTTPServer(http.server.HTTPServer):
+
+	request_queue_size = 128 # connections waiting for a worker; the default (5) makes bursts of clients retry
+
+	# constructor(s)
+	def __init__(self, server_address, handler_class, args, workers=4):
+		super().__init__(server_address, handler_class)
+		# "normal" "public" member fields
+		self.args = args
+		self.index = loadReplicateIndex(args)
+		self.loaded = time.time()
+		self.pool = ThreadPoolExecutor(max_workers=workers)
+		# "private" member fields
+		self.__reload_lock = threading.Lock()
+
+	# "normal" "public" member functions
+	def reload(self):
+		with self.__reload_lock: # one reload at a time; requests keep using the old index until it is replaced
+			index = loadReplicateIndex(self.args)
+			self.index = index
+			self.loaded = time.time()
+
+	def process_request(self, request, client_address):
+		self.pool.submit(self.__processRequestInWorker__, request, client_address)
+
+	def server_close(self):
+		super().server_close()
+		self.pool.shutdown(wait=True)
+
+	# "private" member functions
+	def __processRequestInWorker__(self, request, client_address):
+		try:
+			self.finish_request(request, client_address)
+		except Exception:
+			self.handle_error(request, client_address)
+		finally:
+			self.shutdown_request(request)
+
+class UnixPooledHTTPServer(PooledHTTPServer):
+
+	address_family = socket.AF_UNIX
+
+	def server_bind(self):
+		socketserver.TCPServer.server_bind(self) # HTTPServer.server_bind expects (host, port)
+		self.server_name = "localhost"
+		self.server_port = 0
+
+class ScoringRequestHandler(http.server.BaseHTTPRequestHandler):
+
+	def do_GET(self):
+		url = urllib.parse.urlparse(self.path)
+		if url.path == "/status":
+			index = self.server.index
+			status = {"taxa": len(index.taxa), "replicates": index.getNumTrees(), "unrooted": index.unrooted, "loaded": self.server.loaded}
+			self.__respond__(200, json.dumps(status), "application/json")
+		else:
+			self.__respond__(404, f"ERROR: unknown request \"GET {url.path}\".\n", "text/plain")
+
+	def do_POST(self):
+		url = urllib.parse.urlparse(self.path)
+		body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode(encoding="UTF-8")
+		try:
+			if url.path == "/score":
+				output_format = urllib.parse.parse_qs(url.query).get("format", ["json"])[0]
+				content, content_type = scoreNewick(body, self.server.index, output_format=output_format)
+				self.__respond__(200, content, content_type)
+			elif url.path == "/reload":
+				self.server.reload()
+				self.__respond__(200, f"reloaded {self.server.index.getNumTrees()} jackknifed trees\n", "text/plain")
+			else:
+				self.__respond__(404, f"ERROR: unknown request \"POST {url.path}\".\n", "text/plain")
+		except (CalcScoreException, MalformedNewickTree) as e:
+			self.__respond__(400, f"{e}\n", "text/plain")
+
+	def log_message(self, format, *args):
+		if not self.server.args.quiet:
+			super().log_message(format, *args)
+
+	def address_string(self):
+		return self.client_address[0] if self.client_address else "unix" # Unix socket clients have no address
+
+	# "private" member functions
+	def __respond__(self, code, content, content_type):
+		data = content.encode(encoding="UTF-8")
+		self.send_response(code)
+		self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+		self.send_header("Content-Length", str(len(data)))
+		self.end_headers()
+		self.wfile.write(data)
+
+# ------------- MAIN ----------------------------- ||
+def main(argv=None):
+	# handle the arguments
+	args = handleArgs(argv)
+
+	# read the jackknifed trees and start listening
+	if args.socket is not None:
+		if os.path.lexists(args.socket):
+			if not isStaleSocket(args.socket):
+				raise CalcScoreException(f"ERROR: --socket \"{args.socket}\" exists and is not a stale socket (a server may still be\nrunning there); choose another path or remove it.")
+			os.remove(args.socket) # left over from a previous run
+		server = UnixPooledHTTPServer(args.socket, ScoringRequestHandler, args, workers=args.workers)
+		sys.stderr.write(f"listening on {args.socket}\n")
+	else:
+		server = PooledHTTPServer((args.host, args.port), ScoringRequestHandler, args, workers=args.workers)
+		sys.stderr.write(f"listening on http://{args.host}:{server.server_port}\n")
+
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+		if args.socket is not None and isSocket(args.socket):
+			os.remove(args.socket)
+
+if __name__ == "__main__":
+	main()
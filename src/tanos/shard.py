@@ -0,0 +1,136 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+import hashlib
+
+# ---------- FUNCTIONS --------------------------- ||
+def parseShard(shard_str): # e.g., "2/8" -> (2, 8)
+	try:
+		shard, num_shards = (int(x) for x in shard_str.split('/'))
+	except ValueError:
+		raise ShardException(f"ERROR: expected a shard like \"i/N\" (e.g., \"2/8\"), but found \"{shard_str}\".")
+	if not 1 <= shard <= num_shards:
+		raise ShardException(f"ERROR: the shard number must be in the range [1,N], but found \"{shard_str}\".")
+	return shard, num_shards
+
+def getShardTaxa(taxa, shard, num_shards): # every N-th taxon (sorted), starting with the i-th
+	return sorted(taxa)[shard-1::num_shards]
+
+def getTreeChecksum(tree): # identifies a main tree (topology, labels, and branch lengths)
+	return hashlib.sha1(tree.getNewick().encode(encoding="UTF-8")).hexdigest()
+
+def mergePartialCounts(partials):
+	if not partials:
+		raise ShardException("ERROR: no partial counts files were provided.")
+
+	# are the partials from the same run and is every shard present exactly once?
+	first = partials[0]
+	shards = set()
+	for partial in partials:
+		if partial.num_shards != first.num_shards or partial.unrooted != first.unrooted or partial.checksums != first.checksums:
+			raise ShardException(f"ERROR: partial counts file \"{partial.name}\" is not from the same run (shard count,\n-u/--unrooted, or main tree(s)) as \"{first.name}\".")
+		if partial.shard in shards:
+			raise ShardException(f"ERROR: shard {partial.shard}/{partial.num_shards} was provided more than once.")
+		shards.add(partial.shard)
+	missing = sorted(frozenset(range(1, first.num_shards + 1)) - shards)
+	if missing:
+		raise ShardException(f"ERROR: missing the partial counts for shard(s) {','.join(map(str, missing))} (of {first.num_shards}).")
+
+	# add them up
+	merged = PartialCounts(0, first.num_shards, unrooted=first.unrooted, name="merged")
+	merged.checksums = dict(first.checksums)
+	for partial in partials:
+		for key,(count,total_possible) in partial.counts.items():
+			merged_count, merged_total_possible = merged.counts.get(key, (0, 0))
+			merged.counts[key] = (merged_count + count, merged_total_possible + total_possible)
+
+	return merged
+
+# ----------- CLASSES ---------------------------- ||
+class ShardException(Exception):
+	pass
+
+# The hits (count) and totals (total_possible) of each scored main tree node,
+# considering only the taxa (and their jackknifed trees) of one shard. Nodes
+# are identified by tree number (1-based) and depth first traversal position.
+# The file format is tab-separated, like this:
+#	#tanos-partial	shard	2/8	unrooted	0
+#	#tree	1	<sha1 of the main tree>
+#	1	6	37	50
+#	1	9	50	50
+#	...
+class PartialCounts:
+
+	HEADER = "#tanos-partial"
+
+	# constructor(s)
+	def __init__(self, shard, num_shards, unrooted=False, name=""):
+		# "normal" "public" member fields
+		self.shard = shard
+		self.num_shards = num_shards
+		self.unrooted = unrooted
+		self.name = name
+		#	checksums: maps each tree number to its main tree's checksum
+		self.checksums = {}
+		#	counts: maps (tree number, node position) to (count, total_possible)
+		self.counts = {}
+
+	# "normal" "public" member functions
+	def addTree(self, tree_num, tree, index):
+		self.checksums[tree_num] = getTreeChecksum(tree)
+		clades = tree.getEachSubTreeBitmasks(index.taxon_bits)
+		for i,node in tree.generateScoredNodes():
+			clade = clades[i]
+			self.counts[(tree_num, i)] = index.countSupport(clade)
+
+	def getNodeCounts(self, tree_num): # maps node position to (count, total_possible) for one tree
+		node_counts = {}
+		for (num,i),counts in self.counts.items():
+			if num == tree_num:
+				node_counts[i] = counts
+		return node_counts
+
+	def write(self, filename):
+		with open(filename, 'w') as ofd:
+			ofd.write(f"{PartialCounts.HEADER}\tshard\t{self.shard}/{self.num_shards}\tunrooted\t{int(self.unrooted)}\n")
+			for tree_num in sorted(self.checksums.keys()):
+				ofd.write(f"#tree\t{tree_num}\t{self.checksums[tree_num]}\n")
+			for (tree_num,i) in sorted(self.counts.keys()):
+				count, total_possible = self.counts[(tree_num, i)]
+				ofd.write(f"{tree_num}\t{i}\t{count}\t{total_possible}\n")
+
+	@staticmethod
+	def read(filename):
+		with open(filename, 'r') as ifd:
+			fields = ifd.readline().rstrip('\n').split('\t')
+			if len(fields) != 5 or fields[0] != PartialCounts.HEADER:
+				raise ShardException(f"ERROR: \"{filename}\" is not a partial counts file (it has no \"{PartialCounts.HEADER}\" header).")
+			shard, num_shards = parseShard(fields[2])
+			partial = PartialCounts(shard, num_shards, unrooted=bool(int(fields[4])), name=filename)
+			for line in ifd:
+				fields = line.rstrip('\n').split('\t')
+				try:
+					if fields[0] == "#tree":
+						partial.checksums[int(fields[1])] = fields[2]
+					else:
+						partial.counts[(int(fields[0]), int(fields[1]))] = (int(fields[2]), int(fields[3]))
+				except (IndexError, ValueError):
+					raise ShardException(f"ERROR: malformed line in partial counts file \"{filename}\":\n{line}")
+		return partial
+
+	# make str(some_partial) meaningful
+	def __str__(self):
+		return f'{{ name: "{self.name}", shard: {self.shard}/{self.num_shards}, trees: {len(self.checksums)}, nodes: {len(self.counts)} }}'
+
+	# make print(some_partial) meaningful
+	def __repr__(self):
+		return "PartialCounts: " + self.__str__()
+
+
+# ------------- MAIN ----------------------------- ||
+if __name__ == "__main__":
+	sys.stderr.write("ERROR: This is a module, it is meant to be imported -- not run directly!\n")
+	sys.exit(1)
@@ -0,0 +1,149 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+import math
+import array
+import random
+from .replicateIndex import ReplicateIndex,ReplicateIndexException
+
+# ---------- FUNCTIONS --------------------------- ||
+
+# ----------- CLASSES ---------------------------- ||
+# A ReplicateIndex that keeps, instead of a dict of exact clade counts per
+# excluded taxon, a count-min sketch per excluded taxon: depth rows of width
+# counters, where each clade adds 1 to one counter per row (chosen by that row's
+# hash of the clade) and its count is estimated as the smallest of its
+# counters. The sketches take a fixed amount of memory (4 bytes per counter),
+# however many jackknifed trees and distinct clades there are.
+#
+# An estimate is never below the exact count. With N_t clades added to taxon
+# t's sketch, it is above it by more than e * N_t / width with a probability of
+# at most e^-depth (for each taxon and clade). A node's score is the sum of its
+# taxa's counts over the sum of their replicates, so it is never below the
+# exact score either, and (with a probability of at least 1 - k * e^-depth, for
+# a node with k taxa) above it by at most the node's "error bound" (see
+# getErrorBound): the sum of the taxa's e * N_t / width (each capped at the
+# taxon's number of replicates) over the sum of their replicates.
+#
+# Sets of 2+ removed taxa and --max-memory are not supported (see
+# addCladesWithoutTaxa and spill), and the clades cannot be listed, e.g., for
+# consensus trees.
+class SketchIndex(ReplicateIndex):
+
+	# class level variables (define once, not for every instance of the class)
+	#	COUNTER_BYTES: the size of a counter (array typecode 'I' is at least this)
+	COUNTER_BYTES = 4
+	#	PRIME: the modulus of the row hashes (a Mersenne prime, 2^61 - 1)
+	PRIME = (1 << 61) - 1
+
+	# constructor(s)
+	def __init__(self, taxa, memory, depth=4, unrooted=False): # memory: bytes for all of the sketches together
+		super().__init__(taxa, unrooted=unrooted)
+
+		# "normal" "public" member fields
+		#	depth: number of rows (hash functions) per sketch
+		self.depth = depth
+		#	width: number of counters per row, so that the sketches fit in memory
+		self.width = memory // (len(self.taxa) * depth * SketchIndex.COUNTER_BYTES)
+		if self.width < 1:
+			raise ReplicateIndexException(f"ERROR: {memory} bytes is too little for a sketch of {len(self.taxa)} taxa with depth {depth};\nat least {len(self.taxa) * depth * SketchIndex.COUNTER_BYTES} bytes are needed.")
+		#	taxa_x_sketch: maps each excluded taxon to its sketch, depth rows of
+		#	width counters, one after the other
+		self.taxa_x_sketch = {}
+		#	taxa_x_num_added: maps each excluded taxon to the number of clades added
+		#	to its sketch (N_t above)
+		self.taxa_x_num_added = {}
+
+		# "private" member fields
+		#	__row_hashes: (a, b) of each row's hash, ((a * x + b) mod PRIME) mod width,
+		#	where x is the clade reduced mod PRIME (see __getCounterPositions__); the
+		#	same for every run, so that runs with the same options agree
+		rng = random.Random(depth)
+		self.__row_hashes = [(rng.randrange(1, SketchIndex.PRIME), rng.randrange(0, SketchIndex.PRIME)) for row in range(depth)]
+		#	__limb_base: reduces clades of more than 61 taxa, as a polynomial in it
+		#	of their 61-bit limbs, so that two such clades rarely reduce to the same x
+		self.__limb_base = rng.randrange(1, SketchIndex.PRIME)
+
+	# "normal" "public" member functions
+	def addClades(self, excluded_taxon, clades):
+		if not excluded_taxon in self.taxon_bits:
+			raise ReplicateIndexException(f"ERROR: \"{excluded_taxon}\" is not a taxon in the original/main tree.")
+		if self.unrooted:
+			leaves = clades[-1] # the root's clade
+			clades = frozenset(self.getCanonicalSplit(clade, leaves) for clade in clades)
+		else:
+			clades = frozenset(clades)
+
+		if not excluded_taxon in self.taxa_x_sketch:
+			self.taxa_x_sketch[excluded_taxon] = array.array('I', bytes(self.depth * self.width * array.array('I').itemsize))
+			self.taxa_x_num_reps[excluded_taxon] = 0
+			self.taxa_x_num_added[excluded_taxon] = 0
+		sketch = self.taxa_x_sketch[excluded_taxon]
+		for clade in clades:
+			for i in self.__getCounterPositions__(clade):
+				sketch[i] += 1
+		self.taxa_x_num_reps[excluded_taxon] += 1
+		self.taxa_x_num_added[excluded_taxon] += len(clades)
+
+	def addCladesWithoutTaxa(self, excluded_taxa, clades):
+		if len(excluded_taxa) == 1:
+			return self.addClades(excluded_taxa[0], clades)
+		raise ReplicateIndexException("ERROR: jackknifed trees built without 2+ taxa cannot be added to a sketch.")
+
+	def spill(self):
+		raise ReplicateIndexException("ERROR: a sketch already has a fixed size; it cannot be spilled to disk.")
+
+	def getCladeCount(self, excluded_taxon, clade): # an estimate, never below the exact count (see above)
+		sketch = self.taxa_x_sketch.get(excluded_taxon)
+		if sketch is None:
+			return 0
+		count = min(sketch[i] for i in self.__getCounterPositions__(clade))
+		return min(count, self.taxa_x_num_reps[excluded_taxon]) # a clade is counted once per tree
+
+	def getTaxonErrorBound(self, excluded_taxon): # how far above its exact count one of the taxon's estimates may be (see above)
+		return min(math.e * self.taxa_x_num_added.get(excluded_taxon, 0) / self.width, self.taxa_x_num_reps.get(excluded_taxon, 0))
+
+	def getErrorBound(self, clade): # how far above its exact score the clade's score may be (see above)
+		bound = 0.0
+		total_possible = 0
+		for taxon in self.getTaxaInClade(clade):
+			bound += self.getTaxonErrorBound(taxon)
+			total_possible += self.taxa_x_num_reps.get(taxon, 0)
+		return min(1.0, bound / total_possible) if total_possible else 0.0
+
+	def addErrorBounds(self, tree): # sets the "taxa-resiliency-sketch-error" of each of the tree's scored nodes
+		clades = tree.getEachSubTreeBitmasks(self.taxon_bits)
+		for i,node in tree.generateScoredNodes():
+			clade = clades[i]
+			node.metadata["taxa-resiliency-sketch-error"] = self.getErrorBound(clade)
+
+	def getMemory(self): # bytes taken by the sketches' counters
+		return len(self.taxa_x_sketch) * self.depth * self.width * array.array('I').itemsize
+
+	# "private" member functions
+	def __getCounterPositions__(self, clade): # the clade's counter in each row
+		x = clade
+		if clade >= SketchIndex.PRIME:
+			x = 0
+			while clade:
+				x = (x * self.__limb_base + (clade & SketchIndex.PRIME)) % SketchIndex.PRIME
+				clade >>= 61
+		width = self.width
+		return [row * width + ((a * x + b) % SketchIndex.PRIME) % width for row,(a,b) in enumerate(self.__row_hashes)]
+
+	# make str(some_index) meaningful
+	def __str__(self):
+		return f'{{ taxa: {len(self.taxa)}, replicates: {self.getNumTrees()}, depth: {self.depth}, width: {self.width}, unrooted: {self.unrooted} }}'
+
+	# make print(some_index) meaningful
+	def __repr__(self):
+		return "SketchIndex: " + self.__str__()
+
+
+# ------------- MAIN ----------------------------- ||
+if __name__ == "__main__":
+	sys.stderr.write("ERROR: This is a module, it is meant to be imported -- not run directly!\n")
+	sys.exit(1)
@@ -0,0 +1,39 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+import math
+
+# ---------- FUNCTIONS --------------------------- ||
+def getZScore(confidence): # two-sided, e.g., 0.95 -> 1.959963...
+	if not 0 < confidence < 1:
+		raise ValueError(f"confidence must be in the range (0,1), not {confidence}")
+	target = 1 - (1 - confidence) / 2 # upper quantile of the standard normal
+	low = 0.0
+	high = 40.0
+	for i in range(100): # bisection on the standard normal CDF
+		mid = (low + high) / 2
+		if 0.5 * (1 + math.erf(mid / math.sqrt(2))) < target:
+			low = mid
+		else:
+			high = mid
+	return (low + high) / 2
+
+def getWilsonInterval(successes, trials, z): # returns (lower, upper) of the Wilson score interval
+	if trials == 0:
+		return 0.0, 1.0 # nothing observed yet, anything is possible
+	p = float(successes) / trials
+	z2 = z * z
+	denominator = 1 + z2 / trials
+	center = (p + z2 / (2 * trials)) / denominator
+	margin = (z / denominator) * math.sqrt(p * (1 - p) / trials + z2 / (4 * trials * trials))
+	return max(0.0, center - margin), min(1.0, center + margin)
+
+# ----------- CLASSES ---------------------------- ||
+
+# ------------- MAIN ----------------------------- ||
+if __name__ == "__main__":
+	sys.stderr.write("ERROR: This is a module, it is meant to be imported -- not run directly!\n")
+	sys.exit(1)
@@ -0,0 +1,87 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+import hashlib
+
+# FINGERPRINT_BITS: the width of a taxon's (and so a clade's) fingerprint; see getTaxonFingerprint
+FINGERPRINT_BITS = 128
+FINGERPRINT_MASK = (1 << FINGERPRINT_BITS) - 1
+
+# ---------- FUNCTIONS --------------------------- ||
+def getTaxonFingerprint(label): # a pseudo-random FINGERPRINT_BITS-bit int for the taxon, the same in every run; a clade's fingerprint is the sum of its taxa's, mod 2^FINGERPRINT_BITS
+	return int.from_bytes(hashlib.blake2b(label.encode(encoding="UTF-8"), digest_size=FINGERPRINT_BITS // 8).digest(), "big")
+
+# ----------- CLASSES ---------------------------- ||
+class TaxonNamespaceException(Exception):
+	pass
+
+# The taxa that the trees parsed with it may have. Each leaf label is resolved
+# (when its tree is parsed) to the taxon's integer id and to the one string
+# kept here, so that many trees with the same taxa do not each keep their own
+# copies of the labels, and unknown labels are reported right away.
+class TaxonNamespace:
+
+	# constructor(s)
+	def __init__(self, labels=None): # labels: the (only) taxa allowed, in id order; if None, any label is allowed and gets the next id
+		# "normal" "public" member fields
+		#	labels: the label of each taxon, indexed by taxon id
+		self.labels = []
+		#	label_x_id: maps each label to its taxon id
+		self.label_x_id = {}
+		#	frozen: if true, labels not already here are errors
+		self.frozen = labels is not None
+
+		# "private" member fields
+		#	__fingerprints: the fingerprint of each taxon computed so far, indexed by taxon id
+		self.__fingerprints = []
+
+		for label in (labels if labels is not None else []):
+			if label in self.label_x_id:
+				raise TaxonNamespaceException(f"ERROR: the taxon \"{label}\" was given more than once.")
+			self.label_x_id[label] = len(self.labels)
+			self.labels.append(label)
+
+	# "normal" "public" member functions
+	def resolve(self, label): # returns (taxon id, the namespace's copy of label)
+		taxon_id = self.label_x_id.get(label)
+		if taxon_id is None:
+			if self.frozen:
+				raise TaxonNamespaceException(f"ERROR: the leaf \"{label}\" is not a taxon in the original/main tree.")
+			taxon_id = len(self.labels)
+			self.labels.append(label)
+			self.label_x_id[label] = taxon_id
+		return taxon_id, self.labels[taxon_id]
+
+	def getId(self, label):
+		return self.label_x_id[label]
+
+	def getLabel(self, taxon_id):
+		return self.labels[taxon_id]
+
+	def getFingerprints(self): # the fingerprint (see getTaxonFingerprint) of each taxon, indexed by taxon id; computed only when first needed
+		while len(self.__fingerprints) < len(self.labels):
+			self.__fingerprints.append(getTaxonFingerprint(self.labels[len(self.__fingerprints)]))
+		return self.__fingerprints
+
+	def __len__(self):
+		return len(self.labels)
+
+	def __contains__(self, label):
+		return label in self.label_x_id
+
+	# make str(some_namespace) meaningful
+	def __str__(self):
+		return f'{{ taxa: {len(self.labels)}, frozen: {self.frozen} }}'
+
+	# make print(some_namespace) meaningful
+	def __repr__(self):
+		return "TaxonNamespace: " + self.__str__()
+
+
+# ------------- MAIN ----------------------------- ||
+if __name__ == "__main__":
+	sys.stderr.write("ERROR: This is a module, it is meant to be imported -- not run directly!\n")
+	sys.exit(1)
@@ -4,11 +4,20 @@ __author__ = "Brandon Pickett"
 
 # ----------- IMPORTS ---------------------------- ||
 import sys
+import gc
+import json
+import random
+import hashlib
 from .node import Node,MalformedNewickTree
+from .taxonNamespace import TaxonNamespaceException,FINGERPRINT_MASK
+from .stats import getZScore,getWilsonInterval
 
 # ---------- FUNCTIONS --------------------------- ||
 
 # ----------- CLASSES ---------------------------- ||
+class MalformedJsonTree(Exception):
+	pass
+
 class Tree:
 	
 	# class level variables (define once, not for every instance of the class)
@@ -17,12 +26,14 @@ class Tree:
 	#NEWICK_PUNCT = ":;,()"
 
 	# constructor(s)
-	def __init__(self, newick="", name=""):
+	def __init__(self, newick="", name="", root=None, namespace=None): # root: an already built Node (newick is then ignored); namespace: a TaxonNamespace for the leaf labels (see Node.taxon_id)
 		# "normal" "public" member fields
-		self.root = Node()
+		self.root = Node() if root is None else root
 		self.name = name
+		self.namespace = namespace
 
-		self.__initializeNodes__(newick)
+		if root is None:
+			self.__initializeNodes__(newick)
 
 	# "normal" "public" member functions
 	def getLeafLabels(self):
@@ -34,6 +45,35 @@ class Tree:
 	def getEachSubTreeLeafLabelSetStrs(self):
 		return self.root.getEachSubTreeLeafLabelSetStrs()
 
+	def getEachSubTreeBitmasks(self, taxon_bits):
+		return self.root.getEachSubTreeBitmasks(taxon_bits)
+
+	def getEachSubTreeIdMasks(self):
+		return self.root.getEachSubTreeIdMasks()
+
+	def getEachSubTreeFingerprints(self): # the tree must have been parsed with a TaxonNamespace
+		return self.root.getEachSubTreeFingerprints(self.namespace.getFingerprints())
+
+	def getPruned(self, labels, namespace=None): # a copy of this tree without the leaves in labels (see Node.getPruned); namespace: resolve the copied leaves in it (e.g., to give a tree parsed without a namespace taxon ids)
+		root = self.root.getPruned(frozenset(labels), namespace)
+		return Tree(name=self.name, root=(Node() if root is None else root), namespace=(self.namespace if namespace is None else namespace))
+
+	def getTopologyHash(self, unrooted=False): # the tree must have been parsed with a TaxonNamespace (any one: see TaxonNamespace.getFingerprints)
+		# a canonical hash of the topology: the set of clades (or, if unrooted, of
+		#	bipartitions, each keyed by its smaller side's fingerprint) determines it,
+		#	whatever the order of each node's children (or where the tree is rooted),
+		#	and unary nodes add nothing to it; two different topologies hash the same
+		#	with a probability of about 2^-128
+		fps = self.getEachSubTreeFingerprints()
+		if unrooted:
+			leaves = fps[-1] # the root's fingerprint
+			keys = frozenset(min(fp, (leaves - fp) & FINGERPRINT_MASK) for fp in fps)
+		else:
+			keys = frozenset(fps)
+		h = hashlib.blake2b(digest_size=16)
+		h.update(b''.join(key.to_bytes(16, "big") for key in sorted(keys)))
+		return int.from_bytes(h.digest(), "big")
+
 	def containsSubtreeBasedOnSetOfLeafLabels(self, node):
 		return self.root.containsSubtreeBasedOnSetOfLeafLabels(node)
 
@@ -43,11 +83,82 @@ class Tree:
 	def generateNodesViaDepthFirstTraversal(self):
 		yield from self.root.generateNodesViaDepthFirstTraversal()
 
-	def scoreResiliency(self, taxa_x_trees):
+	def generateScoredNodes(self): # yields (depth first position, node) for each node given a meaningful score (see Node.scoreResiliency): every node with grandchildren, except the root
+		for i,node in enumerate(self.generateNodesViaDepthFirstTraversal()):
+			if node is not self.root and node.hasGrandChildren():
+				yield i, node
+
+	def scoreResiliency(self, taxa_x_trees, sample_fraction=None, sample_size=None, seed=None, confidence=0.95):
+		# approximate if sample_fraction or sample_size is given: each node checks only
+		# a random sample of its (excluded taxon, jackknifed tree) pairs
+		rng = None
+		z = None
+		if sample_fraction is not None or sample_size is not None:
+			rng = random.Random(seed)
+			z = getZScore(confidence)
 		for node in self.generateNodesViaDepthFirstTraversal():
-			node.scoreResiliency(taxa_x_trees)
+			if node is not self.root:
+				node.scoreResiliency(taxa_x_trees, rng=rng, sample_fraction=sample_fraction, sample_size=sample_size, z=z)
 		self.root.scoreResiliency(taxa_x_trees, meaningful=False) # force root score to 0
+
+	def scoreResiliencyWithIndex(self, index, z=None): # index is a ReplicateIndex; much faster than scoreResiliency
+		clades = self.getEachSubTreeBitmasks(index.taxon_bits) # same order as the depth first traversal
+		for node,clade in zip(self.generateNodesViaDepthFirstTraversal(), clades):
+			if node is not self.root:
+				node.scoreResiliencyWithIndex(index, clade, z=z)
+		self.root.scoreResiliencyWithIndex(index, clades[-1], meaningful=False) # force root score to 0
 	
+	def scoreResiliencyFromCounts(self, node_counts, z=None): # node_counts maps a node's depth first traversal position to (count, total_possible); z: also set intervals, as scoreResiliencyWithIndex does
+		for i,node in enumerate(self.generateNodesViaDepthFirstTraversal()):
+			if node is not self.root:
+				count, total_possible = node_counts.get(i, (0, 0))
+				if z is not None and node.hasGrandChildren():
+					node.setResiliencyInterval(*getWilsonInterval(count, total_possible, z))
+				node.setResiliencyScore(count, total_possible)
+		self.root.setResiliencyScore(0, 0, meaningful=False) # force root score to 0
+
+	def scoreResiliencyIncrementally(self, scored_tree, index=None, taxa_x_trees=None, z=None): # returns the number of nodes scored anew
+		# this tree is an edit of scored_tree (e.g., rerooted, with a branch collapsed, or with
+		#	a subtree moved): a node whose clade (set of leaves) was a node in scored_tree too,
+		#	with grandchildren in both, gets that node's scores (every "taxa-resiliency*"
+		#	value); the other nodes are scored against index (a ReplicateIndex), as with
+		#	scoreResiliencyWithIndex, or else against taxa_x_trees, as with scoreResiliency
+		if index is None and taxa_x_trees is None:
+			raise ValueError("scoreResiliencyIncrementally needs an index or taxa_x_trees to score new clades with")
+		if index is not None:
+			taxon_bits = index.taxon_bits
+		else:
+			taxon_bits = {taxon: 1 << i for i,taxon in enumerate(sorted(frozenset(self.getLeafLabels()) | frozenset(scored_tree.getLeafLabels())))}
+
+		clade_x_scored_node = {}
+		scored_clades = scored_tree.getEachSubTreeBitmasks(taxon_bits)
+		for i,node in scored_tree.generateScoredNodes():
+			clade = scored_clades[i]
+			if "taxa-resiliency" in node.metadata:
+				clade_x_scored_node[clade] = node
+
+		num_scored = 0
+		clades = self.getEachSubTreeBitmasks(taxon_bits) # same order as the depth first traversal
+		for node,clade in zip(self.generateNodesViaDepthFirstTraversal(), clades):
+			if node is self.root:
+				continue
+			scored_node = clade_x_scored_node.get(clade) if node.hasGrandChildren() else None
+			if scored_node is not None:
+				for key in [key for key in node.metadata.keys() if key.startswith("taxa-resiliency")]:
+					del node.metadata[key] # e.g., an interval the scored node does not have
+				for key,value in scored_node.metadata.items():
+					if key.startswith("taxa-resiliency"):
+						node.metadata[key] = value
+				continue
+			if index is not None:
+				node.scoreResiliencyWithIndex(index, clade, z=z)
+			else:
+				node.scoreResiliency(taxa_x_trees)
+			if node.hasGrandChildren():
+				num_scored += 1
+		self.root.setResiliencyScore(0, 0, meaningful=False) # force root score to 0
+		return num_scored
+
 	def replaceBranchLenWithOtherValue(self, meta_key):
 		for node in self.generateNodesViaDepthFirstTraversal():
 			node.replaceBranchLenWithOtherValue(meta_key)
@@ -68,6 +179,22 @@ class Tree:
 	def getPrettyJson(self):
 		#return json.loads(self.getJson())
 		return '{\n\t"name": "' + self.name + '",\n\t"root":\n' + self.root.getPrettyJson(indent=2) + '\n}\n'
+
+	@staticmethod
+	def fromJson(j, namespace=None): # j: the str written by getJson (or getPrettyJson); namespace: as in the constructor
+		# the cyclic garbage collector would otherwise run over and over while the many
+		#	(acyclic) dicts and Nodes are created, more than doubling the time this takes
+		gc_was_enabled = gc.isenabled()
+		gc.disable()
+		try:
+			return Tree.__buildFromJson__(j, namespace)
+		finally:
+			if gc_was_enabled:
+				gc.enable()
+
+	@staticmethod
+	def fromPrettyJson(j, namespace=None): # the same parser reads both
+		return Tree.fromJson(j, namespace=namespace)
 	
 	def getAscii(self, prefix="", children_prefix=""):
 		return self.root.getAscii(prefix=prefix, children_prefix=children_prefix)
@@ -100,9 +227,41 @@ class Tree:
 		return mmd
 
 	# "private" member functions
+	@staticmethod
+	def __buildFromJson__(j, namespace): # see fromJson
+		try:
+			data = json.loads(j)
+			name = data["name"]
+			root_data = data["root"]
+		except (ValueError, TypeError, KeyError) as e:
+			raise MalformedJsonTree(f"ERROR: not a tree written by getJson or getPrettyJson ({e}).")
+
+		# build the nodes with a stack, not recursion, so that big trees load quickly
+		root = Node()
+		stack = [(root_data, root)]
+		try:
+			while stack:
+				node_data, node = stack.pop()
+				node.label = node_data["label"]
+				node.metadata = node_data["metadata"]
+				children_data = node_data["children"]
+				if children_data:
+					node.children = [Node() for child_data in children_data]
+					stack.extend(zip(children_data, node.children))
+				elif namespace is not None:
+					node.taxon_id, node.label = namespace.resolve(node.label)
+		except (TypeError, KeyError) as e:
+			raise MalformedJsonTree(f"ERROR: a node of tree \"{name}\" is missing its label, metadata, or children ({e}).")
+		except TaxonNamespaceException as e:
+			raise TaxonNamespaceException(f"{e} (tree: \"{name}\")")
+		return Tree(name=name, root=root, namespace=namespace)
+
 	def __initializeNodes__(self, newick):
 		newick = self.__removeNewickComments__(newick).rstrip()
-		index = self.root.initializeNode(newick)
+		try:
+			index = self.root.initializeNode(newick, namespace=self.namespace)
+		except TaxonNamespaceException as e:
+			raise TaxonNamespaceException(f"{e} (tree: \"{self.name}\")")
 
 		if index < len(newick):
 			if newick[index] == ';':
@@ -115,6 +274,15 @@ class Tree:
 		else:
 			raise MalformedNewickTree("Reached end of tree without encountering a semi-colon")
 
+		if self.namespace is not None: # each taxon may be a leaf only once
+			seen = 0
+			for node in self.generateNodesViaDepthFirstTraversal():
+				if node.taxon_id is not None:
+					bit = 1 << node.taxon_id
+					if seen & bit:
+						raise TaxonNamespaceException(f"ERROR: the leaf \"{node.label}\" appears more than once in tree \"{self.name}\".")
+					seen |= bit
+
 	def __removeNewickComments__(self, newick):
 		keep = ""
 		i = 0
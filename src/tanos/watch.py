@@ -0,0 +1,231 @@
+#! /bin/env python3
+
+__author__ = "Brandon Pickett"
+
+# ----------- IMPORTS ---------------------------- ||
+import sys
+import os
+import time
+import argparse
+from pathlib import Path
+from .calcScore import CalcScoreException,addMainTreeArgument,addTreeOutputArguments,validateMainTreeFiles,validateOutputFiles,createMainTrees,createTreeFromNewickFile,isJackknifedTreeFileName,writeOutputs
+from .replicateIndex import ReplicateIndex,ReplicateIndexException
+
+# ---------- FUNCTIONS --------------------------- ||
+def handleArgs(argv):
+	# define the argument parser
+	parser = argparse.ArgumentParser(prog=f"{Path(sys.argv[0]).name} watch", add_help=False, allow_abbrev=True,
+									formatter_class=argparse.RawTextHelpFormatter,
+									description="Watch the jackknifed tree directory while the trees are still being built. New\n"
+									"tree files are read as they appear, and the outputs are rewritten with provisional\n"
+									"scores after each poll that found something new. Stop with Ctrl-C (the outputs are\n"
+									"written one last time), or see --replicates and --max-polls. A node none of whose\n"
+									"taxa has a jackknifed tree yet has no score: no \"taxa-resiliency\" in the JSON\n"
+									"outputs, and no branch length (-b) or internal label (-s) in the Newick output.\n")
+
+	# define argument groups
+	input_group = parser.add_argument_group("Input Options", "These options affect how input files are found and/or interpreted.")
+	watch_group = parser.add_argument_group("Watch Options", "These options affect how often and for how long the directory is watched.")
+	output_group = parser.add_argument_group("Output Options", "These options affect which and how output files are generated. Specify an output"
+																" filename as \"\" to skip outputting it.")
+	misc_group = parser.add_argument_group("Misc. Options", "")
+
+	# 	define input group options
+	addMainTreeArgument(input_group)
+	input_group.add_argument("-t", "--jackknife-tree", dest="jack_tree_dir", metavar="path/to/jackknife/tree/", action="store", type=str, required=False, default="data/jackknife/tree",
+						help="The directory to watch. It should (eventually) contain one subdirectory per\n"
+						"taxon, each with tree files named tree-${num}.${ext} (see \"tanos -h\")."
+						" [data/jackknife/tree]\n \n")
+	input_group.add_argument("-e", "--tree-ext", dest="jack_tree_fn_ext", metavar=".ext", action="store", type=str, required=False, default="nwk",
+						help="The filename extension of the tree files."
+						" [nwk]\n \n")
+	input_group.add_argument("-u", "--unrooted", dest="unrooted", action="store_true", required=False,
+						help="Treat the jackknifed trees as unrooted (see \"tanos -h\").\n \n")
+
+	# 	define watch group options
+	watch_group.add_argument("-i", "--interval", dest="interval", metavar="seconds", action="store", type=float, required=False, default=30.0,
+						help="How long to wait between polls."
+						" [30]\n \n")
+	watch_group.add_argument("--settle", dest="settle", metavar="seconds", action="store", type=float, required=False, default=5.0,
+						help="A tree file is not read until it has gone this long without being modified. Files\n"
+						"that cannot be parsed after that are reported (once per modification) and retried\n"
+						"at the next poll."
+						" [5]\n \n")
+	watch_group.add_argument("-r", "--replicates", dest="replicates", metavar="int", action="store", type=int, required=False, default=None,
+						help="Stop once every taxon has this many trees.\n \n")
+	watch_group.add_argument("--max-polls", dest="max_polls", metavar="int", action="store", type=int, required=False, default=None,
+						help="Stop after this many polls.\n \n")
+
+	# 	define output group options
+	addTreeOutputArguments(output_group)
+	output_group.add_argument("--output-counts", dest="output_counts", metavar="counts.tsv", action="store", type=str, required=False, default="counts.tsv",
+						help="A tab-separated file with one line per taxon and the number of its jackknifed\n"
+						"trees read so far."
+						" [counts.tsv]\n \n")
+
+	# 	define misc. group options
+	misc_group.add_argument("-h", "--help", action="help", help="Show this help message and exit.\n \n")
+
+	# parse the arguments
+	args = parser.parse_args(argv)
+
+	# sanity check on input paths
+	validateMainTreeFiles(args)
+	p = Path(args.jack_tree_dir)
+	if not (p.exists() and p.is_dir()): # exists and is dir?
+		raise CalcScoreException(f"ERROR: Problem with argument used for -t, \"{args.jack_tree_dir}\" either did not exist or was not a directory.")
+
+	# sanity check on output files
+	validateOutputFiles((args.output_nwk, args.output_json, args.output_json_pretty, args.output_counts))
+
+	# return the parsed arguments object
+	return args
+
+def writeProvisionalOutputs(main_trees, index, watcher, args):
+	for tree_num,mt in enumerate(main_trees, start=1):
+		mt.scoreResiliencyWithIndex(index) # changes mt, but not index
+		writeOutputs(mt, args, tree_num=tree_num, num_trees=len(main_trees))
+	if args.output_counts:
+		with open(args.output_counts, 'w') as ofd:
+			ofd.write(watcher.getCountsReport())
+
+# ----------- CLASSES ---------------------------- ||
+# Keeps a ReplicateIndex up to date with the tree files in a jackknifed tree
+# directory. A (sub)directory is listed only when its modification time has
+# changed, and only files not yet read (or not yet readable) are looked at, so
+# the work done by each poll depends on the number of new files, not on the
+# number of files already read.
+class JackknifeDirWatcher:
+
+	# constructor(s)
+	def __init__(self, tree_dir, tree_ext, index, settle=5.0):
+		# "normal" "public" member fields
+		self.tree_dir = Path(tree_dir)
+		self.tree_ext = tree_ext
+		self.index = index
+		self.settle = settle
+
+		# "private" member fields
+		#	__dir_mtimes: modification time of each directory when it was last listed
+		self.__dir_mtimes = {}
+		#	__taxon_dirs: the subdirectories (one per taxon) found so far
+		self.__taxon_dirs = []
+		#	__read: tree files already in the index
+		self.__read = set()
+		#	__pending: tree files found, but not (successfully) read yet, mapped to their taxon
+		self.__pending = {}
+		#	__warned: pending tree files already reported as unreadable, mapped to their modification time then
+		self.__warned = {}
+
+	# "normal" "public" member functions
+	def poll(self): # returns the number of trees added to the index
+		# look for new taxon directories
+		if self.__hasChanged__(self.tree_dir):
+			for sd in self.tree_dir.iterdir():
+				if sd.is_dir() and not sd in self.__taxon_dirs:
+					if sd.name in self.index.taxon_bits:
+						self.__taxon_dirs.append(sd)
+					else:
+						sys.stderr.write(f"WARNING: ignoring \"{sd}\"; \"{sd.name}\" is not a taxon in the original/main tree.\n")
+
+		# look for new tree files
+		for sd in self.__taxon_dirs:
+			if self.__hasChanged__(sd):
+				for f in sd.iterdir():
+					fn = str(f)
+					if not (fn in self.__read or fn in self.__pending) and isJackknifedTreeFileName(f.name, self.tree_ext):
+						self.__pending[fn] = sd.name
+
+		# read the ones that look finished
+		num_added = 0
+		now = time.time()
+		for fn,taxon in sorted(self.__pending.items()):
+			try:
+				mtime = os.stat(fn).st_mtime
+			except OSError:
+				continue # not there anymore; try again next time
+			if now - mtime < self.settle:
+				continue # probably still being written
+			try:
+				tree = createTreeFromNewickFile(fn, f"{taxon}-{len(self.__read)}")
+			except Exception as e:
+				if self.__warned.get(fn) != mtime: # once per version of the file; it is retried in case it is rewritten
+					sys.stderr.write(f"WARNING: \"{fn}\" has not changed for {self.settle}s but cannot be read as a tree\n({e}); it will be retried if it changes.\n")
+					self.__warned[fn] = mtime
+				continue
+			self.__warned.pop(fn, None)
+			try:
+				self.index.addTree(taxon, tree)
+			except ReplicateIndexException as e:
+				raise CalcScoreException(f"{e}\n(file: \"{fn}\")")
+			del self.__pending[fn]
+			self.__read.add(fn)
+			num_added += 1
+
+		return num_added
+
+	def getNumPending(self):
+		return len(self.__pending)
+
+	def getCountsReport(self): # tsv, one line per taxon
+		lines = ["taxon\treplicates\n"]
+		for taxon in self.index.taxa:
+			lines.append(f"{taxon}\t{self.index.getNumReplicates(taxon)}\n")
+		return ''.join(lines)
+
+	# "private" member functions
+	def __hasChanged__(self, d):
+		try:
+			mtime = os.stat(d).st_mtime_ns
+		except OSError:
+			return False
+		if self.__dir_mtimes.get(d) == mtime:
+			return False
+		if time.time() - mtime / 1e9 > 2: # coarse timestamps could hide a change made in the same tick; list it again next time
+			self.__dir_mtimes[d] = mtime
+		return True
+
+	# make str(some_watcher) meaningful
+	def __str__(self):
+		return f'{{ tree_dir: "{self.tree_dir}", read: {len(self.__read)}, pending: {len(self.__pending)} }}'
+
+	# make print(some_watcher) meaningful
+	def __repr__(self):
+		return "JackknifeDirWatcher: " + self.__str__()
+
+# ------------- MAIN ----------------------------- ||
+def main(argv=None):
+	# handle the arguments
+	args = handleArgs(argv)
+
+	# read in the main tree(s); -b and -s change them, so they are re-read before each rewrite
+	main_tree_fns = args.main_trees
+	main_trees = createMainTrees(main_tree_fns)
+	taxa = sorted(main_trees[0].getLeafLabels())
+
+	index = ReplicateIndex(taxa, unrooted=args.unrooted)
+	watcher = JackknifeDirWatcher(args.jack_tree_dir, args.jack_tree_fn_ext, index, settle=args.settle)
+
+	num_polls = 0
+	try:
+		while True:
+			num_added = watcher.poll()
+			num_polls += 1
+			if num_added:
+				if args.replace_branch_len or args.replace_internal_labels:
+					main_trees = createMainTrees(main_tree_fns)
+				writeProvisionalOutputs(main_trees, index, watcher, args)
+			sys.stderr.write(f"poll {num_polls}: read {num_added} new tree(s), {sum(index.taxa_x_num_reps.values())} in total, {watcher.getNumPending()} pending\n")
+
+			if args.replicates is not None and all(index.getNumReplicates(taxon) >= args.replicates for taxon in taxa):
+				break
+			if args.max_polls is not None and num_polls >= args.max_polls:
+				break
+			time.sleep(args.interval)
+	except KeyboardInterrupt:
+		if args.replace_branch_len or args.replace_internal_labels:
+			main_trees = createMainTrees(main_tree_fns)
+		writeProvisionalOutputs(main_trees, index, watcher, args)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,38 @@
+
+import sys
+sys.path.append("../src")
+from tanos.tree import Tree
+from tanos.replicateIndex import ReplicateIndex
+
+if __name__ == "__main__":
+	newickfn = "scoreResiliencyWithIndex-in.nwk"
+	jackknifefn = "scoreResiliencyWithIndex-in-jackknife.tsv"
+
+	nwk = ''
+	with open(newickfn, 'r') as ifd:
+		for line in ifd:
+			nwk += line.rstrip('\n')
+
+	t = Tree(newick=nwk, name='x')
+
+	taxa_x_trees = {}
+	with open(jackknifefn, 'r') as ifd:
+		for i,line in enumerate(ifd):
+			taxon, jackknife_nwk = line.rstrip('\n').split('\t')
+			if not taxon in taxa_x_trees:
+				taxa_x_trees[taxon] = []
+			taxa_x_trees[taxon].append(Tree(newick=jackknife_nwk, name=f"{taxon}-{i}"))
+
+	index = ReplicateIndex(t.getLeafLabels())
+	index.addTrees(taxa_x_trees)
+	t.scoreResiliencyWithIndex(index)
+
+	t2 = Tree.fromJson(t.getJson())
+	t3 = Tree.fromPrettyJson(t.getPrettyJson())
+
+	with open("fromJson-out.txt", 'w') as ofd:
+		ofd.write("json: " + ("same" if t2.getJson() == t.getJson() else "different") + '\n')
+		ofd.write("pretty json: " + ("same" if t3.getPrettyJson() == t.getPrettyJson() else "different") + '\n')
+		for node,node2,node3 in zip(t.generateNodesViaDepthFirstTraversal(), t2.generateNodesViaDepthFirstTraversal(), t3.generateNodesViaDepthFirstTraversal()):
+			status = "same" if node.metadata == node2.metadata == node3.metadata and node.label == node2.label == node3.label else "different"
+			ofd.write(''.join(sorted(node2.getLeafLabels())) + ": " + str(node2.metadata["taxa-resiliency"]) + " (" + status + ")\n")
@@ -0,0 +1,23 @@
+
+import sys
+sys.path.append("../src")
+from tanos import nexus
+from tanos.nexus import generateNexusTrees
+
+if __name__ == "__main__":
+	nexusfn = "generateNexusTrees-in.nex"
+
+	def getTrees():
+		return [(tree.name, tree.getNewick()) for tree in generateNexusTrees(nexusfn, 'x')]
+
+	expected = getTrees() # the whole file in one chunk
+
+	with open("generateNexusTrees-out.txt", 'w') as ofd:
+		for name,nwk in expected:
+			ofd.write(name + ": " + nwk)
+		# small chunks end inside every comment, quoted label, and statement of the file
+		for chunk_size in range(1, 17):
+			nexus.CHUNK_SIZE = chunk_size
+			status = "same" if getTrees() == expected else "different"
+			ofd.write(f"chunk size {chunk_size}: {status}\n")
+	
@@ -0,0 +1,37 @@
+
+import sys
+sys.path.append("../src")
+from tanos.tree import Tree
+from tanos.replicateIndex import ReplicateIndex
+from tanos.consensus import getConsensusTrees
+
+if __name__ == "__main__":
+	newickfn = "scoreResiliencyWithIndex-in.nwk"
+	jackknifefn = "scoreResiliencyWithIndex-in-jackknife.tsv"
+
+	nwk = ''
+	with open(newickfn, 'r') as ifd:
+		for line in ifd:
+			nwk += line.rstrip('\n')
+
+	t = Tree(newick=nwk, name='x')
+
+	taxa_x_trees = {}
+	with open(jackknifefn, 'r') as ifd:
+		for i,line in enumerate(ifd):
+			taxon, jackknife_nwk = line.rstrip('\n').split('\t')
+			if not taxon in taxa_x_trees:
+				taxa_x_trees[taxon] = []
+			taxa_x_trees[taxon].append(Tree(newick=jackknife_nwk, name=f"{taxon}-{i}"))
+
+	with open("getConsensusTrees-out.txt", 'w') as ofd:
+		for unrooted in (False, True):
+			index = ReplicateIndex(t.getLeafLabels(), unrooted=unrooted)
+			index.addTrees(taxa_x_trees)
+			for extended in (False, True):
+				overall, taxa_x_consensus = getConsensusTrees(index, extended=extended)
+				ofd.write(("unrooted" if unrooted else "rooted") + ", " + ("extended" if extended else "majority") + ":\n")
+				ofd.write("\toverall: " + overall.getNewickWithCommentedMetadata())
+				for taxon,tree in sorted(taxa_x_consensus.items()):
+					ofd.write(f"\t{taxon}: " + tree.getNewickWithCommentedMetadata())
+	
@@ -0,0 +1,40 @@
+
+import sys
+sys.path.append("../src")
+from tanos.tree import Tree
+from tanos.replicateIndex import ReplicateIndex
+
+if __name__ == "__main__":
+	newickfn = "scoreResiliencyWithIndex-in.nwk"
+	jackknifefn = "scoreResiliencyWithIndex-in-jackknife.tsv"
+
+	nwk = ''
+	with open(newickfn, 'r') as ifd:
+		for line in ifd:
+			nwk += line.rstrip('\n')
+
+	t = Tree(newick=nwk, name='x')
+
+	index = ReplicateIndex(t.getLeafLabels())
+	fast_index = ReplicateIndex(t.getLeafLabels())
+	fast_index.setMainTree(t)
+	with open(jackknifefn, 'r') as ifd:
+		for i,line in enumerate(ifd):
+			taxon, jackknife_nwk = line.rstrip('\n').split('\t')
+			index.addTree(taxon, Tree(newick=jackknife_nwk, name=f"{taxon}-{i}", namespace=index.namespace))
+			fast_index.addTree(taxon, Tree(newick=jackknife_nwk, name=f"{taxon}-{i}", namespace=fast_index.namespace))
+	# and one more tree per taxon that is the main tree without it
+	for taxon in index.taxa:
+		index.addTree(taxon, t.getPruned((taxon,), namespace=index.namespace))
+		fast_index.addTree(taxon, t.getPruned((taxon,), namespace=fast_index.namespace))
+
+	t2 = Tree(newick=nwk, name='y')
+	t.scoreResiliencyWithIndex(index)
+	t2.scoreResiliencyWithIndex(fast_index)
+
+	with open("getPruned-out.txt", 'w') as ofd:
+		ofd.write(t.getPruned(("T0", "T5")).getNewick())
+		ofd.write("fast path: " + str(fast_index.getNumPrunedMainTrees()) + " of " + str(fast_index.getNumTrees()) + '\n')
+		for node,node2 in zip(t.generateNodesViaDepthFirstTraversal(), t2.generateNodesViaDepthFirstTraversal()):
+			status = "same" if node.metadata["taxa-resiliency"] == node2.metadata["taxa-resiliency"] else "different"
+			ofd.write(''.join(sorted(node.getLeafLabels())) + ": " + str(node2.metadata["taxa-resiliency"]) + " (" + status + ")\n")
@@ -0,0 +1,36 @@
+
+import sys
+sys.path.append("../src")
+from tanos.tree import Tree
+from tanos.replicateIndex import ReplicateIndex
+
+if __name__ == "__main__":
+	newickfn = "initializeNode-in.nwk"
+
+	trees = []
+	with open(newickfn, 'r') as ifd:
+		for i,line in enumerate(ifd):
+			trees.append(Tree(newick=line.rstrip('\n'), name=f"x-{i}"))
+
+	with open("initializeNode-out.txt", 'w') as ofd:
+		# nested trees without branch lengths keep their nesting
+		for t in trees:
+			ofd.write(t.getNewick().rstrip('\n') + ' ' + ' '.join(t.getEachSubTreeLeafLabelSetStrs()) + '\n')
+
+		# the same unrooted tree, rooted in two places, has the same bipartitions
+		unrooted = ReplicateIndex(("A", "B", "C", "D", "E"), unrooted=True)
+		t, rerooted = trees[2], trees[3]
+		splits = sorted(frozenset(unrooted.getCanonicalSplit(clade, unrooted.getBitmask(t.getLeafLabels())) for clade in t.getEachSubTreeBitmasks(unrooted.taxon_bits)))
+		rerooted_splits = sorted(frozenset(unrooted.getCanonicalSplit(clade, unrooted.getBitmask(rerooted.getLeafLabels())) for clade in rerooted.getEachSubTreeBitmasks(unrooted.taxon_bits)))
+		ofd.write("unrooted splits: " + ' '.join(''.join(unrooted.getTaxaInClade(split)) for split in splits if split) + " (" + ("same" if splits == rerooted_splits else "different") + ")\n")
+
+		# so jackknifed trees without E support the clade ABE of the main tree however they
+		#	are rooted, unless the trees are taken as rooted
+		rooted = ReplicateIndex(("A", "B", "C", "D", "E"))
+		for index in (rooted, unrooted):
+			main = Tree(newick="((C,D),((A,B),E));", name="main")
+			index.addTree("E", t)
+			index.addTree("E", rerooted)
+			main.scoreResiliencyWithIndex(index)
+			for i,node in main.generateScoredNodes():
+				ofd.write(("unrooted " if index.unrooted else "rooted ") + ''.join(sorted(node.getLeafLabels())) + ": " + str(node.metadata["taxa-resiliency"]) + '\n')
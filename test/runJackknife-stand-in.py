@@ -0,0 +1,25 @@
+import sys
+import gzip
+import random
+
+# A stand-in for IQ-TREE when testing "tanos run-jackknife" without it, e.g.:
+#	tanos run-jackknife -a aln -t tree -r 3 -c "python test/runJackknife-stand-in.py {alignment} {prefix}"
+# It writes a random (but repeatable) tree of the alignment's taxa to ${prefix}.treefile.
+
+if __name__ == "__main__":
+	alnfn = sys.argv[1]
+	prefix = sys.argv[2]
+
+	opener = gzip.open if alnfn.endswith(".gz") else open
+	with opener(alnfn, 'rt') as ifd:
+		taxa = [line[1:].split()[0] for line in ifd if line.startswith('>')]
+
+	rng = random.Random(prefix)
+	subtrees = list(taxa)
+	while len(subtrees) > 2:
+		a = subtrees.pop(rng.randrange(len(subtrees)))
+		b = subtrees.pop(rng.randrange(len(subtrees)))
+		subtrees.append(f"({a}:0.1,{b}:0.1)")
+
+	with open(f"{prefix}.treefile", 'w') as ofd:
+		ofd.write(f"({subtrees[0]}:0.1,{subtrees[1]}:0.1);\n")
@@ -0,0 +1,42 @@
+
+import sys
+sys.path.append("../src")
+from tanos.tree import Tree
+from tanos.replicateIndex import ReplicateIndex
+
+if __name__ == "__main__":
+	newickfn = "scoreResiliencyWithIndex-in.nwk"
+	jackknifefn = "scoreResiliencyWithIndex-in-jackknife.tsv"
+	edited_nwk = "(((T6:0.266,T3:0.802):0.591,(T2:0.102,T1:0.317):0.022):0.650,(((T7:0.009,T8:0.881):0.686,T5:0.553):0.726,((T4:0.528,T0:0.764):0.939,T9:0.969):0.346):0.677);" # T5 and T9 swapped
+
+	nwk = ''
+	with open(newickfn, 'r') as ifd:
+		for line in ifd:
+			nwk += line.rstrip('\n')
+
+	t = Tree(newick=nwk, name='x')
+
+	taxa_x_trees = {}
+	with open(jackknifefn, 'r') as ifd:
+		for i,line in enumerate(ifd):
+			taxon, jackknife_nwk = line.rstrip('\n').split('\t')
+			if not taxon in taxa_x_trees:
+				taxa_x_trees[taxon] = []
+			taxa_x_trees[taxon].append(Tree(newick=jackknife_nwk, name=f"{taxon}-{i}"))
+
+	index = ReplicateIndex(t.getLeafLabels())
+	index.addTrees(taxa_x_trees)
+	t.scoreResiliencyWithIndex(index)
+
+	edited = Tree(newick=edited_nwk, name='y')
+	edited.scoreResiliencyWithIndex(index)
+	t2 = Tree(newick=edited_nwk, name='y')
+	num_scored = t2.scoreResiliencyIncrementally(t, index=index)
+	t3 = Tree(newick=edited_nwk, name='y')
+	num_scored3 = t3.scoreResiliencyIncrementally(t, taxa_x_trees=taxa_x_trees)
+
+	with open("scoreResiliencyIncrementally-out.txt", 'w') as ofd:
+		ofd.write(f"scored anew: {num_scored} (index), {num_scored3} (trees)\n")
+		for node,node2,node3 in zip(edited.generateNodesViaDepthFirstTraversal(), t2.generateNodesViaDepthFirstTraversal(), t3.generateNodesViaDepthFirstTraversal()):
+			status = "same" if node.metadata["taxa-resiliency"] == node2.metadata["taxa-resiliency"] == node3.metadata["taxa-resiliency"] else "different"
+			ofd.write(''.join(sorted(node.getLeafLabels())) + ": " + str(node2.metadata["taxa-resiliency"]) + " (" + status + ")\n")
@@ -0,0 +1,37 @@
+
+import sys
+sys.path.append("../src")
+from tanos.tree import Tree
+from tanos.replicateIndex import ReplicateIndex
+
+if __name__ == "__main__":
+	newickfn = "scoreResiliencyWithIndex-in.nwk"
+	jackknifefn = "scoreResiliencyWithIndex-in-jackknife.tsv"
+
+	nwk = ''
+	with open(newickfn, 'r') as ifd:
+		for line in ifd:
+			nwk += line.rstrip('\n')
+	
+	t = Tree(newick=nwk, name='x')
+	t2 = Tree(newick=nwk, name='y')
+
+	taxa_x_trees = {}
+	with open(jackknifefn, 'r') as ifd:
+		for i,line in enumerate(ifd):
+			taxon, jackknife_nwk = line.rstrip('\n').split('\t')
+			if not taxon in taxa_x_trees:
+				taxa_x_trees[taxon] = []
+			taxa_x_trees[taxon].append(Tree(newick=jackknife_nwk, name=f"{taxon}-{i}"))
+
+	index = ReplicateIndex(t.getLeafLabels())
+	index.addTrees(taxa_x_trees)
+
+	t.scoreResiliency(taxa_x_trees)
+	t2.scoreResiliencyWithIndex(index)
+
+	with open("scoreResiliencyWithIndex-out.txt", 'w') as ofd:
+		for node,node2 in zip(t.generateNodesViaDepthFirstTraversal(), t2.generateNodesViaDepthFirstTraversal()):
+			status = "same" if node.metadata["taxa-resiliency"] == node2.metadata["taxa-resiliency"] else "different"
+			ofd.write(''.join(sorted(node.getLeafLabels())) + ": " + str(node2.metadata["taxa-resiliency"]) + " (" + status + ")\n")
+	
@@ -0,0 +1,43 @@
+
+import sys
+from pathlib import Path
+sys.path.append("../src")
+from tanos.tree import Tree
+from tanos.calcScore import getJackknifedTreesFileNames,validateAndResolveJackknifedTrees,sortJackknifedTrees,buildReplicateIndexFromFiles
+
+if __name__ == "__main__":
+	newickfn = "scoreResiliencyWithIndex-in.nwk"
+	jackknifefn = "scoreResiliencyWithRemovalSets-in-jackknife.tsv" # first column: the removed taxon, or taxa (e.g., "T2,T1" or "T1, T2")
+
+	nwk = ''
+	with open(newickfn, 'r') as ifd:
+		for line in ifd:
+			nwk += line.rstrip('\n')
+
+	# one file per jackknifed tree, listed in a fofn (as for -f) under the first column as given
+	d = Path("scoreResiliencyWithRemovalSets-out")
+	d.mkdir(exist_ok=True)
+	fofn = d / "fofn.tsv"
+	with open(jackknifefn, 'r') as ifd, open(fofn, 'w') as ofd:
+		for i,line in enumerate(ifd):
+			key, jackknife_nwk = line.rstrip('\n').split('\t')
+			fn = d / f"tree-{i}.nwk"
+			with open(fn, 'w') as tfd:
+				tfd.write(jackknife_nwk + '\n')
+			ofd.write(f"{key}\t{fn}\n")
+
+	with open("scoreResiliencyWithRemovalSets-out.txt", 'w') as ofd:
+		for unrooted in (False, True):
+			t = Tree(newick=nwk, name='x')
+			taxa = t.getLeafLabels()
+			taxa_x_fns = getJackknifedTreesFileNames(None, "nwk", str(fofn))
+			validateAndResolveJackknifedTrees(taxa_x_fns, taxa)
+			sortJackknifedTrees(taxa_x_fns)
+			index = buildReplicateIndexFromFiles(taxa_x_fns, taxa, unrooted=unrooted)
+			t.scoreResiliencyWithIndex(index)
+
+			mode = "unrooted" if unrooted else "rooted"
+			ofd.write(f"{mode} keys: " + ' '.join(sorted(taxa_x_fns.keys())) + '\n')
+			for i,node in t.generateScoredNodes():
+				ofd.write(f"{mode} " + ''.join(sorted(node.getLeafLabels())) + ": " + str(node.metadata["taxa-resiliency"]) + '\n')
+	